@@ -0,0 +1,181 @@
+import random
+
+### Job placement on the dragonfly for dragonfly.py.
+###  Computes which endpoints every job gets under an allocation policy, and how much of each
+###  job's communication crosses dragonfly groups under that placement. Endpoints are numbered
+###  as merlin's dragonfly numbers them: group after group, router after router, so group g holds
+###  endpoints [g x group_hosts, (g + 1) x group_hosts). Endpoints are handed out in blocks (the
+###  NICs of one node), which is also the unit the policies below place.
+###  Host-side only (no sst import).
+###
+
+
+"""
+    Allocation policies:
+      random-linear : merlin's own random-linear allocation (the original placement)
+      linear        : jobs one after another from endpoint 0
+      group-packed  : each job into the fullest group it fits in whole (best fit), spilling into
+                      the emptiest groups only when it fits in none
+      group-spread  : each job's nodes dealt round-robin over all groups
+      interleaved   : the machine's nodes dealt round-robin over the jobs, so jobs share routers
+      random        : every job on randomly chosen nodes
+      file          : the endpoints listed in a node-list file, one line per job
+"""
+allocation_policies = ["random-linear", "linear", "group-packed", "group-spread", "interleaved", "random", "file"]
+
+
+# Expands "0-15, 32 33" into [0, ..., 15, 32, 33]
+def parseIDs(text):
+    ids = []
+    for item in text.replace(",", " ").split():
+        first, _, last = item.partition("-")
+        ids += list(range(int(first), int(last) + 1)) if last else [int(first)]
+    return ids
+
+"""
+    Reads a node-list file: one line per job, in job order, listing the endpoints (merlin's
+    endpoint IDs, single IDs or ranges such as 0-63) it runs on, in rank order. '#' starts a comment.
+"""
+def readNodeList(filename):
+    jobs = []
+    with open(filename) as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if line:
+                jobs.append(parseIDs(line))
+    return jobs
+
+def checkNodeList(jobs, sizes, num_hosts, block):
+    if len(jobs) < len(sizes):
+        raise Exception("Error: the node-list file places {} jobs, but there are {}".format(len(jobs), len(sizes)))
+    used = set()
+    for i, (endpoints, size) in enumerate(zip(jobs, sizes)):
+        if len(endpoints) != size:
+            raise Exception("Error: job {} needs {} endpoints, the node-list file gives it {}".format(i, size, len(endpoints)))
+        for e in endpoints:
+            if e < 0 or e >= num_hosts:
+                raise Exception("Error: endpoint {} of job {} is not in the {} endpoint system".format(e, i, num_hosts))
+            if e in used:
+                raise Exception("Error: endpoint {} is given to more than one job".format(e))
+            used.add(e)
+        # The NICs of a node must be contiguous, starting on a block boundary
+        for k in range(0, size, block):
+            if endpoints[k] % block != 0 or endpoints[k:k + block] != list(range(endpoints[k], endpoints[k] + block)):
+                raise Exception("Error: job {} must get whole nodes, i.e., {} consecutive endpoints starting at a multiple of {}".format(i, block, block))
+
+"""
+    Endpoints of every job under 'policy' (any of allocation_policies but random-linear).
+
+    sizes       : endpoints each job needs, in job order (multiples of 'block')
+    num_groups  : groups in the dragonfly, each with 'group_hosts' endpoints
+    block       : endpoints per node, placed together
+    Returns one list of endpoints per job, in the order the job's ranks are laid onto them.
+"""
+def allocateJobs(policy, sizes, num_groups, group_hosts, block=2, seed=2025, node_list=None):
+    num_hosts = num_groups * group_hosts
+    if sum(sizes) > num_hosts:
+        raise Exception("Error: the jobs need {} endpoints, the system has {}".format(sum(sizes), num_hosts))
+    if policy == "file":
+        if node_list is None:
+            raise Exception("Error: the file allocation needs a node-list file")
+        jobs = readNodeList(node_list)
+        checkNodeList(jobs, sizes, num_hosts, block)
+        return jobs[:len(sizes)]
+
+    # Place nodes (blocks of endpoints), then expand them to endpoints
+    needs = [size // block for size in sizes]
+    group_nodes = group_hosts // block
+    free = [list(range(g * group_nodes, (g + 1) * group_nodes)) for g in range(num_groups)]
+    placed = [[] for _ in sizes]
+
+    if policy == "linear":
+        next_node = 0
+        for i, need in enumerate(needs):
+            placed[i] = list(range(next_node, next_node + need))
+            next_node += need
+    elif policy == "group-packed":
+        for i, need in enumerate(needs):
+            fits = [g for g in range(num_groups) if len(free[g]) >= need]
+            if fits:
+                g = min(fits, key=lambda g: len(free[g]))
+                placed[i], free[g] = free[g][:need], free[g][need:]
+                continue
+            for g in sorted(range(num_groups), key=lambda g: -len(free[g])):
+                take = min(need - len(placed[i]), len(free[g]))
+                placed[i] += free[g][:take]
+                free[g] = free[g][take:]
+    elif policy == "group-spread":
+        for i, need in enumerate(needs):
+            g = i % num_groups
+            while len(placed[i]) < need:
+                if free[g]:
+                    placed[i].append(free[g].pop(0))
+                g = (g + 1) % num_groups
+    elif policy == "interleaved":
+        waiting = [i for i, need in enumerate(needs) if need > 0]
+        node = 0
+        while waiting:
+            for i in list(waiting):
+                placed[i].append(node)
+                node += 1
+                if len(placed[i]) == needs[i]:
+                    waiting.remove(i)
+    elif policy == "random":
+        nodes = list(range(num_groups * group_nodes))
+        random.Random(seed).shuffle(nodes)
+        for i, need in enumerate(needs):
+            placed[i], nodes = nodes[:need], nodes[need:]
+    else:
+        raise Exception("Error: unknown allocation policy '{}'. Expected one of {}".format(policy, allocation_policies))
+
+    return [[node * block + k for node in nodes for k in range(block)] for nodes in placed]
+
+"""
+    Pairs of ranks that exchange messages in each app's main motif, with ranks numbered as the
+    motif numbers them:
+      halo  : Halo3D26 on a size^3 grid, every rank with its (up to) 26 neighbours
+      sweep : Sweep3D on a size^2 grid, every rank with its (up to) 4 neighbours
+      fft   : FFT3D on a size x size grid, all-to-all within every row and every column
+"""
+def communicatingPairs(app, size):
+    pairs = []
+    if app == "halo":
+        index = lambda x, y, z: x + size * (y + size * z)
+        for x in range(size):
+            for y in range(size):
+                for z in range(size):
+                    for dx in (-1, 0, 1):
+                        for dy in (-1, 0, 1):
+                            for dz in (-1, 0, 1):
+                                nx, ny, nz = x + dx, y + dy, z + dz
+                                if (dx, dy, dz) != (0, 0, 0) and 0 <= nx < size and 0 <= ny < size and 0 <= nz < size:
+                                    pairs.append((index(x, y, z), index(nx, ny, nz)))
+    elif app == "sweep":
+        for x in range(size):
+            for y in range(size):
+                for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                    if 0 <= nx < size and 0 <= ny < size:
+                        pairs.append((x + size * y, nx + size * ny))
+    elif app == "fft":
+        for row in range(size):
+            ranks = [row * size + col for col in range(size)]
+            pairs += [(a, b) for a in ranks for b in ranks if a != b]
+        for col in range(size):
+            ranks = [row * size + col for row in range(size)]
+            pairs += [(a, b) for a in ranks for b in ranks if a != b]
+    else:
+        raise Exception("Error: unknown app '{}'".format(app))
+    return pairs
+
+"""
+    Placement summary of a job: the number of groups its endpoints span and the fraction of its
+    communicating rank pairs (see communicatingPairs) whose ranks sit in different groups, an
+    estimate of the share of its traffic that uses global links. Rank r runs on the job's
+    endpoint r // ranks_per_endpoint.
+"""
+def interGroupTraffic(app, size, endpoints, group_hosts, ranks_per_endpoint):
+    group = lambda rank: endpoints[rank // ranks_per_endpoint] // group_hosts
+    pairs = communicatingPairs(app, size)
+    crossing = len([1 for a, b in pairs if group(a) != group(b)])
+    groups = len(set([e // group_hosts for e in endpoints]))
+    return groups, crossing / len(pairs) if pairs else 0.0
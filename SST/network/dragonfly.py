@@ -1,6 +1,6 @@
 import argparse
 import sst
-import sys #TODO remove
+import sys
 
 from sst import UnitAlgebra
 from sst.merlin.base import *
@@ -9,6 +9,14 @@ from sst.merlin.endpoint import *
 from sst.merlin.interface import *
 from sst.ember import *
 
+from allocationlib import *
+
+# Routing algorithms of merlin's dragonfly topology
+routing_algorithms = ["minimal", "valiant", "ugal", "par"]
+
+# Crossbar arbitration policies of hr_router (merlin.xbar_arb_*)
+xbar_arbs = ["lru", "rr", "age", "rand"]
+
 def main(args):
 
     ###############################################################
@@ -65,7 +73,22 @@ def main(args):
     #### Setup the network
     ## Set up the topology
     topo = topoDragonFly()
-    topo.algorithm = ["ugal"]
+    # One routing algorithm per VN; a shorter list is padded with its last entry
+    algorithms = args.routing.split(",")
+    if args.vns < 1:
+        print('Error: --vns must be at least 1')
+        sys.exit(1)
+    if len(algorithms) > args.vns:
+        print(f'Error: --routing gives {len(algorithms)} algorithms for {args.vns} VNs')
+        sys.exit(1)
+    for algorithm in algorithms:
+        if algorithm not in routing_algorithms:
+            print(f'Error: unknown routing algorithm \'{algorithm}\'. Expected one of {routing_algorithms}')
+            sys.exit(1)
+    topo.algorithm = algorithms + [algorithms[-1]] * (args.vns - len(algorithms))
+    # Used by the adaptive algorithms (ugal, par) to choose between the minimal and a non-minimal path
+    if args.adaptive_threshold is not None:
+        topo.adaptive_threshold = args.adaptive_threshold
 
     topo.hosts_per_router = 16
     topo.routers_per_group = args.group_size // topo.hosts_per_router
@@ -83,6 +106,10 @@ def main(args):
     print(f'  group_size:        {topo.routers_per_group*topo.hosts_per_router}')
     print(f'  intergroup_links:  {topo.intergroup_links}')
     print(f'  num_groups:        {topo.num_groups}')
+    print(f'  routing:           {",".join(topo.algorithm)}')
+    print(f'  num_vns:           {args.vns}')
+    print(f'  xbar_arb:          {args.xbar_arb}')
+    print(f'  adaptive_threshold: {args.adaptive_threshold if args.adaptive_threshold is not None else "default"}')
 
     ## Set up the routers
     router = hr_router()
@@ -95,8 +122,8 @@ def main(args):
     router.output_buf_size = input_buffer_size
     router.input_buf_size = input_buffer_size
     router.output_buf_size = input_buffer_size
-    router.num_vns = 1
-    router.xbar_arb = "merlin.xbar_arb_lru"
+    router.num_vns = args.vns
+    router.xbar_arb = "merlin.xbar_arb_" + args.xbar_arb
 
     topo.router = router
     topo.link_latency = link_latency
@@ -130,7 +157,9 @@ def main(args):
 
         # Generate halo motif string
         work=args.work
-        halo_string = f"Halo3D26 pex={size} pey={size} pez={size} nx={work} ny={work} nz={work} iterations=1 computetime=187200 fields_per_cell=8"
+        compute_ns = 187200
+        halo_string = f"Halo3D26 pex={size} pey={size} pez={size} nx={work} ny={work} nz={work} iterations=1 computetime={compute_ns} fields_per_cell=8"
+        motif_info = f"Halo3D26, 1 iteration per motif, {compute_ns} ns compute per iteration"
 
 
         for i in range(num_jobs):
@@ -147,7 +176,8 @@ def main(args):
             ep.addMotif("Fini")
             # enable motifLog, which will print a log entry whenever a motif
             # starts or stops
-            #ep.enableMotifLog("motiflog" + suffix)
+            if args.motif_log:
+                ep.enableMotifLog(f"motiflog-job{len(jobs_list)}")
 
             jobs_list.append(ep)
 
@@ -167,6 +197,7 @@ def main(args):
 
         # Generate sweep motif string
         sweep_string = "Sweep3D pex=%d pey=%d nx=8 ny=8 nz=60 kba=10 iterations=%d computetime=293 fields_per_cell=8"%(size,size,iterations)
+        motif_info = f"Sweep3D, {iterations} iteration{'' if iterations == 1 else 's'} per motif"
 
         for i in range(num_jobs):
             # create the ember job.  Parameters are:
@@ -179,7 +210,8 @@ def main(args):
             ep.addMotif("Fini")
             # enable motifLog, which will print a log entry whenever a motif
             # starts or stops
-            #ep.enableMotifLog("motiflog" + suffix)
+            if args.motif_log:
+                ep.enableMotifLog(f"motiflog-job{len(jobs_list)}")
 
             jobs_list.append(ep)
 
@@ -197,6 +229,8 @@ def main(args):
         if size % 4 != 0:
             size -= 2
 
+        motif_info = f"FFT3D, {iterations} iteration{'' if iterations == 1 else 's'} per motif"
+
         for i in range(num_jobs):
             # create the ember job.  Parameters are:
             # (job_id, num_nodes, numCores = 1, nicsPerNode = 1)
@@ -209,11 +243,16 @@ def main(args):
             ep.addMotif("Fini")
             # enable motifLog, which will print a log entry whenever a motif
             # starts or stops
-            #ep.enableMotifLog("motiflog" + suffix)
+            if args.motif_log:
+                ep.enableMotifLog(f"motiflog-job{len(jobs_list)}")
 
             jobs_list.append(ep)
 
 
+    # What motifs.py needs to split the motif logs into iterations and compute
+    if args.motif_log:
+        print(f'Motif log: {motif_info}')
+
     #### Create the system object and allocate jobs
     system = System()
     # Set the allocation block size to 2 because there are two NICs
@@ -222,8 +261,24 @@ def main(args):
     system.allocation_block_size = 2
     system.topology = topo
 
-    for ep in jobs_list:
-        system.allocateNodes(ep,"random-linear", 2025) # seed = 2025
+    if args.allocation == "random-linear":
+        for ep in jobs_list:
+            system.allocateNodes(ep,"random-linear", args.alloc_seed)
+    else:
+        # Every job has 8 ranks per node, 4 on each of its 2 NICs
+        ranks = size ** 3 if app_name == "halo" else size ** 2
+        group_hosts = topo.routers_per_group * topo.hosts_per_router
+        try:
+            placements = allocateJobs(args.allocation, [ranks // 4] * len(jobs_list), topo.num_groups, group_hosts,
+                                      block=system.allocation_block_size, seed=args.alloc_seed, node_list=args.node_list)
+        except Exception as e:
+            print(e)
+            sys.exit(1)
+        print(f'Allocation: {args.allocation}')
+        for i, (ep, endpoints) in enumerate(zip(jobs_list, placements)):
+            system.allocateNodes(ep, "indexed", endpoints)
+            groups, inter_group = interGroupTraffic(app_name, size, endpoints, group_hosts, 4)
+            print(f'  Job {i}: {len(endpoints) // 2} nodes in {groups} groups, {inter_group * 100:.1f}% of communicating rank pairs between groups')
 
     system.build()
 
@@ -243,5 +298,21 @@ if __name__ == '__main__':
                   help='Number of jobs.')
   ap.add_argument('--iters', type=int, default=20,
                   help='Number of iterations of main motif in each job')
+  ap.add_argument('--routing', type=str, default='ugal',
+                  help='Routing algorithm, one of minimal, valiant, ugal or par; or a comma-separated list with one per VN.')
+  ap.add_argument('--vns', type=int, default=1,
+                  help='Number of virtual networks in the routers.')
+  ap.add_argument('--xbar_arb', type=str, default='lru', choices=xbar_arbs,
+                  help='Crossbar arbitration policy of the routers.')
+  ap.add_argument('--adaptive_threshold', type=float, default=None,
+                  help='Threshold of the adaptive routing decision in ugal and par. Default: merlin\'s (2.0).')
+  ap.add_argument('--allocation', type=str, default='random-linear', choices=allocation_policies,
+                  help='How jobs are placed on the endpoints (see allocationlib.py).')
+  ap.add_argument('--alloc_seed', type=int, default=2025,
+                  help='Seed of the random and random-linear allocations.')
+  ap.add_argument('--node_list', type=str, default=None,
+                  help='Node-list file of --allocation file: one line of endpoint IDs (e.g. 0-63) per job.')
+  ap.add_argument('--motif_log', action='store_true',
+                  help='Log the start and end of every motif of every job to motiflog-jobN* files (see motifs.py).')
   args = ap.parse_args()
   main(args)
@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+
+from netlib import *
+
+### USAGE ###
+#
+# Breaks the simulated time of dragonfly.py runs made with --motif_log down by Ember motif:
+# Init, the main motif (Halo3D26, Sweep3D or FFT3D) and Allreduce per iteration, and Fini, per
+# job and averaged over the jobs of each run.
+#
+#   $ sst dragonfly.py -- --app halo --bw quarter --motif_log
+#   $ python3 motifs.py .
+#   $ python3 motifs.py sweep/* --iterations       # run directories of sweep.py --motif-log
+#
+# Halo3D26 is given its compute time per iteration (computetime), so for halo runs the time in
+# Halo3D26 and Allreduce beyond it is reported as communication ('comm'); Sweep3D and FFT3D
+# run all their iterations in one motif, interleaving compute and communication in ways
+# dragonfly.py does not know, so they get no per-iteration times ('-'): compare their totals
+# across topologies and bandwidths instead (sweep.py --motif-log).
+#
+
+def main(args):
+    found = 0
+    for rundir in args.rundirs:
+        logs = readMotifLogs(rundir, args.time_base)
+        if not logs:
+            continue
+        found += 1
+        info = None
+        logname = os.path.join(rundir, "sst.log")
+        if os.path.exists(logname):
+            with open(logname) as f:
+                info = parseMotifInfo(f.read())
+        summaries = { job : motifSummary(motifs, info) for job, motifs in logs.items() }
+
+        print("{} (times in us)".format(rundir))
+        print("  ".join(["{:>5}".format("job")] + motif_header))
+        for job in sorted(summaries.keys()):
+            print("  ".join(["{:>5}".format(job)] + motifCells(motifRow([summaries[job]]))))
+        if len(summaries) > 1:
+            print("  ".join(["{:>5}".format("mean")] + motifCells(motifRow(list(summaries.values())))))
+
+        if args.iterations:
+            for job in sorted(summaries.keys()):
+                for k, iteration in enumerate(summaries[job]["iterations"]):
+                    print("  job {} iteration {}: {}".format(job, k, ", ".join(["{} {:.1f} us".format(name, t * 1e6) for name, t in iteration.items()])))
+        print("")
+
+    if found == 0:
+        print("Error: no motif logs (motiflog-job*) in {}; run dragonfly.py with --motif_log".format(" ".join(args.rundirs)))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('rundirs', nargs='+',
+                    help='Run directories holding motiflog-job* files and sst.log.')
+    ap.add_argument('--iterations', action='store_true',
+                    help='Also list the time of every iteration of every job.')
+    ap.add_argument('--time-base', type=float, default=motif_time_base,
+                    help='Seconds per SST core cycle, the unit of the motif logs.')
+    args = ap.parse_args()
+    main(args)
@@ -0,0 +1,259 @@
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from allocationlib import allocation_policies
+
+# time_units, toSeconds, parseSimTime and runID are shared with node/runlib.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from simlib import *
+
+### Host-side helpers for running and post-processing dragonfly.py simulations.
+###  Like node/runlib.py this file does not import sst, so it can be used from plain python
+###  to launch SST and read the output of finished runs.
+###
+
+
+# Printed by rank 0 of every Ember job when its Fini motif completes
+job_time_re = re.compile(r"Job\s*Finished:?\s*JobNum:\s*([0-9]+)\s+Time:\s*([0-9.eE+-]+)\s*([munpf]?s)\b")
+hosts_re = re.compile(r"^\s*hosts:\s+([0-9]+)", re.MULTILINE)
+# Printed by dragonfly.py for every job it places itself (any --allocation but random-linear)
+placement_re = re.compile(r"^\s*Job ([0-9]+): ([0-9]+) nodes in ([0-9]+) groups, ([0-9.]+)% of communicating rank pairs between groups", re.MULTILINE)
+
+# Ember motif logs (dragonfly.py --motif_log): a line per motif, its number, name, start and end
+motif_log_re = re.compile(r"^\s*(?:([0-9]+)\s+)?([A-Za-z][\w.:]*)\s+([0-9]+)\s+([0-9]+)\s*$", re.MULTILINE)
+motif_info_re = re.compile(r"^Motif log: (\w+), ([0-9]+) iterations? per motif(?:, ([0-9]+) ns compute per iteration)?$", re.MULTILINE)
+# The motifs dragonfly.py runs, in the order they are reported
+motif_names = ["Init", "Halo3D26", "Allreduce", "Sweep3D", "FFT3D", "Fini"]
+# Motif log times are SST core cycles, 1 ps unless sst --timebase says otherwise
+motif_time_base = 1e-12
+
+# Default SST configuration script, next to this file
+network_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dragonfly.py")
+
+"""
+    Values of every dragonfly.py option a sweep can vary, keyed by its command line name.
+    The first value of each list is dragonfly.py's default.
+"""
+network_space = {
+    "app" : ["halo", "sweep", "fft"],
+    "bw" : ["full", "half", "quarter"],
+    "num_groups" : [5, 3, 9],
+    "group_size" : [512, 256],
+    "jobs" : [4, 1, 2, 8],
+    "iters" : [20, 5, 50],
+    "work" : [60, 30, 120],
+    "routing" : ["ugal", "minimal", "valiant", "par"],
+    "vns" : [1, 2],
+    "xbar_arb" : ["lru", "rr", "age", "rand"],
+    "adaptive_threshold" : [None, 1.0, 1.5, 3.0],
+    "allocation" : allocation_policies,
+    "alloc_seed" : [2025, 1, 2, 3],
+    "node_list" : [None],
+}
+
+# The dimensions swept when none are given: every app at every bisection bandwidth
+core_dims = ["app", "bw"]
+
+
+# Returns { job number : simulated completion time in seconds } from Ember's output
+def parseJobTimes(text : str):
+    return { int(m.group(1)) : toSeconds(m.group(2), m.group(3)) for m in job_time_re.finditer(text) }
+
+# Returns the number of hosts dragonfly.py built, or None
+def parseHosts(text : str):
+    match = hosts_re.search(text)
+    return int(match.group(1)) if match is not None else None
+
+# Returns { job number : (nodes, groups spanned, fraction of communicating rank pairs between groups) }
+def parsePlacement(text : str):
+    return { int(m.group(1)) : (int(m.group(2)), int(m.group(3)), float(m.group(4)) / 100) for m in placement_re.finditer(text) }
+
+# Ember's name for a motif ("ember.Halo3D26Motif", "Halo3D26") as dragonfly.py adds it ("Halo3D26")
+def motifName(name : str):
+    name = name.split(".")[-1]
+    if name.startswith("Ember"):
+        name = name[len("Ember"):]
+    if name.endswith("Motif"):
+        name = name[:-len("Motif")]
+    return name
+
+# Returns [(motif name, start, end)] in seconds from a motif log, in the order the motifs ran
+def parseMotifLog(text : str, time_base=motif_time_base):
+    return [(motifName(m.group(2)), int(m.group(3)) * time_base, int(m.group(4)) * time_base) for m in motif_log_re.finditer(text)]
+
+# Returns (main motif, iterations per motif, compute seconds per iteration or None) from dragonfly.py's output
+def parseMotifInfo(text : str):
+    match = motif_info_re.search(text)
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2)), float(match.group(3)) * 1e-9 if match.group(3) is not None else None
+
+"""
+    Returns { job number : [(motif name, start, end)] } from the motif logs of a run directory.
+    Ember names the files after dragonfly.py's motiflog-jobN prefix; should it write several for
+    a job, the first in name order is used.
+"""
+def readMotifLogs(rundir : str, time_base=motif_time_base):
+    logs = {}
+    for filename in sorted(glob.glob(os.path.join(rundir, "motiflog-job*"))):
+        job = int(re.match(r"motiflog-job([0-9]+)", os.path.basename(filename)).group(1))
+        if job not in logs:
+            with open(filename) as f:
+                logs[job] = parseMotifLog(f.read(), time_base)
+    return logs
+
+"""
+    Aggregates one job's motif log.
+
+    info : parseMotifInfo() of the run; gives the per-iteration times when every main motif is
+           one iteration (Halo3D26), and estimates how much of them is compute when dragonfly.py
+           knows (Halo3D26's computetime)
+    Returns { "motifs" : { name : { "count", "total", "mean", "max" } },
+              "iterations" : [{ name : seconds }] (main motif and Allreduce, per iteration; empty
+                             when a motif runs several iterations the log cannot tell apart),
+              "total" : seconds from the first start to the last end,
+              "compute", "communication" : seconds of the main motif and Allreduce, or None }
+"""
+def motifSummary(motifs : list, info=None):
+    summary = { "motifs" : {}, "iterations" : [], "total" : None, "compute" : None, "communication" : None }
+    if not motifs:
+        return summary
+    for name, start, end in motifs:
+        stats = summary["motifs"].setdefault(name, { "count" : 0, "total" : 0.0, "mean" : 0.0, "max" : 0.0 })
+        stats["count"] += 1
+        stats["total"] += end - start
+        stats["max"] = max(stats["max"], end - start)
+    for stats in summary["motifs"].values():
+        stats["mean"] = stats["total"] / stats["count"]
+    summary["total"] = max([end for _, _, end in motifs]) - min([start for _, start, _ in motifs])
+
+    if info is not None:
+        main, per_motif, compute = info
+        mains = [end - start for name, start, end in motifs if name == main]
+        allreduces = [end - start for name, start, end in motifs if name == "Allreduce"]
+        # Halo3D26 runs one iteration per motif, each followed by an Allreduce; Sweep3D and FFT3D run all of them in one motif
+        for k, elapsed in enumerate(mains if per_motif == 1 else []):
+            iteration = { main : elapsed }
+            if k < len(allreduces):
+                iteration["Allreduce"] = allreduces[k]
+            summary["iterations"].append(iteration)
+        if compute is not None:
+            busy = sum(mains) + sum(allreduces)
+            summary["compute"] = min(busy, compute * len(mains) * per_motif)
+            summary["communication"] = busy - summary["compute"]
+    return summary
+
+"""
+    One row of a motif breakdown from motifSummary()s (e.g., all jobs of a run): mean seconds in
+    Init and Fini, in the main motif and Allreduce per iteration, and the share of the latter two
+    that is communication (None where the compute time is not known).
+"""
+def motifRow(summaries : list):
+    summaries = [s for s in summaries if s["motifs"]]
+    mean = lambda values: sum(values) / len(values) if values else None
+    per_job = lambda name: mean([s["motifs"][name]["total"] for s in summaries if name in s["motifs"]])
+    iterations = [iteration for s in summaries for iteration in s["iterations"]]
+    main = ([name for name in motif_names if name not in ("Init", "Allreduce", "Fini") and per_job(name) is not None] or [None])[0]
+    busy = [s["compute"] + s["communication"] for s in summaries if s["compute"] is not None]
+    return {
+        "jobs" : len(summaries),
+        "main" : main,
+        "Init" : per_job("Init"),
+        "iteration" : mean([iteration[main] for iteration in iterations if main in iteration]),
+        "Allreduce" : mean([iteration["Allreduce"] for iteration in iterations if "Allreduce" in iteration]),
+        "Fini" : per_job("Fini"),
+        "total" : mean([s["total"] for s in summaries]),
+        "communication" : sum([s["communication"] for s in summaries if s["compute"] is not None]) / sum(busy) if busy and sum(busy) > 0 else None,
+    }
+
+# Header and cells (us, and percent communication) of a motifRow() for printing
+motif_header = ["{:>9}".format("motif"), "{:>10}".format("Init"), "{:>10}".format("iteration"), "{:>10}".format("Allreduce"),
+                "{:>10}".format("Fini"), "{:>12}".format("total"), "{:>6}".format("comm")]
+def motifCells(row : dict):
+    us = lambda value, width: "{:>{}.1f}".format(value * 1e6, width) if value is not None else "{:>{}}".format("-", width)
+    return ["{:>9}".format(row["main"] or "-"), us(row["Init"], 10), us(row["iteration"], 10), us(row["Allreduce"], 10),
+            us(row["Fini"], 10), us(row["total"], 12),
+            "{:>5.1f}%".format(row["communication"] * 100) if row["communication"] is not None else "{:>6}".format("-")]
+
+"""
+    dragonfly.py command line options for a configuration; dimensions set to None keep its default.
+    Options come in network_space order, so the same configuration always gets the same runID().
+"""
+def configArgs(config : dict):
+    args = []
+    for name in sorted(config.keys(), key=lambda name: list(network_space.keys()).index(name)):
+        if config[name] is not None:
+            args += ["--" + name, str(config[name])]
+    return args
+
+"""
+    Runs dragonfly.py with 'options' in 'rundir' and returns the simulated time and the
+    per-job completion times. SST's output goes to rundir/sst.log.
+
+    ranks   : > 1 runs SST in parallel under 'mpirun -np ranks'
+    threads : > 1 runs SST with that many threads per rank (sst -n)
+"""
+def runDragonfly(options : list, rundir : str, script=network_script, sst="sst", ranks=1, threads=1, mpirun="mpirun", timeout=None):
+    os.makedirs(rundir, exist_ok=True)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(os.path.abspath(script)) + os.pathsep + env.get("PYTHONPATH", "")
+    cmd = [sst] + (["-n", str(threads)] if threads > 1 else []) + [os.path.abspath(script), "--"] + [str(x) for x in options]
+    if ranks > 1:
+        cmd = [mpirun, "-np", str(ranks)] + cmd
+
+    timed_out = False
+    logname = os.path.join(rundir, "sst.log")
+    start = time.time()
+    with open(logname, "w") as log:
+        proc = subprocess.Popen(cmd, cwd=rundir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            timed_out = True
+    wall_time = time.time() - start
+
+    with open(logname) as log:
+        text = log.read()
+    return {
+        "options" : [str(x) for x in options],
+        "returncode" : proc.returncode,
+        "timed_out" : timed_out,
+        "sim_time" : parseSimTime(text),
+        "job_times" : parseJobTimes(text),
+        "hosts" : parseHosts(text),
+        "placement" : parsePlacement(text),
+        "motifs" : { job : motifSummary(motifs, parseMotifInfo(text)) for job, motifs in readMotifLogs(rundir).items() },
+        "wall_time" : wall_time,
+        "ranks" : ranks,
+        "threads" : threads,
+    }
+
+"""
+    Like runDragonfly(), but reuses the result of an earlier run with the same options: every
+    run directory is named after runID(options) and keeps its result in result.json. Runs that
+    did not complete are always repeated.
+"""
+def cachedRun(options : list, workdir : str, **kwargs):
+    rundir = os.path.join(workdir, runID(options))
+    resultfile = os.path.join(rundir, "result.json")
+    if os.path.exists(resultfile):
+        with open(resultfile) as f:
+            result = json.load(f)
+        if result["sim_time"] is not None and result["options"] == [str(x) for x in options]:
+            result["job_times"] = { int(job) : t for job, t in result["job_times"].items() }
+            result["placement"] = { int(job) : tuple(p) for job, p in result.get("placement", {}).items() }
+            result["motifs"] = { int(job) : summary for job, summary in result.get("motifs", {}).items() }
+            result["cached"] = True
+            return rundir, result
+    result = runDragonfly(options, rundir, **kwargs)
+    with open(resultfile, "w") as f:
+        json.dump(result, f)
+    result["cached"] = False
+    return rundir, result
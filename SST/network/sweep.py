@@ -0,0 +1,266 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from netlib import *
+
+### USAGE ###
+#
+# Runs dragonfly.py over the cross product of the selected dimensions, writes one row per Ember
+# job (options, the job's simulated completion time, the whole run's simulated time) to a CSV
+# file and prints a table comparing the apps across bisection bandwidths. By default every app
+# is run at every bandwidth; any other dragonfly.py option can be added with --vary or pinned
+# with --set.
+#
+#   $ python3 sweep.py --pool 16
+#   $ python3 sweep.py --vary app --vary bw --vary jobs=2,4,8 --set iters=5
+#   $ python3 sweep.py --set num_groups=9 --ranks 4 --pool 4    # each simulation on 4 MPI ranks
+#
+# The table has one row per configuration apart from the --columns dimension, so the apps are
+# compared per bisection bandwidth by default, or per routing algorithm with e.g.:
+#
+#   $ python3 sweep.py --vary app --vary routing --set bw=quarter --columns routing
+#   $ python3 sweep.py --vary app=halo,fft --vary bw --vary routing=ugal,par --vary adaptive_threshold=1.0,2.0,3.0
+#
+# --compare-allocation runs the same job mix under every allocation policy and adds a table of
+# each job's completion time and the share of its communicating rank pairs placed in different
+# dragonfly groups (estimated by dragonfly.py from the placement, see allocationlib.py):
+#
+#   $ python3 sweep.py --vary app --set bw=half --compare-allocation --node-list mine.txt
+#
+# --motif-log adds a table breaking each configuration's job time down by Ember motif (see
+# motifs.py), showing whether communication or compute dominates at each bandwidth:
+#
+#   $ python3 sweep.py --vary app --vary bw --vary num_groups=5,9 --motif-log
+#
+# SST runs are independent processes, --pool of them at a time; with --ranks each one is also
+# parallel itself (mpirun -np RANKS sst ...), so --pool x --ranks x --threads cores are used.
+# Each run gets its own directory under --workdir, named after a hash of its options, and its
+# result is kept there: repeating a sweep, or overlapping an earlier one, only simulates the
+# configurations that have not completed before (--force re-runs them all).
+#
+
+# Parses DIM or DIM=v1,v2 into (DIM, [values]); 'default' stands for dragonfly.py's default
+def parseDim(spec, space):
+    dim, _, values = spec.partition("=")
+    if dim not in space:
+        print("Error: unknown dimension '{}'. Expected one of {}".format(dim, list(space.keys())))
+        sys.exit(1)
+    if values == "":
+        return dim, space[dim]
+    return dim, [None if v == "default" else v for v in values.split(",")]
+
+# Mean and maximum of a run's per-job completion times, falling back to its simulated time
+def jobSummary(result):
+    times = list(result["job_times"].values())
+    if not times:
+        if result["sim_time"] is None:
+            return None, None
+        times = [result["sim_time"]]
+    return sum(times) / len(times), max(times)
+
+"""
+    Prints mean (max) job completion times with one row per configuration apart from 'column'
+    (e.g., one per app) and one column per value of 'column', with the slowdown relative to its
+    'baseline' value (default: the first value swept).
+"""
+def printTable(results, names, column, baseline=None):
+    others = [n for n in names if n != column]
+    values = []
+    rows = {}
+    for config, rundir, result in results:
+        value = config.get(column)
+        if value not in values:
+            values.append(value)
+        rows.setdefault(tuple(config[n] for n in others), {})[value] = jobSummary(result)
+    order = [str(v) for v in ([None] + list(network_space[column]))]
+    values.sort(key=lambda v: order.index(str(v)) if str(v) in order else len(order))
+    if baseline is None or baseline not in [str(v) for v in values]:
+        baseline = str(values[0])
+    label = lambda v: "default" if v is None else str(v)
+
+    print("")
+    print("Mean (max) job completion time in us, and slowdown relative to --{} {}".format(column, label(None if baseline == "None" else baseline)))
+    widths = [max([10, len(n)] + [len(label(key[i])) for key in rows.keys()]) for i, n in enumerate(others)]
+    print("  ".join(["{:>{}}".format(n, w) for n, w in zip(others, widths)] + ["{:>26}".format(label(v)) for v in values]))
+    for key in sorted(rows.keys(), key=lambda key: [str(v) for v in key]):
+        cells = []
+        base = ([s for v, s in rows[key].items() if str(v) == baseline] or [(None, None)])[0][0]
+        for value in values:
+            mean, peak = rows[key].get(value, (None, None))
+            if mean is None:
+                cells.append("{:>26}".format("-"))
+                continue
+            slowdown = " x{:.2f}".format(mean / base) if base else ""
+            cells.append("{:>26}".format("{:.1f} ({:.1f}){}".format(mean * 1e6, peak * 1e6, slowdown)))
+        print("  ".join(["{:>{}}".format(label(v), w) for v, w in zip(key, widths)] + cells))
+
+"""
+    Prints every job's completion time and estimated share of inter-group traffic, with one row
+    per job of every configuration apart from 'column' and one column per value of 'column'.
+"""
+def printJobTable(results, names, column):
+    others = [n for n in names if n != column]
+    values = []
+    rows = {}
+    for config, rundir, result in results:
+        value = config.get(column)
+        if value not in values:
+            values.append(value)
+        for job in set(result["job_times"].keys()) | set(result["placement"].keys()):
+            placement = result["placement"].get(job)
+            rows.setdefault(tuple(config[n] for n in others) + (job,), {})[value] = (result["job_times"].get(job), placement[2] if placement else None)
+    order = [str(v) for v in ([None] + list(network_space[column]))]
+    values.sort(key=lambda v: order.index(str(v)) if str(v) in order else len(order))
+    label = lambda v: "default" if v is None else str(v)
+
+    print("")
+    print("Job completion time in us (share of communicating rank pairs between groups) per --{}".format(column))
+    widths = [max([10, len(n)] + [len(label(key[i])) for key in rows.keys()]) for i, n in enumerate(others)] + [4]
+    print("  ".join(["{:>{}}".format(n, w) for n, w in zip(others + ["job"], widths)] + ["{:>20}".format(label(v)) for v in values]))
+    for key in sorted(rows.keys(), key=lambda key: [str(v) for v in key[:-1]] + [key[-1]]):
+        cells = []
+        for value in values:
+            job_time, inter_group = rows[key].get(value, (None, None))
+            cell = "{:.1f}".format(job_time * 1e6) if job_time is not None else "-"
+            cell += " ({:.1f}%)".format(inter_group * 100) if inter_group is not None else ""
+            cells.append("{:>20}".format(cell))
+        print("  ".join(["{:>{}}".format(label(v), w) for v, w in zip(key, widths)] + cells))
+
+# Per-motif breakdown (see motifs.py) of every configuration, averaged over its jobs
+def printMotifTable(results, names):
+    widths = [max([10, len(n)] + [len(str(config[n])) for config, _, _ in results]) for n in names]
+    label = lambda v: "default" if v is None else str(v)
+    print("")
+    print("Mean time per job in us: Init, main motif and Allreduce per iteration, Fini; share of the latter two that is communication")
+    print("  ".join(["{:>{}}".format(n, w) for n, w in zip(names, widths)] + motif_header))
+    for config, rundir, result in sorted(results, key=lambda r: [str(r[0][n]) for n in names]):
+        if result.get("motifs"):
+            print("  ".join(["{:>{}}".format(label(config[n]), w) for n, w in zip(names, widths)] + motifCells(motifRow(list(result["motifs"].values())))))
+
+def runOne(options, args):
+    if args.force:
+        rundir = os.path.join(args.workdir, runID(options))
+        result = runDragonfly(options, rundir, sst=args.sst, ranks=args.ranks, threads=args.threads, mpirun=args.mpirun, timeout=args.timeout)
+        with open(os.path.join(rundir, "result.json"), "w") as f:
+            json.dump(result, f)
+        result["cached"] = False
+        return rundir, result
+    return cachedRun(options, args.workdir, sst=args.sst, ranks=args.ranks, threads=args.threads, mpirun=args.mpirun, timeout=args.timeout)
+
+def main(args):
+    if args.pool is None:
+        args.pool = max(1, os.cpu_count() // (args.ranks * args.threads))
+    if args.ranks < 1 or args.threads < 1 or args.pool < 1:
+        print("Error: --pool, --ranks and --threads must be at least 1")
+        sys.exit(1)
+    dims = {}
+    for spec in (args.vary if args.vary else core_dims):
+        dim, values = parseDim(spec, network_space)
+        dims[dim] = values
+    for spec in args.set:
+        dim, values = parseDim(spec, network_space)
+        if len(values) != 1:
+            print("Error: --set takes exactly one value, got '{}'".format(spec))
+            sys.exit(1)
+        dims[dim] = values
+    if args.node_list is not None:
+        dims["node_list"] = [args.node_list]
+    if args.compare_allocation:
+        # The same job mix under every policy; the file policy only when there is a node list to use
+        dims["allocation"] = [p for p in allocation_policies if p != "file" or "node_list" in dims]
+        args.columns = "allocation"
+    # Runs start in their own directory
+    if "node_list" in dims:
+        dims["node_list"] = [os.path.abspath(v) if v is not None else None for v in dims["node_list"]]
+
+    names = list(dims.keys())
+    configs = [dict(zip(names, values)) for values in itertools.product(*[dims[n] for n in names])]
+    print("Sweeping {} configurations over {}, {} at a time on {} rank(s) x {} thread(s)".format(
+          len(configs), names, args.pool, args.ranks, args.threads))
+
+    results = []
+    with ThreadPoolExecutor(max_workers=args.pool) as pool:
+        jobs = {}
+        for config in configs:
+            jobs[pool.submit(runOne, configArgs(config) + (["--motif_log"] if args.motif_log else []), args)] = config
+        for job in as_completed(jobs):
+            config = jobs[job]
+            rundir, result = job.result()
+            results.append((config, rundir, result))
+            if result["sim_time"] is not None:
+                status = "{:.3f} us, {} jobs{}".format(result["sim_time"] * 1e6, len(result["job_times"]), " (cached)" if result["cached"] else "")
+            else:
+                status = "TIMED OUT" if result["timed_out"] else "FAILED, see {}".format(os.path.join(rundir, "sst.log"))
+            print("[{}/{}] {} {}".format(len(results), len(configs), " ".join(configArgs(config)) or "(defaults)", status))
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(names + ["job", "job_time_us", "nodes", "groups", "inter_group", "sim_time_us", "hosts", "wall_time_s", "rundir"])
+        for config, rundir, result in results:
+            values = [config[n] if config[n] is not None else "default" for n in names]
+            sim_time = result["sim_time"] * 1e6 if result["sim_time"] is not None else ""
+            common = [sim_time, result["hosts"], round(result["wall_time"], 2), rundir]
+            jobs = sorted(set(result["job_times"].keys()) | set(result["placement"].keys()))
+            if not jobs:
+                writer.writerow(values + ["", "", "", "", ""] + common)
+            for job in jobs:
+                job_time = result["job_times"][job] * 1e6 if job in result["job_times"] else ""
+                nodes, groups, inter_group = result["placement"].get(job, ("", "", ""))
+                writer.writerow(values + [job, job_time, nodes, groups, "{:.4f}".format(inter_group) if inter_group != "" else ""] + common)
+    print("Wrote {}".format(args.output))
+
+    if args.columns not in names:
+        args.columns = names[-1] if "bw" not in names else "bw"
+    printTable(results, names, args.columns, args.baseline)
+    if args.columns == "allocation":
+        printJobTable(results, names, args.columns)
+    if args.motif_log:
+        printMotifTable(results, names)
+    failed = len([r for r in results if r[2]["sim_time"] is None])
+    missing = len([r for r in results if r[2]["sim_time"] is not None and not r[2]["job_times"]])
+    if missing > 0:
+        print("{} of {} runs printed no per-job completion times; their simulated time is used instead".format(missing, len(results)))
+    if failed > 0:
+        print("{} of {} configurations did not complete".format(failed, len(results)))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--vary', action='append', default=[],
+                    help='Dimension to sweep, DIM or DIM=v1,v2 (repeatable). Default: {}.'.format(" and ".join(core_dims)))
+    ap.add_argument('--set', action='append', default=[],
+                    help='Pin a dimension to one value, DIM=value (repeatable).')
+    ap.add_argument('--pool', type=int, default=None,
+                    help='Number of simulations to run concurrently. Default: the cores divided by --ranks x --threads.')
+    ap.add_argument('--ranks', type=int, default=1,
+                    help='MPI ranks per simulation (mpirun -np RANKS sst ...).')
+    ap.add_argument('--threads', type=int, default=1,
+                    help='SST threads per rank (sst -n THREADS).')
+    ap.add_argument('--workdir', type=str, default='sweep',
+                    help='Directory to hold one run directory per configuration.')
+    ap.add_argument('--output', type=str, default='sweep.csv',
+                    help='CSV file with one row per job of every configuration.')
+    ap.add_argument('--force', action='store_true',
+                    help='Re-run configurations that already completed in --workdir.')
+    ap.add_argument('--columns', type=str, default='bw', choices=list(network_space.keys()),
+                    help='Dimension whose values are the columns of the table, e.g. routing to compare algorithms per app.')
+    ap.add_argument('--baseline', type=str, default=None,
+                    help='Value of --columns the table\'s slowdowns are relative to. Default: the first one swept.')
+    ap.add_argument('--compare-allocation', action='store_true',
+                    help='Run every configuration under each allocation policy and compare them per job.')
+    ap.add_argument('--node-list', type=str, default=None,
+                    help='Node-list file for --allocation file (see allocationlib.py); included in --compare-allocation.')
+    ap.add_argument('--motif-log', action='store_true',
+                    help='Run dragonfly.py with --motif_log and add a per-motif breakdown of every configuration.')
+    ap.add_argument('--sst', type=str, default='sst',
+                    help='SST executable.')
+    ap.add_argument('--mpirun', type=str, default='mpirun',
+                    help='MPI launcher used with --ranks.')
+    ap.add_argument('--timeout', type=float, default=None,
+                    help='Kill any single simulation after this many seconds.')
+    args = ap.parse_args()
+    main(args)
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from allocationlib import *
+
+# 3 groups of 8 endpoints, 2 endpoints per node: group g holds nodes 4g .. 4g + 3
+
+
+def test_linear():
+    assert allocateJobs("linear", [4, 6], 3, 8) == [[0, 1, 2, 3], [4, 5, 6, 7, 8, 9]]
+
+def test_group_packed_best_fit():
+    jobs = allocateJobs("group-packed", [6, 4, 8], 3, 8)
+    assert jobs == [[0, 1, 2, 3, 4, 5], [8, 9, 10, 11], list(range(16, 24))]
+
+def test_group_packed_spills_into_emptiest_groups():
+    jobs = allocateJobs("group-packed", [6, 6, 6, 6], 3, 8)
+    assert jobs[3] == [6, 7, 14, 15, 22, 23]
+
+def test_group_spread():
+    assert allocateJobs("group-spread", [6], 3, 8) == [[0, 1, 8, 9, 16, 17]]
+
+def test_interleaved():
+    assert allocateJobs("interleaved", [4, 4], 3, 8) == [[0, 1, 4, 5], [2, 3, 6, 7]]
+
+def test_random_is_seeded_and_disjoint():
+    jobs = allocateJobs("random", [8, 8], 3, 8, seed=7)
+    assert jobs == allocateJobs("random", [8, 8], 3, 8, seed=7)
+    assert [len(job) for job in jobs] == [8, 8]
+    assert not set(jobs[0]) & set(jobs[1])
+    assert all([job[k] % 2 == 0 and job[k + 1] == job[k] + 1 for job in jobs for k in range(0, 8, 2)])
+
+def test_file(tmp_path):
+    node_list = tmp_path / "nodes.txt"
+    node_list.write_text("# job 0\n16-19\n0, 1 8 9\n")
+    assert allocateJobs("file", [4, 4], 3, 8, node_list=str(node_list)) == [[16, 17, 18, 19], [0, 1, 8, 9]]
+
+def test_file_needs_whole_nodes(tmp_path):
+    node_list = tmp_path / "nodes.txt"
+    node_list.write_text("1-4\n")
+    with pytest.raises(Exception, match="whole nodes"):
+        allocateJobs("file", [4], 3, 8, node_list=str(node_list))
+
+def test_too_many_endpoints():
+    with pytest.raises(Exception, match="need 26 endpoints"):
+        allocateJobs("linear", [20, 6], 3, 8)
+
+def test_unknown_policy():
+    with pytest.raises(Exception, match="unknown allocation policy"):
+        allocateJobs("packed", [4], 3, 8)
+
+def test_inter_group_traffic():
+    # Sweep3D on 2x2 ranks, one rank per endpoint, split over two groups by row
+    assert interGroupTraffic("sweep", 2, [0, 1, 8, 9], 8, 1) == (2, 0.5)
+    assert interGroupTraffic("sweep", 2, [0, 1, 2, 3], 8, 1) == (1, 0.0)
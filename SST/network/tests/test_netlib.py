@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from netlib import *
+
+
+def test_parse_motif_log():
+    text = "0 ember.InitMotif 0 1000\n1 EmberHalo3D26Motif 1000 5000\nAllreduce 5000 6000\n  not a motif line\n"
+    assert parseMotifLog(text) == [("Init", 0.0, 1e-9), ("Halo3D26", 1e-9, 5e-9), ("Allreduce", 5e-9, 6e-9)]
+
+def test_parse_motif_info():
+    assert parseMotifInfo("Motif log: Halo3D26, 1 iteration per motif, 187200 ns compute per iteration") == ("Halo3D26", 1, pytest.approx(187200e-9))
+    assert parseMotifInfo("hosts: 16\nMotif log: FFT3D, 20 iterations per motif\n") == ("FFT3D", 20, None)
+    assert parseMotifInfo("Motif log: FFT3D, 20 iterations per motif, unknown ns compute per iteration") is None
+
+def test_motif_summary_halo_iterations():
+    motifs = [("Init", 0, 1), ("Halo3D26", 1, 5), ("Allreduce", 5, 6), ("Halo3D26", 6, 10), ("Allreduce", 10, 11), ("Fini", 11, 12)]
+    summary = motifSummary(motifs, ("Halo3D26", 1, 3.0))
+    assert summary["iterations"] == [{ "Halo3D26" : 4, "Allreduce" : 1 }, { "Halo3D26" : 4, "Allreduce" : 1 }]
+    assert summary["total"] == 12
+    assert (summary["compute"], summary["communication"]) == (6.0, 4.0)
+    assert motifRow([summary])["iteration"] == 4
+
+def test_motif_summary_multi_iteration_motif_has_no_iterations():
+    summary = motifSummary([("Init", 0, 1), ("FFT3D", 1, 21), ("Fini", 21, 22)], ("FFT3D", 20, None))
+    assert summary["iterations"] == [] and summary["compute"] is None
+    row = motifRow([summary])
+    assert row["main"] == "FFT3D" and row["iteration"] is None
+    assert motifCells(row)[2].strip() == "-"
@@ -4,72 +4,274 @@
 #include <sys/time.h>
 #include <pthread.h>
 #include <string.h>
-#include "data.h"
+#include <stdint.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
 
+// Dataset written by gendata.py (file format in datasetlib.py), loaded by loadDataset()
+#define DATASET_MAGIC "BEAMDATA"
+#define DATASET_VERSION 1
+
+typedef struct {
+	char magic[8];
+	unsigned int version;
+	unsigned int waveformCount;
+	unsigned int sampleCount;
+	unsigned int reserved;
+	double sampleRate;
+	double startTime;
+	double slowness;
+	double kmPerDegree;
+	double backAzimuth;
+} DatasetHeader;
+
+int WAVEFORM_COUNT;
+int SAMPLE_COUNT;
+double SAMPLE_RATE;
+double START_TIME;
+double SLOWNESS;
+double KM_PER_DEGREE;
+double BACK_AZIMUTH;
+double* LATITUDES;
+double* LONGITUDES;
+double** WAVEFORMS;		// One pointer per waveform into the loaded samples
+
+// Samples per tile: 8 KiB of beam stays in the L1 (32 KiB or more) while every waveform streams through it once
+#ifndef BEAM_BLOCK
+#define BEAM_BLOCK 1024
+#endif
+
+// Doubles per 64 B cache line; thread partitions start on a line so no two threads write the same line
+#define LINE_SAMPLES 8
+
+// Bytes per page, for staggering the beams (see allocateBeam)
+#define BEAM_PAGE 4096
+
+// Streaming STA/LTA detector (defined with the detector code below)
+struct StaLta;
+void staltaChunk(struct StaLta* s, const double* samples, int count);
+
+/*
+	Feeds the incoherent beam to a detector in sample order while the threads compute it: the
+	first partition's thread feeds its own tiles as it finishes them, then the other partitions'
+	up to what their threads have finished (ThreadData.done).
+*/
 typedef struct {
-	int type;
-    int startSample;
-    int endSample;
-	double beamStart;
-	double beamEnd;
-    double* beam;
-    double* startTimes;
+	pthread_mutex_t lock;
+	pthread_cond_t advanced;	// Signalled whenever a partition's done moves
+	struct StaLta* detector;
+} Progress;
+
+// Beams of a thread's partition; a beam that is not being computed is NULL
+typedef struct ThreadData {
+	int startSample;
+	int endSample;
+	double* coherent;
+	double* incoherent;
+	int* offsets;
+	int done;					// Beam samples of the partition finished so far (under progress->lock)
+	Progress* progress;			// NULL unless the incoherent beam goes to a detector
+	struct ThreadData* partitions;	// Every partition, for the first one's thread to follow
+	int numThreads;
 } ThreadData;
 
-void* beamSamples(void* args)
+// Reads (or, with useMmap, maps) a dataset and points the globals above at it
+void loadDataset(const char* filename, int useMmap)
 {
-	ThreadData* data = (ThreadData*) args;
-	double* beam = data->beam;
-	double* startTimes = data->startTimes;
+	FILE* file = fopen(filename, "rb");
+	if (file == NULL)
+	{
+		fprintf(stderr, "Failed: could not open dataset %s (write one with gendata.py)\n", filename);
+		exit(1);
+	}
 
-	for (int i = 0; i < WAVEFORM_COUNT; i++)
+	DatasetHeader header;
+	if (fread(&header, sizeof(DatasetHeader), 1, file) != 1
+		|| memcmp(header.magic, DATASET_MAGIC, 8) != 0 || header.version != DATASET_VERSION)
 	{
-		int waveformStartSample;
-		int beamStartSample = data->startSample;
-		if (data->beamStart > startTimes[i])
+		fprintf(stderr, "Failed: %s is not a version %d beam dataset\n", filename, DATASET_VERSION);
+		exit(1);
+	}
+
+	WAVEFORM_COUNT = header.waveformCount;
+	SAMPLE_COUNT = header.sampleCount;
+	SAMPLE_RATE = header.sampleRate;
+	START_TIME = header.startTime;
+	SLOWNESS = header.slowness;
+	KM_PER_DEGREE = header.kmPerDegree;
+	BACK_AZIMUTH = header.backAzimuth;
+
+	// Coordinates, then the waveforms one after another
+	size_t values = (size_t) WAVEFORM_COUNT * (2 + (size_t) SAMPLE_COUNT);
+	double* data = NULL;
+	if (useMmap)
+	{
+		void* map = mmap(NULL, sizeof(DatasetHeader) + values * sizeof(double), PROT_READ, MAP_PRIVATE, fileno(file), 0);
+		if (map == MAP_FAILED)
 		{
-			waveformStartSample = (int) ((data->beamStart - startTimes[i]) * SAMPLE_RATE + 1 + data->startSample); 
+			printf("Dataset: mmap failed, reading %s instead\n", filename);
 		}
 		else
 		{
-			int offset = (int) ((startTimes[i] - data->beamStart) * SAMPLE_RATE + 1);
-			if (data->startSample == 0)
+			data = (double*) ((char*) map + sizeof(DatasetHeader));
+		}
+	}
+
+	if (data == NULL)
+	{
+		if (posix_memalign((void**) &data, LINE_SAMPLES * sizeof(double), values * sizeof(double)) != 0
+			|| fread(data, sizeof(double), values, file) != values)
+		{
+			fprintf(stderr, "Failed: could not read %zu samples from %s\n", values, filename);
+			exit(1);
+		}
+
+		useMmap = 0;
+	}
+
+	fclose(file);
+	LATITUDES = data;
+	LONGITUDES = data + WAVEFORM_COUNT;
+	WAVEFORMS = (double**) malloc(WAVEFORM_COUNT * sizeof(double*));
+	for (int i = 0; i < WAVEFORM_COUNT; i++)
+	{
+		WAVEFORMS[i] = data + 2 * WAVEFORM_COUNT + (size_t) i * SAMPLE_COUNT;
+	}
+
+	printf("Dataset: %s, %d waveforms x %d samples at %g Hz, %.2f MiB (%s)\n", filename, WAVEFORM_COUNT, SAMPLE_COUNT, SAMPLE_RATE,
+		   values * sizeof(double) / 1048576.0, useMmap ? "mapped" : "read");
+}
+
+// Sample of a waveform (starting at startTime) that lines up with the beam's first sample, truncated plus one as beam always has
+int waveformOffset(double startTime, double beamStart)
+{
+	return (int) ((beamStart - startTime) * SAMPLE_RATE + 1);
+}
+
+// First sample of thread t's partition: balanced to within a cache line, aligned to one
+int partitionStart(int t, int numThreads, int length)
+{
+	if (t >= numThreads)
+	{
+		return length;
+	}
+
+	long long start = (long long) length * t / numThreads;
+	return (int) (start - start % LINE_SAMPLES);
+}
+
+void* beamSamples(void* args)
+{
+	ThreadData* data = (ThreadData*) args;
+	double* restrict coherent = data->coherent;
+	double* restrict incoherent = data->incoherent;
+
+	for (int block = data->startSample; block < data->endSample; block += BEAM_BLOCK)
+	{
+		int blockEnd = block + BEAM_BLOCK < data->endSample ? block + BEAM_BLOCK : data->endSample;
+		for (int i = 0; i < WAVEFORM_COUNT; i++)
+		{
+			const double* restrict waveform = WAVEFORMS[i] + data->offsets[i];
+			if (coherent != NULL && incoherent != NULL)
+			{
+				// Fused: both beams from one read of the waveform
+				for (int j = block; j < blockEnd; j++)
+				{
+					double sample = waveform[j];
+					coherent[j] += sample;
+					incoherent[j] += fabs(sample);
+				}
+			}
+			else if (incoherent != NULL)
 			{
-				waveformStartSample = 0;
-				beamStartSample = offset;
+				for (int j = block; j < blockEnd; j++)
+				{
+					incoherent[j] += fabs(waveform[j]);
+				}
 			}
-			else 
+			else
 			{
-				waveformStartSample = data->startSample - offset;
+				for (int j = block; j < blockEnd; j++)
+				{
+					coherent[j] += waveform[j];
+				}
 			}
 		}
 
-		for (int j = beamStartSample; j < data->endSample; j++)
+		// Average the tile while it is still in the cache
+		for (int j = block; coherent != NULL && j < blockEnd; j++)
+		{
+			coherent[j] /= WAVEFORM_COUNT;
+		}
+
+		for (int j = block; incoherent != NULL && j < blockEnd; j++)
+		{
+			incoherent[j] /= WAVEFORM_COUNT;
+		}
+
+		if (data->progress != NULL && data == data->partitions)
+		{
+			staltaChunk(data->progress->detector, incoherent + block, blockEnd - block);
+		}
+		else if (data->progress != NULL)
+		{
+			pthread_mutex_lock(&data->progress->lock);
+			data->done = blockEnd;
+			pthread_cond_broadcast(&data->progress->advanced);
+			pthread_mutex_unlock(&data->progress->lock);
+		}
+	}
+
+	// The first partition is fed; follow the others in order as their tiles finish
+	for (int t = 1; data->progress != NULL && data == data->partitions && t < data->numThreads; t++)
+	{
+		ThreadData* partition = &data->partitions[t];
+		int fed = partition->startSample;
+		while (fed < partition->endSample)
 		{
-			double sample = WAVEFORMS[i][waveformStartSample + j];
-			if (data->type == 2)
+			pthread_mutex_lock(&data->progress->lock);
+			while (partition->done == fed)
 			{
-				sample = fabs(sample);
+				pthread_cond_wait(&data->progress->advanced, &data->progress->lock);
 			}
 
-			beam[beamStartSample + j] += sample;
+			int done = partition->done;
+			pthread_mutex_unlock(&data->progress->lock);
+			staltaChunk(data->progress->detector, incoherent + fed, done - fed);
+			fed = done;
 		}
 	}
 
-	for (int i = data->startSample; i < data->endSample; i++)
+	return NULL;
+}
+
+// Serial beam, one sample at a time over every waveform, to check the parallel one against
+double* referenceBeam(int type, int length, int* offsets)
+{
+	double* beam = (double*) malloc(length * sizeof(double));
+	for (int j = 0; j < length; j++)
 	{
-		beam[i] /= WAVEFORM_COUNT;
+		double sum = 0.0;
+		for (int i = 0; i < WAVEFORM_COUNT; i++)
+		{
+			double sample = WAVEFORMS[i][offsets[i] + j];
+			sum += type == 2 ? fabs(sample) : sample;
+		}
+
+		beam[j] = sum / WAVEFORM_COUNT;
 	}
 
-	return NULL;
+	return beam;
 }
 
-void beam( int type, int* length, double** beam, int numThreads )
+// Time-shifts the waveforms and returns the sample of each that lines up with the beam's first; sets the beam length
+int* beamWindow( int* length )
 {
 	double latSum = 0.0;
     double lonSum = 0.0;
-	double startTime = 1708968343.0;
-	double endTime = 1708969543.025;
+	double startTime = START_TIME;
+	double endTime = START_TIME + (SAMPLE_COUNT - 1) / SAMPLE_RATE;
 	printf("StartTime: %f, EndTime: %f, Length: %f, SampleCount: %d\n", startTime, endTime, (endTime - startTime), SAMPLE_COUNT);
     for (int i = 0; i < WAVEFORM_COUNT; i++)
     {
@@ -111,44 +313,143 @@ void beam( int type, int* length, double** beam, int numThreads )
 
     printf("Beam start: %f, Beam end: %f, length: %f\n", beamStart, beamEnd, (beamEnd - beamStart));
     *length = (int) ((beamEnd - beamStart) * SAMPLE_RATE + 1);
-    *beam = (double*) calloc(*length, sizeof(double));
 
-	if (numThreads == 0)
+	// Every waveform starts at or before the beam, so each is read from a fixed offset
+	int *offsets = (int*) malloc(WAVEFORM_COUNT * sizeof(int));
+	for (int i = 0; i < WAVEFORM_COUNT; i++)
+	{
+		offsets[i] = waveformOffset(shiftedStartTimes[i], beamStart);
+
+		// The +1 can reach one sample past a waveform's end; end the beam where the data does
+		if (offsets[i] + *length > SAMPLE_COUNT)
+		{
+			*length = SAMPLE_COUNT - offsets[i];
+		}
+	}
+
+	if (*length <= 0)
 	{
-		ThreadData threadData[1];
-		threadData[0].startSample = 0;
-		threadData[0].endSample = *length;
-		threadData[0].beamStart = beamStart;
-		threadData[0].beamEnd = beamEnd;
-		threadData[0].beam = *beam;
-		threadData[0].startTimes = shiftedStartTimes;
-		beamSamples(threadData);
+		fprintf(stderr, "Failed: the waveforms are shorter than the station shifts, there is no beam (length %d)\n", *length);
+		exit(1);
+	}
+
+	free(shiftedStartTimes);
+	free(shiftedEndTimes);
+	return offsets;
+}
+
+/*
+	Line aligned, so partitions that start on a line do not share one. Beam 'stagger' starts
+	stagger * 2 KiB into its page: the fused beams write the same sample of both at once, and
+	at the same page offset those stores would compete for L1 sets and alias (4 KiB apart) in
+	the store buffer, which made the fused pass slower than two separate ones.
+*/
+double* allocateBeam(int length, int stagger)
+{
+	char* block;
+	if (posix_memalign((void**) &block, BEAM_PAGE, length * sizeof(double) + BEAM_PAGE) != 0)
+	{
+		fprintf(stderr, "Failed: could not allocate a beam of %d samples\n", length);
+		exit(1);
 	}
-	else 
+
+	double* beam = (double*) (block + (stagger * BEAM_PAGE / 2) % BEAM_PAGE);
+	memset(beam, 0, length * sizeof(double));
+	return beam;
+}
+
+void freeBeam(double* beam)
+{
+	free((void*) ((uintptr_t) beam & ~(uintptr_t) (BEAM_PAGE - 1)));
+}
+
+// Bit-for-bit comparison of a beam with the serial reference; returns the number of samples that differ
+int checkBeam(int type, int length, int* offsets, double* beam, int numThreads)
+{
+	int mismatches = 0;
+	double* reference = referenceBeam(type, length, offsets);
+	for (int j = 0; j < length; j++)
 	{
-		pthread_t threads[numThreads];
-		ThreadData threadData[numThreads];
-		int samplesPerThread = *length / numThreads;
-		for (int t = 0; t < numThreads; t++)
-		{ 
-			threadData[t].startSample = t == 0 ? 0 : t * samplesPerThread + 1;
-			threadData[t].endSample = t == numThreads - 1 ? *length : (t + 1) * samplesPerThread + 1;
-			threadData[t].beamStart = beamStart;
-			threadData[t].beamEnd = beamEnd;
-			threadData[t].beam = *beam;
-			threadData[t].startTimes = shiftedStartTimes;
-			
-			pthread_create(&threads[t], NULL, beamSamples, (void*) &threadData);
+		if (memcmp(&reference[j], &beam[j], sizeof(double)) != 0)
+		{
+			mismatches++;
 		}
+	}
+
+	printf("Reference check (type %d, %d threads): %s (%d of %d samples differ)\n", type, numThreads,
+		   mismatches == 0 ? "identical" : "FAILED", mismatches, length);
+	free(reference);
+	return mismatches;
+}
+
+/*
+	Computes beam 'type' over the window from beamWindow(): 1 = coherent into *coherent,
+	2 = incoherent into *incoherent, 3 = both in one pass over the waveforms (fused).
+	A detector (may be NULL) is fed the incoherent beam as it is computed.
+	Returns the number of beam samples that differ from the reference (0 unless check is set).
+*/
+int beam( int type, int length, int* offsets, double** coherent, double** incoherent, int numThreads, struct StaLta* detector, int check )
+{
+	*coherent = type != 2 ? allocateBeam(length, 0) : NULL;
+	*incoherent = type != 1 ? allocateBeam(length, 1) : NULL;
+
+	// The calling thread computes the first partition, so numThreads threads do the work
+	if (numThreads < 1)
+	{
+		numThreads = 1;
+	}
+
+	Progress progress;
+	if (detector != NULL && *incoherent != NULL)
+	{
+		pthread_mutex_init(&progress.lock, NULL);
+		pthread_cond_init(&progress.advanced, NULL);
+		progress.detector = detector;
+	}
 
-		for (int t = 0; t < numThreads; t++)
+	pthread_t threads[numThreads];
+	ThreadData threadData[numThreads];
+	for (int t = 0; t < numThreads; t++)
+	{
+		threadData[t].startSample = partitionStart(t, numThreads, length);
+		threadData[t].endSample = partitionStart(t + 1, numThreads, length);
+		threadData[t].coherent = *coherent;
+		threadData[t].incoherent = *incoherent;
+		threadData[t].offsets = offsets;
+		threadData[t].done = threadData[t].startSample;
+		threadData[t].progress = detector != NULL && *incoherent != NULL ? &progress : NULL;
+		threadData[t].partitions = threadData;
+		threadData[t].numThreads = numThreads;
+		if (t > 0)
 		{
-			pthread_join(threads[t], NULL);
+			pthread_create(&threads[t], NULL, beamSamples, (void*) &threadData[t]);
 		}
 	}
 
-	free(shiftedStartTimes);
-	free(shiftedEndTimes);
+	beamSamples(&threadData[0]);
+	for (int t = 1; t < numThreads; t++)
+	{
+		pthread_join(threads[t], NULL);
+	}
+
+	if (threadData[0].progress != NULL)
+	{
+		pthread_mutex_destroy(&progress.lock);
+		pthread_cond_destroy(&progress.advanced);
+	}
+
+	int mismatches = 0;
+	if (check && *coherent != NULL)
+	{
+		mismatches += checkBeam(1, length, offsets, *coherent, numThreads);
+	}
+
+	if (check && *incoherent != NULL)
+	{
+		mismatches += checkBeam(2, length, offsets, *incoherent, numThreads);
+	}
+
+	return mismatches;
 }
 
 void maxAndAverage(int waveformLength, double *waveform, double* max, double* average)
@@ -165,7 +466,55 @@ void maxAndAverage(int waveformLength, double *waveform, double* max, double* av
 	*average /= waveformLength;
 }
 
-int stalta(int staLength, int ltaLength, int waveformLength, double *waveform, double threshold)
+// One line per beam, for host-side checks (beamref.py check)
+void printBeam(int type, int length, double* beam)
+{
+	double max, average;
+	maxAndAverage(length, beam, &max, &average);
+	printf("%s beam: %d samples, max %.17g, average %.17g\n", type == 2 ? "Incoherent" : "Coherent", length, max, average);
+}
+
+// Signal boundaries found by a detector: signal k runs from starts[k] to ends[k] (-1 while it has not ended)
+typedef struct {
+	int count;
+	int capacity;
+	int* starts;
+	int* ends;
+} Signals;
+
+void signalStart(Signals* signals, int i)
+{
+	if (signals->count == signals->capacity)
+	{
+		signals->capacity = signals->capacity == 0 ? 16 : 2 * signals->capacity;
+		signals->starts = (int*) realloc(signals->starts, signals->capacity * sizeof(int));
+		signals->ends = (int*) realloc(signals->ends, signals->capacity * sizeof(int));
+	}
+
+	signals->starts[signals->count] = i;
+	signals->ends[signals->count] = -1;
+	signals->count++;
+}
+
+void signalEnd(Signals* signals, int i)
+{
+	signals->ends[signals->count - 1] = i;
+}
+
+void printSignals(Signals* signals)
+{
+	for (int k = 0; k < signals->count; k++)
+	{
+		printf("Signal found starting at: %d\n", signals->starts[k]);
+		if (signals->ends[k] >= 0)
+		{
+			printf("Signal ended at: %d\n", signals->ends[k]);
+		}
+	}
+}
+
+// Reference STA/LTA: both window sums from scratch at every sample, O(n * ltaLength)
+int staltaReference(int staLength, int ltaLength, int waveformLength, double *waveform, double threshold, Signals* signals)
 {
 	int inSignal = 0;
 	int numSignals = 0;
@@ -189,14 +538,14 @@ int stalta(int staLength, int ltaLength, int waveformLength, double *waveform, d
 		double value = sta / lta;
 		if (!inSignal && value > threshold)
 		{
-			printf("Signal found starting at: %d\n", i);
+			signalStart(signals, i);
 			inSignal = 1;
 			numSignals++;
 		}
 
 		if (inSignal && value <= threshold)
 		{
-			printf("Signal ended at: %d\n", i);
+			signalEnd(signals, i);
 			inSignal = 0;
 		}
 	}
@@ -204,39 +553,292 @@ int stalta(int staLength, int ltaLength, int waveformLength, double *waveform, d
 	return numSignals;
 }
 
+// STA/LTA detector run on the incoherent beam (-d)
+#define STA_SECONDS 1.0
+#define LTA_SECONDS 30.0
+#define STALTA_THRESHOLD 3.0
+
+// Samples between exact recomputations of the window sums, in multiples of the LTA window
+#define STALTA_RESYNC 16
+
+/*
+	Streaming STA/LTA detector with the same windows as staltaReference(): at sample i the STA is
+	the sum of samples i - staLength .. i over staLength, the LTA the sum of i - ltaLength .. i over
+	ltaLength. Both sums slide by one sample in O(1), so the waveform can be fed in chunks of any
+	size as it is produced (staltaChunk, called by beamSamples). The sums are recomputed in order every STALTA_RESYNC LTA
+	windows, so rounding cannot drift away from the reference.
+*/
+typedef struct StaLta {
+	int staLength;
+	int ltaLength;
+	double threshold;
+	double* history;	// Last ltaLength + 1 samples, a ring buffer
+	int slot;			// Where the next sample goes in history
+	int position;		// Samples seen so far
+	int sinceResync;
+	double staSum;
+	double ltaSum;
+	int inSignal;
+	Signals signals;
+} StaLta;
+
+void staltaInit(StaLta* s, int staLength, int ltaLength, double threshold)
+{
+	memset(s, 0, sizeof(StaLta));
+	s->staLength = staLength;
+	s->ltaLength = ltaLength;
+	s->threshold = threshold;
+	s->history = (double*) calloc(ltaLength + 1, sizeof(double));
+	s->sinceResync = STALTA_RESYNC * (ltaLength + 1) - 1;	// Exact sums at the first full window
+}
+
+void staltaFree(StaLta* s)
+{
+	free(s->history);
+	free(s->signals.starts);
+	free(s->signals.ends);
+}
+
+// Recomputes both sums from the history, oldest sample first (the reference's order)
+void staltaResync(StaLta* s)
+{
+	int size = s->ltaLength + 1;
+	s->staSum = 0.0;
+	s->ltaSum = 0.0;
+	for (int k = 0; k < size; k++)
+	{
+		double x = s->history[(s->slot + k) % size];
+		s->ltaSum += x;
+		if (k >= s->ltaLength - s->staLength)
+		{
+			s->staSum += x;
+		}
+	}
+
+	s->sinceResync = 0;
+}
+
+void staltaChunk(StaLta* s, const double* samples, int count)
+{
+	int size = s->ltaLength + 1;
+	int staSlot = s->slot - (s->staLength + 1);	// Sample leaving the STA window
+	if (staSlot < 0)
+	{
+		staSlot += size;
+	}
+
+	for (int k = 0; k < count; k++)
+	{
+		int i = s->position++;
+		double x = samples[k];
+		if (i >= size)
+		{
+			s->ltaSum -= s->history[s->slot];
+		}
+
+		if (i > s->staLength)
+		{
+			s->staSum -= s->history[staSlot];
+		}
+
+		s->history[s->slot] = x;
+		s->staSum += x;
+		s->ltaSum += x;
+		s->slot = s->slot + 1 == size ? 0 : s->slot + 1;
+		staSlot = staSlot + 1 == size ? 0 : staSlot + 1;
+		if (i < s->ltaLength)
+		{
+			continue;
+		}
+
+		if (++s->sinceResync >= STALTA_RESYNC * size)
+		{
+			staltaResync(s);
+		}
+
+		double value = (s->staSum / s->staLength) / (s->ltaSum / s->ltaLength);
+		if (!s->inSignal && value > s->threshold)
+		{
+			signalStart(&s->signals, i);
+			s->inSignal = 1;
+		}
+
+		if (s->inSignal && value <= s->threshold)
+		{
+			signalEnd(&s->signals, i);
+			s->inSignal = 0;
+		}
+	}
+}
+
+// Sets up the detector for a beam of 'length' samples; returns 0 (and says why) if the beam is too short for it
+int detectorInit(StaLta* detector, int length)
+{
+	int staLength = (int) (STA_SECONDS * SAMPLE_RATE);
+	int ltaLength = (int) (LTA_SECONDS * SAMPLE_RATE);
+	if (length <= ltaLength)
+	{
+		printf("STA/LTA: beam of %d samples is shorter than the LTA window (%d samples)\n", length, ltaLength);
+		return 0;
+	}
+
+	staltaInit(detector, staLength, ltaLength, STALTA_THRESHOLD);
+	return 1;
+}
+
+/*
+	Prints the signals the detector found while beam() fed it 'waveform' (the incoherent beam).
+	With check set, also runs staltaReference() over the finished beam and compares the
+	boundaries; returns the number of boundaries that differ (0 unless check is set).
+*/
+int detectSignals(StaLta* detector, int length, double* waveform, int check)
+{
+	int staLength = detector->staLength;
+	int ltaLength = detector->ltaLength;
+	printSignals(&detector->signals);
+	printf("STA/LTA: %d signals (STA %d, LTA %d samples, threshold %.2f)\n", detector->signals.count, staLength, ltaLength, STALTA_THRESHOLD);
+
+	int mismatches = 0;
+	if (check)
+	{
+		Signals reference = { 0, 0, NULL, NULL };
+		staltaReference(staLength, ltaLength, length, waveform, STALTA_THRESHOLD, &reference);
+		int count = reference.count > detector->signals.count ? reference.count : detector->signals.count;
+		for (int k = 0; k < count; k++)
+		{
+			if (k >= reference.count || k >= detector->signals.count
+				|| reference.starts[k] != detector->signals.starts[k] || reference.ends[k] != detector->signals.ends[k])
+			{
+				if (mismatches++ < 10)
+				{
+					printf("  signal %d: reference %d-%d, streaming %d-%d\n", k,
+						   k < reference.count ? reference.starts[k] : -1, k < reference.count ? reference.ends[k] : -1,
+						   k < detector->signals.count ? detector->signals.starts[k] : -1, k < detector->signals.count ? detector->signals.ends[k] : -1);
+				}
+			}
+		}
+
+		printf("STA/LTA check: %s (%d of %d signals differ from the reference)\n", mismatches == 0 ? "identical" : "FAILED", mismatches, count);
+		free(reference.starts);
+		free(reference.ends);
+	}
+
+	staltaFree(detector);
+	return mismatches;
+}
+
 int main(int argc, char* argv[])
 {
-	if (argc != 3)
+	// -t THREADS [-f DATASET] [-m] [-s] [-o BEAMS] [-d] [-c]
+	//   -f: dataset written by gendata.py, default beam.dat
+	//   -m: map the dataset instead of reading it into memory
+	//   -s: compute both beams in a single pass over the waveforms (fused), halving the waveform traffic
+	//   -d: run the STA/LTA detector on the incoherent beam, one beam tile at a time
+	//   -o: write both beams to a file, coherent then incoherent, as doubles
+	//   -c: check the beams (and the detector) against the serial references; doubles the work, off for timed runs
+	int numThreads = -1;
+	const char* dataset = "beam.dat";
+	int useMmap = 0;
+	int fused = 0;
+	const char* beamFile = NULL;
+	int detect = 0;
+	int check = 0;
+	for (int a = 1; a < argc; a++)
 	{
-		fprintf(stderr, "Failed: expected 2 arguments, received %d", argc - 1);
-		exit(1);
+		if (strcmp("-t", argv[a]) == 0 && a + 1 < argc)
+		{
+			numThreads = atoi(argv[++a]);
+		}
+		else if (strcmp("-f", argv[a]) == 0 && a + 1 < argc)
+		{
+			dataset = argv[++a];
+		}
+		else if (strcmp("-o", argv[a]) == 0 && a + 1 < argc)
+		{
+			beamFile = argv[++a];
+		}
+		else if (strcmp("-m", argv[a]) == 0)
+		{
+			useMmap = 1;
+		}
+		else if (strcmp("-s", argv[a]) == 0)
+		{
+			fused = 1;
+		}
+		else if (strcmp("-d", argv[a]) == 0)
+		{
+			detect = 1;
+		}
+		else if (strcmp("-c", argv[a]) == 0)
+		{
+			check = 1;
+		}
+		else
+		{
+			fprintf(stderr, "Failed: unexpected argument: %s\n", argv[a]);
+			exit(1);
+		}
 	}
-	
-	if (strcmp("-t", argv[1]) != 0)
+
+	if (numThreads < 0)
 	{
-		fprintf(stderr, "Failed: unexpected argument: %s\n", argv[1]);
+		fprintf(stderr, "Failed: expected -t THREADS [-f DATASET] [-m] [-s] [-o BEAMS] [-d] [-c]\n");
 		exit(1);
 	}
 
-	int numThreads = atoi(argv[2]);
+	loadDataset(dataset, useMmap);
 
 	struct timeval start;
     gettimeofday(&start, NULL);
 
-	int coherentLength;
+	// Both beams share the window; separately, each streams every waveform through memory once
+	int length;
+	int* offsets = beamWindow(&length);
 	double *coherentBeam;
-	beam(1, &coherentLength, &coherentBeam, numThreads - 1);
-
-	int incoherentLength;
 	double *incoherentBeam;
-	beam(2, &incoherentLength, &incoherentBeam, numThreads - 1);
+	double *unused;
+	int mismatches;
+	StaLta detector;
+	detect = detect && detectorInit(&detector, length);
+	printf("Beams: %s\n", fused ? "fused, one pass over the waveforms" : "separate, one pass per beam");
+	if (fused)
+	{
+		mismatches = beam(3, length, offsets, &coherentBeam, &incoherentBeam, numThreads, detect ? &detector : NULL, check);
+	}
+	else
+	{
+		mismatches = beam(1, length, offsets, &coherentBeam, &unused, numThreads, NULL, check);
+		mismatches += beam(2, length, offsets, &unused, &incoherentBeam, numThreads, detect ? &detector : NULL, check);
+	}
 
-	free(coherentBeam);
-	free(incoherentBeam);
+	if (detect)
+	{
+		mismatches += detectSignals(&detector, length, incoherentBeam, check);
+	}
+
+	printBeam(1, length, coherentBeam);
+	printBeam(2, length, incoherentBeam);
+	if (beamFile != NULL)
+	{
+		FILE* file = fopen(beamFile, "wb");
+		if (file == NULL || fwrite(coherentBeam, sizeof(double), length, file) != (size_t) length
+			|| fwrite(incoherentBeam, sizeof(double), length, file) != (size_t) length)
+		{
+			fprintf(stderr, "Failed: could not write the beams to %s\n", beamFile);
+			exit(1);
+		}
+
+		fclose(file);
+	}
+
+	free(offsets);
+	freeBeam(coherentBeam);
+	freeBeam(incoherentBeam);
 
     struct timeval stop;
     gettimeofday(&stop, NULL);
     long micros = (stop.tv_sec - start.tv_sec) * 1000000 + stop.tv_usec - start.tv_usec;
     float seconds = (float) micros / 1000000.0;
     printf("Total run time: %lu us (%.6f s)\n", micros, seconds);
-}
\ No newline at end of file
+	return mismatches == 0 ? 0 : 1;
+}
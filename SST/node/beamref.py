@@ -0,0 +1,290 @@
+import argparse
+import os
+import re
+import struct
+import sys
+import time
+
+from runlib import *
+from datasetlib import *
+
+try:
+    import numpy as np
+except ImportError:
+    # Only this tool needs numpy; main() reports it
+    np = None
+
+### USAGE ###
+#
+# Host-side NumPy reference for beam.c, vectorized across waveforms and samples. It checks what
+# the RISC-V binary printed (or wrote with -o) against the reference, and benchmarks the
+# reference natively to put the simulated node's bandwidth next to the algorithm's own needs.
+#
+#   $ python3 beamref.py check sweep/0123456789ab/stdout-100        # beam's printed results (dataset taken from the output)
+#   $ ./beam -t 8 -f beam.dat -d -o beams.bin > out.txt
+#   $ python3 beamref.py check out.txt --beams beams.bin             # and every beam sample
+#   $ python3 beamref.py bench --working-set 16MiB --rundir sweep/0123456789ab
+#
+# bench reports, per output sample, the bytes beam.c must move (every waveform sample read once,
+# the beam written once; the cache-blocked beam.c achieves this) and the flops it does, so the
+# arithmetic intensity is known. Each --rundir's simulated time of beam's timed region then gives
+# the bandwidth the simulated node sustained. The untiled figure is what beam.c moved before
+# cache blocking, with the beam re-read and re-written for every waveform.
+#
+
+# beam.c's STA/LTA settings (STA_SECONDS, LTA_SECONDS, STALTA_THRESHOLD); beam's output overrides them
+stalta_defaults = { "sta" : 1.0, "lta" : 30.0, "threshold" : 3.0 }
+
+dataset_line_re = re.compile(r"^Dataset: (.*), ([0-9]+) waveforms x ([0-9]+) samples", re.M)
+beam_line_re = re.compile(r"^(Coherent|Incoherent) beam: ([0-9]+) samples, max (\S+), average (\S+)", re.M)
+signal_re = re.compile(r"^Signal (found starting|ended) at: ([0-9]+)", re.M)
+fused_re = re.compile(r"^Beams: fused", re.M)
+stalta_re = re.compile(r"^STA/LTA: [0-9]+ signals \(STA ([0-9]+), LTA ([0-9]+) samples, threshold ([0-9.]+)\)", re.M)
+beam_types = { "Coherent" : 1, "Incoherent" : 2 }
+
+# Header, latitudes, longitudes and the waveforms (stations x samples) of a dataset file
+def loadDataset(filename):
+    if not os.path.exists(filename):
+        print("Error: dataset '{}' not found".format(filename))
+        sys.exit(1)
+    header = readHeader(filename)
+    stations = header["stations"]
+    data = np.fromfile(filename, dtype="<f8", offset=struct.calcsize(header_format), count=stations * (2 + header["samples"]))
+    return header, data[:stations], data[stations:2 * stations], data[2 * stations:].reshape(stations, header["samples"])
+
+"""
+    beam.c's beam window: the beam's length in samples and the sample of each waveform that lines
+    up with its first sample. Computed in the same order and with the same rounding as beam.c.
+"""
+def beamWindow(header, latitudes, longitudes):
+    samples = header["samples"]
+    rate = header["sample_rate"]
+    shifts = stationShifts(latitudes.tolist(), longitudes.tolist(), header["slowness"], header["km_per_degree"], header["back_azimuth"])
+    start_time = header["start_time"]
+    end_time = start_time + (samples - 1) / rate
+    beam_start = max([start_time + shift for shift in shifts])
+    beam_end = min([end_time + shift for shift in shifts])
+    offsets = [int((beam_start - (start_time + shift)) * rate + 1) for shift in shifts]
+    length = min([int((beam_end - beam_start) * rate + 1)] + [samples - offset for offset in offsets])
+    if length <= 0:
+        print("Error: the waveforms are shorter than the station shifts, there is no beam (length {})".format(length))
+        sys.exit(1)
+    return length, np.array(offsets)
+
+# Coherent (type 1) or incoherent (type 2, absolute values) beam, 'block' samples of every waveform at a time
+def referenceBeam(waveforms, offsets, length, beam_type, block=1 << 16):
+    rows = np.arange(waveforms.shape[0])[:, None]
+    beam = np.empty(length)
+    for start in range(0, length, block):
+        samples = waveforms[rows, offsets[:, None] + np.arange(start, min(start + block, length))]
+        if beam_type == 2:
+            samples = np.abs(samples)
+        beam[start:start + samples.shape[1]] = samples.sum(axis=0) / waveforms.shape[0]
+    return beam
+
+# Both beams from one gather of the waveforms (beam -s)
+def referenceFused(waveforms, offsets, length, block=1 << 16):
+    rows = np.arange(waveforms.shape[0])[:, None]
+    coherent = np.empty(length)
+    incoherent = np.empty(length)
+    for start in range(0, length, block):
+        samples = waveforms[rows, offsets[:, None] + np.arange(start, min(start + block, length))]
+        coherent[start:start + samples.shape[1]] = samples.sum(axis=0) / waveforms.shape[0]
+        incoherent[start:start + samples.shape[1]] = np.abs(samples).sum(axis=0) / waveforms.shape[0]
+    return coherent, incoherent
+
+"""
+    STA/LTA with beam.c's windows (at sample i, the sum of samples i - sta .. i over sta and of
+    i - lta .. i over lta), from prefix sums. Returns [(start, end)], end = -1 if the signal
+    has not ended.
+"""
+def referenceStaLta(waveform, sta, lta, threshold):
+    if len(waveform) <= lta:
+        return []
+    prefix = np.concatenate([[0.0], np.cumsum(waveform)])
+    i = np.arange(lta, len(waveform))
+    ratio = ((prefix[i + 1] - prefix[i - sta]) / sta) / ((prefix[i + 1] - prefix[i - lta]) / lta)
+    above = np.concatenate([[False], ratio > threshold, [False]])
+    edges = np.flatnonzero(above[1:] != above[:-1]) + lta
+    return [(int(start), int(end) if end < len(waveform) else -1) for start, end in zip(edges[0::2], edges[1::2])]
+
+# Signal boundaries printed by beam -d, as [(start, end)]
+def parseSignals(text):
+    signals = []
+    for match in signal_re.finditer(text):
+        if match.group(1) == "found starting":
+            signals.append((int(match.group(2)), -1))
+        elif signals:
+            signals[-1] = (signals[-1][0], int(match.group(2)))
+    return signals
+
+"""
+    Bytes beam.c moves and flops it does per output sample, for 'stations' waveforms:
+        beams     : both beams, every waveform sample read once per beam and the beam written once
+        fused     : both beams in one pass (beam -s), every waveform sample read once
+        untiled   : both beams with the beam re-read and re-written for every waveform
+        stalta    : the detector, reading the incoherent beam once
+"""
+def sampleCosts(stations):
+    return {
+        "coherent" : { "bytes" : 8 * stations + 8, "flops" : stations + 1 },
+        "incoherent" : { "bytes" : 8 * stations + 8, "flops" : 2 * stations + 1 },
+        "beams" : { "bytes" : 2 * (8 * stations + 8), "flops" : 3 * stations + 2 },
+        "fused" : { "bytes" : 8 * stations + 16, "flops" : 3 * stations + 2 },
+        "untiled" : { "bytes" : 2 * (24 * stations + 16), "flops" : 3 * stations + 2 },
+        "stalta" : { "bytes" : 8, "flops" : 7 },
+    }
+
+def check(args):
+    with open(args.output) as f:
+        text = f.read()
+    dataset = args.dataset
+    if dataset is None:
+        match = dataset_line_re.search(text)
+        if match is None:
+            print("Error: no 'Dataset:' line in '{}', give the dataset with --dataset".format(args.output))
+            sys.exit(1)
+        # beam ran in the output's directory
+        dataset = os.path.join(os.path.dirname(os.path.abspath(args.output)), match.group(1))
+    header, latitudes, longitudes, waveforms = loadDataset(dataset)
+    length, offsets = beamWindow(header, latitudes, longitudes)
+    beams = { beam_type : referenceBeam(waveforms, offsets, length, beam_type) for beam_type in [1, 2] }
+    print("Dataset: {}, {} stations x {} samples, beam of {} samples".format(dataset, header["stations"], header["samples"], length))
+
+    problems = 0
+    printed = list(beam_line_re.finditer(text))
+    if not printed:
+        print("Error: no beam results in '{}' (did beam complete?)".format(args.output))
+        sys.exit(1)
+    for match in printed:
+        beam = beams[beam_types[match.group(1)]]
+        values = { "samples" : (int(match.group(2)), len(beam)), "max" : (float(match.group(3)), float(beam.max())),
+                   "average" : (float(match.group(4)), float(beam.mean())) }
+        for key, (got, expected) in values.items():
+            ok = got == expected if key == "samples" else abs(got - expected) <= args.rtol * max(abs(expected), 1e-300)
+            problems += 0 if ok else 1
+            print("  {:>10} beam {:<8} {:>24}  reference {:>24}  {}".format(match.group(1).lower(), key, repr(got), repr(expected),
+                  "ok" if ok else "MISMATCH"))
+
+    if args.beams:
+        data = np.fromfile(args.beams, dtype="<f8")
+        if len(data) != 2 * length:
+            print("  beams file has {} samples, expected 2 x {}  MISMATCH".format(len(data), length))
+            problems += 1
+        else:
+            for beam_type, name in [(1, "coherent"), (2, "incoherent")]:
+                got = data[(beam_type - 1) * length:beam_type * length]
+                error = np.abs(got - beams[beam_type]) / np.maximum(np.abs(beams[beam_type]), 1e-300)
+                exact = int(np.count_nonzero(got == beams[beam_type]))
+                ok = bool(error.max() <= args.rtol)
+                problems += 0 if ok else 1
+                print("  {:>10} beam samples: {} of {} bit-identical, max relative error {:.3g}  {}".format(name, exact, length,
+                      float(error.max()), "ok" if ok else "MISMATCH"))
+
+    match = stalta_re.search(text)
+    if match is not None:
+        sta, lta, threshold = int(match.group(1)), int(match.group(2)), float(match.group(3))
+        expected = referenceStaLta(beams[2], sta, lta, threshold)
+        got = parseSignals(text)
+        differ = len([k for k in range(0, max(len(got), len(expected))) if k >= len(got) or k >= len(expected) or got[k] != expected[k]])
+        problems += 1 if differ else 0
+        print("  STA/LTA: {} signals, reference {}, {} differ  {}".format(len(got), len(expected), differ, "ok" if not differ else "MISMATCH"))
+        for k in range(0, min(differ, 10)):
+            print("    signal {}: beam {}, reference {}".format(k, got[k] if k < len(got) else "-", expected[k] if k < len(expected) else "-"))
+
+    print("{} problem(s)".format(problems))
+    if problems:
+        sys.exit(1)
+
+# Best of 'repeat' timings of function(), in seconds
+def bestTime(function, repeat):
+    times = []
+    for _ in range(0, repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def bench(args):
+    dataset = args.dataset if args.dataset is not None else datasetFile(args.working_set)
+    header, latitudes, longitudes, waveforms = loadDataset(dataset)
+    length, offsets = beamWindow(header, latitudes, longitudes)
+    stations = header["stations"]
+    costs = sampleCosts(stations)
+    print("Dataset: {}, {} stations x {} samples ({:.2f} MiB), beam of {} samples".format(dataset, stations, header["samples"],
+          header["waveform_bytes"] / (1 << 20), length))
+
+    incoherent = referenceBeam(waveforms, offsets, length, 2)
+    sta = int(stalta_defaults["sta"] * header["sample_rate"])
+    lta = int(stalta_defaults["lta"] * header["sample_rate"])
+    times = {
+        "coherent" : bestTime(lambda: referenceBeam(waveforms, offsets, length, 1), args.repeat),
+        "incoherent" : bestTime(lambda: referenceBeam(waveforms, offsets, length, 2), args.repeat),
+        "stalta" : bestTime(lambda: referenceStaLta(incoherent, sta, lta, stalta_defaults["threshold"]), args.repeat),
+    }
+    times["beams"] = times["coherent"] + times["incoherent"]
+    times["fused"] = bestTime(lambda: referenceFused(waveforms, offsets, length), args.repeat)
+
+    print("")
+    print("Host (NumPy), best of {}:".format(args.repeat))
+    print("  {:<12} {:>10} {:>14} {:>12} {:>10} {:>12} {:>10}".format("kernel", "time (ms)", "Msamples/s", "bytes/sample", "GB/s",
+          "flops/sample", "flops/byte"))
+    for kernel in ["coherent", "incoherent", "beams", "fused", "stalta"]:
+        rate = length / times[kernel]
+        print("  {:<12} {:>10.2f} {:>14.2f} {:>12} {:>10.2f} {:>12} {:>10.3f}".format(kernel, times[kernel] * 1e3, rate / 1e6,
+              costs[kernel]["bytes"], rate * costs[kernel]["bytes"] / 1e9, costs[kernel]["flops"], costs[kernel]["flops"] / costs[kernel]["bytes"]))
+    print("  Untiled, beam.c would move {} bytes per output sample, {:.1f}x the compulsory traffic".format(costs["untiled"]["bytes"],
+          costs["untiled"]["bytes"] / costs["beams"]["bytes"]))
+
+    for rundir in args.rundir:
+        outputs = [text for text in readAppOutputs(rundir).values() if parseAppRunTime(text) is not None]
+        if not outputs:
+            print("")
+            print("{}: no completed beam output (stdout-*)".format(rundir))
+            continue
+        print("")
+        print("Simulated ({}):".format(rundir))
+        for text in outputs:
+            match = dataset_line_re.search(text)
+            printed = beam_line_re.search(text)
+            if match is None or printed is None:
+                print("  beam output predates runtime datasets, skipped")
+                continue
+            run_costs = sampleCosts(int(match.group(2)))
+            run_length = int(printed.group(2))
+            mode = "fused" if fused_re.search(text) is not None else "beams"
+            run_bytes = run_length * run_costs[mode]["bytes"]
+            run_flops = run_length * run_costs[mode]["flops"]
+            if stalta_re.search(text) is not None:
+                run_bytes += run_length * run_costs["stalta"]["bytes"]
+                run_flops += run_length * run_costs["stalta"]["flops"]
+            run_time = parseAppRunTime(text)
+            print("  {} waveforms x {} beam samples{} in {:.1f} us: {:.2f} GB/s, {:.3f} GFLOP/s at {:.3f} flops/byte".format(match.group(2),
+                  run_length, " (fused)" if mode == "fused" else "", run_time * 1e6, run_bytes / run_time / 1e9, run_flops / run_time / 1e9, run_flops / run_bytes))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    commands = ap.add_subparsers(dest='command', required=True)
+
+    cmd = commands.add_parser('check', help="Check beam's output against the reference.")
+    cmd.add_argument('output', type=str, help="beam's stdout (stdout-<pid> in a run directory).")
+    cmd.add_argument('--dataset', type=str, default=None, help="Dataset beam ran on. Default: the one named in its output.")
+    cmd.add_argument('--beams', type=str, default=None, help="Beams written by beam -o, compared sample by sample.")
+    cmd.add_argument('--rtol', type=float, default=1e-9, help='Relative tolerance.')
+
+    cmd = commands.add_parser('bench', help='Time the reference on the host and report bytes and flops per output sample.')
+    cmd.add_argument('--dataset', type=str, default=None, help='Dataset file. Overrides --working-set.')
+    cmd.add_argument('--working-set', type=str, default=arg_workingset[0], choices=arg_workingset,
+                     help="One of p1.py's working sets (generated if needed).")
+    cmd.add_argument('--repeat', type=int, default=5)
+    cmd.add_argument('--rundir', type=str, action='append', default=[],
+                     help="Completed p1.py run of beam to compute the simulated node's bandwidth for (repeatable).")
+
+    args = ap.parse_args()
+    if np is None:
+        print("Error: beamref.py needs numpy (pip install numpy)")
+        sys.exit(1)
+    if args.command == 'check':
+        check(args)
+    else:
+        bench(args)
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from runlib import *
+from resultslib import rollupStats
+from datasetlib import parseSize
+
+### USAGE ###
+#
+# Simulator-performance regression suite: runs a few canonical p1.py configurations on a
+# short beam run and records how expensive they are to simulate (not how fast the node is).
+# Results are compared against a stored baseline and written to a JSON report so the numbers
+# can be tracked across SST/sst-elements upgrades and library changes.
+#
+#   $ python3 bench.py --update-baseline            # record a baseline on this host
+#   $ python3 bench.py --report bench-report.json   # later: compare against it
+#
+# Benchmarks run one at a time so they do not perturb each other's timing. Each benchmark is
+# repeated --repeat times and the median is compared. A metric regresses when it is worse
+# than the baseline median by more than --threshold or by more than 3x the baseline's own
+# spread, whichever is larger. The exit code is 1 if anything regressed.
+#
+
+# beam's smallest input, so the suite's run time tracks the simulator rather than the app
+bench_working_set = min([ws for ws in arg_workingset if ws != "default"], key=parseSize)
+
+# The canonical configurations, smallest first
+benchmarks = {
+    "small" : ["--cores", 32, "--instance", "{exe}:4", "--working-set", bench_working_set],
+    "medium" : ["--cores", 32, "--working-set", bench_working_set],
+    "large" : ["--cores", 64, "--speed", "fast", "--l1size", "big", "--l2size", "big", "--l3size", "big", "--memtype", "bw",
+               "--working-set", bench_working_set],
+}
+
+# Host metrics and whether smaller is better
+metrics = {
+    "wall_time" : True,
+    "build_time" : True,
+    "run_time" : True,
+    "peak_rss" : True,
+    "events_per_s" : False,
+}
+
+# Statistics that count simulated events one for one: NoC packets sent per hop and
+# cache accesses. Their sum over the run time is the suite's events per second.
+event_stats = ["send_packet_count", "CacheHits", "CacheMisses"]
+
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2.0
+
+# Median absolute deviation relative to the median, 0 for a single sample
+def relativeSpread(values):
+    mid = median(values)
+    if len(values) < 2 or mid == 0:
+        return 0.0
+    return median([abs(v - mid) for v in values]) / abs(mid)
+
+def runBenchmark(name, options, rundir, args):
+    result = runSST(options, rundir, sst=args.sst, sst_args=["--print-timing-info"], timeout=args.timeout,
+                    sample_interval=None) # Polling /proc would perturb the timing
+    with open(os.path.join(rundir, "sst.log")) as f:
+        timing = parseTimingInfo(f.read())
+    result["build_time"] = timing.get("build_time")
+    result["run_time"] = timing.get("run_time", result["wall_time"])
+
+    statfile = os.path.join(rundir, "example1.csv")
+    result["events"] = None
+    result["events_per_s"] = None
+    if os.path.exists(statfile):
+        stats = rollupStats(statfile)
+        result["events"] = int(sum([total for (_, statistic), (total, _) in stats.items() if statistic in event_stats]))
+        if result["run_time"]:
+            result["events_per_s"] = result["events"] / result["run_time"]
+    return result
+
+def sstVersion(sst):
+    try:
+        return subprocess.run([sst, "--version"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+# Compares the current samples of one benchmark with its baseline samples
+def compare(current, baseline, threshold):
+    report = {}
+    status = "ok"
+    for metric, lower_is_better in metrics.items():
+        now = [s[metric] for s in current if s.get(metric) is not None]
+        then = [s[metric] for s in baseline if s.get(metric) is not None]
+        if not now or not then:
+            continue
+        change = (median(now) - median(then)) / median(then) if median(then) else 0.0
+        allowed = max(threshold, 3 * relativeSpread(then))
+        worse = change > allowed if lower_is_better else change < -allowed
+        report[metric] = { "current" : median(now), "baseline" : median(then), "change" : change,
+                           "allowed" : allowed, "regressed" : worse }
+        if worse:
+            status = "regressed"
+
+    # The simulated time should not move at all; if it does the model changed, not just its speed
+    now = set([s["sim_time"] for s in current])
+    then = set([s["sim_time"] for s in baseline])
+    if now != then:
+        report["sim_time"] = { "current" : sorted(now, key=str), "baseline" : sorted(then, key=str) }
+        if status == "ok":
+            status = "model changed"
+    return status, report
+
+def main(args):
+    exe = os.path.abspath(args.executable)
+    names = args.only if args.only else list(benchmarks.keys())
+    for name in names:
+        if name not in benchmarks:
+            print("Error: unknown benchmark '{}'. Expected one of {}".format(name, list(benchmarks.keys())))
+            sys.exit(1)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["benchmarks"]
+
+    report = {
+        "time" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host" : platform.node(),
+        "sst" : sstVersion(args.sst),
+        "executable" : exe,
+        "benchmarks" : {},
+    }
+    regressed = False
+    print("{:>8}  {:>10}  {:>10}  {:>10}  {:>10}  {:>12}  {:>12}  {}".format(
+        "name", "wall (s)", "build (s)", "run (s)", "rss (MiB)", "events/s", "sim (us)", "vs. baseline"))
+    for name in names:
+        options = [str(x).format(exe=exe) for x in benchmarks[name]] + ["--executable", exe]
+        samples = []
+        for x in range(0, args.repeat):
+            samples.append(runBenchmark(name, options, os.path.join(args.workdir, name, str(x)), args))
+        failed = [s for s in samples if s["sim_time"] is None]
+
+        entry = { "options" : options, "samples" : samples }
+        if failed:
+            entry["status"] = "failed"
+            regressed = True
+        elif name in baseline:
+            entry["status"], entry["comparison"] = compare(samples, baseline[name]["samples"], args.threshold)
+            regressed = regressed or entry["status"] != "ok"
+        else:
+            entry["status"] = "no baseline"
+        report["benchmarks"][name] = entry
+
+        def med(metric, scale=1.0):
+            values = [s[metric] for s in samples if s.get(metric) is not None]
+            return "{:.3f}".format(median(values) * scale) if values else "-"
+        print("{:>8}  {:>10}  {:>10}  {:>10}  {:>10}  {:>12}  {:>12}  {}".format(
+            name, med("wall_time"), med("build_time"), med("run_time"), med("peak_rss", 1.0 / 1024),
+            med("events_per_s"), med("sim_time", 1e6) if not failed else "failed", entry["status"]))
+        for metric, comparison in entry.get("comparison", {}).items():
+            if metric != "sim_time" and comparison["regressed"]:
+                print("          {} {:+.1%} (allowed {:.1%})".format(metric, comparison["change"], comparison["allowed"]))
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Wrote {}".format(args.report))
+
+    if args.update_baseline:
+        for name in names:
+            if report["benchmarks"][name]["status"] != "failed":
+                baseline[name] = { "options" : report["benchmarks"][name]["options"],
+                                   "samples" : report["benchmarks"][name]["samples"] }
+        with open(args.baseline, "w") as f:
+            json.dump({ "time" : report["time"], "host" : report["host"], "sst" : report["sst"], "benchmarks" : baseline }, f, indent=2)
+        print("Updated {}".format(args.baseline))
+    elif regressed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--executable', type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "beam"),
+                    help='RISC-V binary to simulate. Keep its input short; the suite measures the simulator, not the app.')
+    ap.add_argument('--only', action='append', default=[],
+                    help='Run only this benchmark (repeatable): {}'.format(list(benchmarks.keys())))
+    ap.add_argument('--repeat', type=int, default=3,
+                    help='Runs per benchmark. The median is reported and compared.')
+    ap.add_argument('--baseline', type=str, default='bench-baseline.json',
+                    help='Baseline results to compare against.')
+    ap.add_argument('--update-baseline', action='store_true',
+                    help='Store this run as the new baseline instead of failing on regressions.')
+    ap.add_argument('--threshold', type=float, default=0.05,
+                    help='Minimum relative change treated as a regression.')
+    ap.add_argument('--report', type=str, default='bench-report.json',
+                    help='Machine-readable report of this run.')
+    ap.add_argument('--workdir', type=str, default='bench',
+                    help='Directory to hold the run directories.')
+    ap.add_argument('--sst', type=str, default='sst',
+                    help='SST executable.')
+    ap.add_argument('--timeout', type=float, default=None,
+                    help='Kill any single simulation after this many seconds.')
+    args = ap.parse_args()
+    main(args)
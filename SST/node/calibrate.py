@@ -0,0 +1,115 @@
+import argparse
+import os
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from runlib import *
+from preflightlib import checkOptions
+
+### USAGE ###
+#
+# Runs a set of node configurations at every --fidelity tier of p1.py and reports how well
+# each faster tier preserves the ranking of the detailed tier. A tier is safe for pruning
+# sweeps when its rank correlation with the detailed results is high and it keeps the best
+# detailed configurations near its own top.
+#
+#   $ python3 calibrate.py --sample 16 --jobs 16
+#   $ python3 calibrate.py --configs configs.txt   # one set of p1.py options per line
+#
+
+# A random sample of the original node dimensions (the others at p1.py's defaults) that p1.py accepts
+def sampleConfigs(count, seed):
+    rng = random.Random(seed)
+    space = configSpace()
+    total = 1
+    for dim in core_dims:
+        total *= len(space[dim])
+
+    configs = []
+    seen = set()
+    while len(configs) < count and len(seen) < total:
+        config = { dim : rng.choice(space[dim]) for dim in core_dims }
+        key = tuple(config.items())
+        if key in seen:
+            continue
+        seen.add(key)
+        if not checkOptions(config):
+            configs.append(configArgs(config))
+    return configs
+
+def main(args):
+    if args.configs:
+        with open(args.configs) as f:
+            configs = [line.split() for line in f if line.strip() and not line.startswith("#")]
+    else:
+        configs = sampleConfigs(args.sample, args.seed)
+
+    tiers = arg_fidelity
+    if tiers[0] != "detailed":
+        print("Error: the first fidelity tier in params.py must be the detailed reference")
+        sys.exit(1)
+
+    # Run every configuration at every tier
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for tier in tiers:
+            for x in range(0, len(configs)):
+                rundir = os.path.join(args.workdir, tier, str(x))
+                jobs[(tier, x)] = pool.submit(runSST, configs[x] + ["--fidelity", tier], rundir,
+                                              sst=args.sst, timeout=args.timeout)
+    results = { key : job.result() for key, job in jobs.items() }
+
+    print("{:>4}  {}".format("id", "  ".join(["{:>14}".format(tier + " (us)") for tier in tiers])) + "  options")
+    for x in range(0, len(configs)):
+        times = []
+        for tier in tiers:
+            sim_time = results[(tier, x)]["sim_time"]
+            times.append("{:>14.3f}".format(sim_time * 1e6) if sim_time is not None else "{:>14}".format("failed"))
+        print("{:>4}  {}  {}".format(x, "  ".join(times), " ".join(configs[x])))
+
+    print("")
+    print("{:>10}  {:>6}  {:>12}  {:>10}  {:>10}  {}".format("tier", "runs", "rank corr.", "top-k hit", "speedup", "verdict"))
+    for tier in tiers[1:]:
+        ids = [x for x in range(0, len(configs))
+               if results[("detailed", x)]["sim_time"] is not None and results[(tier, x)]["sim_time"] is not None]
+        if len(ids) < 2:
+            print("{:>10}  {:>6}  {:>12}  {:>10}  {:>10}  not enough completed runs".format(tier, len(ids), "-", "-", "-"))
+            continue
+
+        detailed = [results[("detailed", x)]["sim_time"] for x in ids]
+        screened = [results[(tier, x)]["sim_time"] for x in ids]
+        rho = rankCorrelation(detailed, screened)
+
+        # Fraction of the detailed top-k that the tier also puts in its top-k
+        k = max(1, len(ids) // 4)
+        best_detailed = set(sorted(ids, key=lambda x: results[("detailed", x)]["sim_time"])[:k])
+        best_screened = set(sorted(ids, key=lambda x: results[(tier, x)]["sim_time"])[:k])
+        top_k = len(best_detailed & best_screened) / k
+
+        speedups = sorted([results[("detailed", x)]["wall_time"] / results[(tier, x)]["wall_time"] for x in ids])
+        speedup = speedups[len(speedups) // 2]
+
+        verdict = "safe for pruning" if rho >= args.threshold else "NOT safe for pruning"
+        print("{:>10}  {:>6}  {:>12.3f}  {:>10.2f}  {:>9.1f}x  {}".format(tier, len(ids), rho, top_k, speedup, verdict))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--configs', type=str, default=None,
+                    help='File with one set of p1.py architecture options per line. Default: a random sample of the space.')
+    ap.add_argument('--sample', type=int, default=12,
+                    help='Number of configurations to sample when --configs is not given.')
+    ap.add_argument('--seed', type=int, default=2025,
+                    help='Seed for sampling configurations.')
+    ap.add_argument('--jobs', type=int, default=os.cpu_count(),
+                    help='Number of simulations to run concurrently.')
+    ap.add_argument('--workdir', type=str, default='calibration',
+                    help='Directory to hold one run directory per configuration and tier.')
+    ap.add_argument('--sst', type=str, default='sst',
+                    help='SST executable.')
+    ap.add_argument('--timeout', type=float, default=None,
+                    help='Kill any single simulation after this many seconds.')
+    ap.add_argument('--threshold', type=float, default=0.9,
+                    help='Minimum rank correlation for a tier to be considered safe for pruning.')
+    args = ap.parse_args()
+    main(args)
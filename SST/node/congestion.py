@@ -0,0 +1,105 @@
+import argparse
+import math
+import os
+import sys
+
+from runlib import *
+
+### USAGE ###
+#
+# Summarizes where a node simulation queued up: per-router stalls on each of the four on-chip
+# networks (req, ack, fwd, data) and backpressure at the memory controllers, to tell
+# whether the mesh or DRAM limits a configuration.
+#
+#   $ python3 congestion.py example1.csv
+#   $ python3 congestion.py sweep/0123456789ab/example1.csv --log sweep/0123456789ab/sst.log
+#
+# Router stalls are output_port_stalls (time an output port had a flit but could not send)
+# as a fraction of simulated time and ports. Memory backpressure is the fraction of memory
+# cycles in which a request was ready but the backend rejected it.
+#
+
+networks = ["req", "ack", "fwd", "data"]
+
+def stallFraction(stats, sim_time):
+    if sim_time == 0 or stats["ports"] == 0:
+        return 0.0
+    return stats.get("output_port_stalls", 0) / (sim_time * stats["ports"])
+
+def main(args):
+    if not os.path.exists(args.statfile):
+        print("Error: statistics file '{}' not found".format(args.statfile))
+        sys.exit(1)
+    routers, memories, sim_time = readNoCStats(args.statfile)
+    if not routers:
+        print("Error: no router statistics in '{}'. Were statistics enabled for the mesh?".format(args.statfile))
+        sys.exit(1)
+
+    # Router array width: from the run's configuration when known, else assume a square array
+    count = len([r for r in routers if r[0] == "data"])
+    xdim = int(math.isqrt(count))
+    if args.log:
+        with open(args.log) as f:
+            config = parseConfig(f.read())
+        if config is not None and int(config["cores"]) in arg_cores:
+            xdim = int(arg_cores[int(config["cores"])].split("x")[0])
+            topology = config.get("noc_topology", "mesh")
+            if topology == "ring":
+                xdim = count
+            elif topology in ["cmesh2", "cmesh4"]:
+                xdim //= 2
+
+    print("{:>6}  {:>14}  {:>14}  {:>12}  {:>12}  {:>10}".format("net", "packets", "bits", "mean stall", "max stall", "worst rtr"))
+    worst = {}
+    for net in networks:
+        rtrs = { num : stats for (n, num), stats in routers.items() if n == net }
+        if not rtrs:
+            continue
+        fractions = { num : stallFraction(stats, sim_time) for num, stats in rtrs.items() }
+        hot = max(fractions, key=lambda num: fractions[num])
+        worst[net] = fractions[hot]
+        print("{:>6}  {:>14.0f}  {:>14.0f}  {:>11.2%}  {:>11.2%}  {:>4} ({},{})".format(net,
+              sum([s.get("send_packet_count", 0) for s in rtrs.values()]), sum([s.get("send_bit_count", 0) for s in rtrs.values()]),
+              sum(fractions.values()) / len(fractions), fractions[hot], hot, hot % xdim, hot // xdim))
+
+    # Stall map of the busiest network, laid out like the mesh (router 0 top left)
+    net = max(worst, key=lambda n: worst[n])
+    print("")
+    print("Output port stalls on the {} network (% of time per port):".format(net))
+    fractions = { num : stallFraction(stats, sim_time) for (n, num), stats in routers.items() if n == net }
+    for y in range(0, math.ceil(len(fractions) / xdim)):
+        print("  " + " ".join(["{:>5.1f}".format(fractions[y * xdim + x] * 100) if y * xdim + x in fractions else "{:>5}".format("-")
+                               for x in range(0, xdim)]))
+
+    backpressure = 0.0
+    if memories:
+        print("")
+        print("{:>10}  {:>12}  {:>12}  {:>14}".format("memory", "busy", "rejected", "GetS latency"))
+        for name in sorted(memories, key=lambda n: int(n[len("memory"):])):
+            stats = memories[name]
+            cycles = stats.get("total_cycles", [0, 0])[0]
+            busy = stats.get("cycles_with_issue", [0, 0])[0] / cycles if cycles else 0.0
+            rejected = stats.get("cycles_attempted_issue_but_rejected", [0, 0])[0] / cycles if cycles else 0.0
+            latency = stats.get("latency_GetS", [0, 0])
+            backpressure = max(backpressure, rejected)
+            print("{:>10}  {:>11.2%}  {:>11.2%}  {:>14}".format(name, busy, rejected,
+                  "{:.1f}".format(latency[0] / latency[1]) if latency[1] else "-"))
+
+    print("")
+    if worst[net] < args.threshold and backpressure < args.threshold:
+        print("Neither the mesh nor memory is saturated (all below {:.0%})".format(args.threshold))
+    elif worst[net] >= backpressure:
+        print("Bottleneck: mesh ({} network, worst router stalled {:.1%} of the time)".format(net, worst[net]))
+    else:
+        print("Bottleneck: memory (a controller rejected requests in {:.1%} of its cycles)".format(backpressure))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('statfile', type=str, nargs='?', default='example1.csv',
+                    help='Statistics output of the run (sst.statOutputCSV).')
+    ap.add_argument('--log', type=str, default=None,
+                    help="SST output of the run, used to find the mesh dimensions.")
+    ap.add_argument('--threshold', type=float, default=0.05,
+                    help='Stall or rejection fraction below which a resource is not considered saturated.')
+    args = ap.parse_args()
+    main(args)
@@ -0,0 +1,146 @@
+import array
+import math
+import os
+import random
+import re
+import struct
+import sys
+
+### Synthetic waveform datasets for beam.
+###  beam reads its waveforms, station coordinates and sample rate from a binary file at run time
+###  (beam -f FILE), so the problem size, and with it the working set, can change without rebuilding
+###  the RISC-V binary. The file is little-endian:
+###      header (64 B)  : "BEAMDATA", version, waveform count, sample count, 0,
+###                       sample rate (Hz), start time (s), slowness (s/km), km per degree, back azimuth (deg)
+###      latitudes      : waveform count doubles
+###      longitudes     : waveform count doubles
+###      waveforms      : waveform count x sample count doubles, one waveform after another
+###  Host-side only (no sst import).
+###
+
+
+dataset_magic = b"BEAMDATA"
+dataset_version = 1
+header_format = "<8sIIII5d"
+
+# The problem beam was written for: 20 minutes at 40 Hz (beam's original hard-coded window)
+default_dataset = { "stations" : 16, "duration" : 1200.025, "sample_rate" : 40.0 }
+
+# Generated datasets are cached here, one file per working set
+dataset_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+
+size_re = re.compile(r"^\s*([0-9.]+)\s*([KMGT]i)?B\s*$")
+size_units = { None : 1, "Ki" : 1 << 10, "Mi" : 1 << 20, "Gi" : 1 << 30, "Ti" : 1 << 40 }
+
+
+# Bytes in a size such as "256KiB"
+def parseSize(text):
+    match = size_re.match(str(text))
+    if match is None:
+        raise Exception("Error: size '{}' is not a number of bytes such as 256KiB or 16MiB".format(text))
+    return int(float(match.group(1)) * size_units[match.group(2)])
+
+"""
+    Dataset dimensions for a working set: the waveforms take 'working_set' bytes ("default" = the
+    original problem), split over 'stations' waveforms at 'sample_rate'.
+    Returns { "stations", "duration", "sample_rate" }.
+"""
+def datasetShape(working_set, stations=None, sample_rate=None):
+    shape = dict(default_dataset)
+    if stations is not None:
+        shape["stations"] = stations
+    if sample_rate is not None:
+        shape["sample_rate"] = sample_rate
+    if working_set is not None and working_set != "default":
+        samples = parseSize(working_set) // (8 * shape["stations"])
+        if samples < 2:
+            raise Exception("Error: working set '{}' is too small for {} stations".format(working_set, shape["stations"]))
+        shape["duration"] = (samples - 1) / shape["sample_rate"]
+    return shape
+
+# Per-station time shifts (s) of a plane wave, computed exactly as beam.c does
+def stationShifts(latitudes, longitudes, slowness, km_per_degree, back_azimuth):
+    average_lat = sum(latitudes) / len(latitudes)
+    average_lon = sum(longitudes) / len(longitudes)
+    slow_deg = slowness * km_per_degree
+    slow_x = slow_deg * math.sin(back_azimuth * math.pi / 180.0)
+    slow_y = slow_deg * math.cos(back_azimuth * math.pi / 180.0)
+    return [slow_x * (lon - average_lon) + slow_y * (lat - average_lat) for lat, lon in zip(latitudes, longitudes)]
+
+"""
+    Writes a synthetic dataset: gaussian noise on every station plus 'events' plane-wave arrivals
+    (a 2 Hz decaying wavelet, 'snr' times the noise) that line up in beam's coherent beam.
+
+    stations      : number of waveforms
+    duration      : seconds per waveform; sample count = duration * sample_rate + 1
+    aperture      : array diameter in degrees, stations are placed uniformly within it
+    slowness      : s/km of the plane wave beam steers to, back_azimuth in degrees
+    Returns the header as a dict (see readHeader).
+"""
+def generateDataset(filename, stations=16, duration=1200.025, sample_rate=40.0, events=4, snr=8.0, seed=1,
+                    aperture=1.0, slowness=0.06, back_azimuth=45.0, km_per_degree=111.19, start_time=1708968343.0):
+    if stations < 1 or sample_rate <= 0 or duration <= 0:
+        raise Exception("Error: a dataset needs at least one station, a positive duration and sample rate")
+    rng = random.Random(seed)
+    samples = int(duration * sample_rate + 0.5) + 1
+    latitudes = [40.0 + rng.uniform(-aperture / 2, aperture / 2) for _ in range(stations)]
+    longitudes = [-100.0 + rng.uniform(-aperture / 2, aperture / 2) for _ in range(stations)]
+    shifts = stationShifts(latitudes, longitudes, slowness, km_per_degree, back_azimuth)
+    if duration <= max(shifts) - min(shifts):
+        raise Exception("Error: {} s of data is no longer than the {:.3f} s the stations are shifted by, so there is no beam. Use a longer duration"
+                        .format(duration, max(shifts) - min(shifts)))
+
+    # Arrival times on the beam's clock, away from the ends so every station records them
+    margin = max(shifts) - min(shifts) + 10.0
+    arrivals = sorted([rng.uniform(margin, max(margin, duration - margin)) for _ in range(events)])
+    wavelet = [snr * math.exp(-n / sample_rate) * math.sin(2 * math.pi * 2.0 * n / sample_rate) for n in range(int(5 * sample_rate))]
+
+    header = struct.pack(header_format, dataset_magic, dataset_version, stations, samples, 0,
+                         sample_rate, start_time, slowness, km_per_degree, back_azimuth)
+    partial = filename + ".tmp{}".format(os.getpid())
+    with open(partial, "wb") as f:
+        f.write(header)
+        for values in [latitudes, longitudes]:
+            column = array.array("d", values)
+            if sys.byteorder != "little":
+                column.byteswap()
+            column.tofile(f)
+        for i in range(stations):
+            gauss = rng.gauss
+            waveform = array.array("d", [gauss(0.0, 1.0) for _ in range(samples)])
+            for arrival in arrivals:
+                # beam sample j reads sample j + (max shift - shift) * rate of this station
+                first = int((arrival + max(shifts) - shifts[i]) * sample_rate + 0.5)
+                for n in range(0, min(len(wavelet), samples - first)):
+                    waveform[first + n] += wavelet[n]
+            if sys.byteorder != "little":
+                waveform.byteswap()
+            waveform.tofile(f)
+    # Concurrent runs may generate the same file; the rename makes the last complete one win
+    os.replace(partial, filename)
+    return readHeader(filename)
+
+# Header of a dataset file as a dict, with the size of the waveforms in bytes
+def readHeader(filename):
+    with open(filename, "rb") as f:
+        data = f.read(struct.calcsize(header_format))
+    if len(data) < struct.calcsize(header_format):
+        raise Exception("Error: '{}' is too short to be a beam dataset".format(filename))
+    magic, version, stations, samples, _, sample_rate, start_time, slowness, km_per_degree, back_azimuth = struct.unpack(header_format, data)
+    if magic != dataset_magic or version != dataset_version:
+        raise Exception("Error: '{}' is not a version {} beam dataset".format(filename, dataset_version))
+    return { "stations" : stations, "samples" : samples, "sample_rate" : sample_rate, "start_time" : start_time,
+             "slowness" : slowness, "km_per_degree" : km_per_degree, "back_azimuth" : back_azimuth,
+             "waveform_bytes" : 8 * stations * samples }
+
+"""
+    Path of the cached dataset for a working set (see params.arg_workingset), generated with the
+    default seed the first time it is asked for, so every run of a working set reads the same data.
+"""
+def datasetFile(working_set, directory=dataset_dir):
+    filename = os.path.join(directory, "beam-{}.dat".format(working_set))
+    if not os.path.exists(filename):
+        os.makedirs(directory, exist_ok=True)
+        shape = datasetShape(working_set)
+        generateDataset(filename, stations=shape["stations"], duration=shape["duration"], sample_rate=shape["sample_rate"])
+    return filename
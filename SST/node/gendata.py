@@ -0,0 +1,59 @@
+import argparse
+import sys
+
+from datasetlib import *
+
+### USAGE ###
+#
+# Writes a synthetic waveform dataset for beam (beam -t THREADS -f FILE): gaussian noise on every
+# station plus plane-wave events that add up in the coherent beam. Size it by duration or by the
+# bytes of waveform data, i.e., the working set beam streams through.
+#
+#   $ python3 gendata.py --output beam.dat                                  # the original problem, 16 stations x 20 minutes at 40 Hz
+#   $ python3 gendata.py --working-set 2MiB --stations 32 --output small.dat
+#   $ python3 gendata.py --duration 3600 --sample-rate 100 --events 10 --output hour.dat
+#
+# p1.py generates (and caches) the datasets of its --working-set levels itself; use this to make
+# others and pass them with p1.py --dataset.
+#
+
+def main(args):
+    if args.working_set is not None and args.duration is not None:
+        print("Error: give either --working-set or --duration, not both")
+        sys.exit(1)
+    try:
+        shape = datasetShape(args.working_set, stations=args.stations, sample_rate=args.sample_rate)
+        if args.duration is not None:
+            shape["duration"] = args.duration
+        header = generateDataset(args.output, stations=shape["stations"], duration=shape["duration"], sample_rate=shape["sample_rate"],
+                                 events=args.events, snr=args.snr, seed=args.seed, slowness=args.slowness, back_azimuth=args.back_azimuth)
+    except Exception as e:
+        print(e)
+        sys.exit(1)
+    print("Wrote {}: {} stations x {} samples at {:g} Hz, {:.2f} MiB of waveforms".format(args.output, header["stations"],
+          header["samples"], header["sample_rate"], header["waveform_bytes"] / (1 << 20)))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--output', type=str, default='beam.dat',
+                    help='Dataset file to write.')
+    ap.add_argument('--stations', type=int, default=None,
+                    help='Number of waveforms. Default: {}.'.format(default_dataset["stations"]))
+    ap.add_argument('--duration', type=float, default=None,
+                    help='Seconds per waveform. Default: {}.'.format(default_dataset["duration"]))
+    ap.add_argument('--working-set', type=str, default=None,
+                    help='Size of all waveforms together, e.g. 16MiB; sets the duration.')
+    ap.add_argument('--sample-rate', type=float, default=None,
+                    help='Samples per second. Default: {:g}.'.format(default_dataset["sample_rate"]))
+    ap.add_argument('--events', type=int, default=4,
+                    help='Number of plane-wave events.')
+    ap.add_argument('--snr', type=float, default=8.0,
+                    help='Event amplitude relative to the noise.')
+    ap.add_argument('--slowness', type=float, default=0.06,
+                    help='Slowness of the events (s/km), which beam steers to.')
+    ap.add_argument('--back-azimuth', type=float, default=45.0,
+                    help='Back azimuth of the events (degrees).')
+    ap.add_argument('--seed', type=int, default=1,
+                    help='Random seed.')
+    args = ap.parse_args()
+    main(args)
@@ -0,0 +1,123 @@
+import argparse
+import sys
+
+from runlib import *
+from resultslib import component_instance_re
+
+### USAGE ###
+#
+# Ranks where the simulator spends its time, from the output of a run with p1.py --profile.
+# Clock and event handler time is summed per component instance and per kind of component
+# (instances with their numbers stripped, e.g. mesh_rtr, core_l1d, memory), so it shows
+# which parts of the model are worth simplifying or spreading across ranks.
+#
+#   $ sst p1.py -- --profile component
+#   $ python3 hotspots.py profile.txt --log sst.log
+#
+# Runs profiled with --profile type are already aggregated per element type (lib.element).
+#
+
+"""
+    Parses an SST profiling output file into { tool : { name : [calls, seconds] } }.
+    Each tool writes its name, a 'Name, ...' header, then one comma separated row per
+    tracked element. Calls and time are taken from the first count and time (s) columns.
+"""
+def readProfile(filename : str):
+    tools = {}
+    tool = None
+    columns = None
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if line == "":
+                continue
+            if "," not in line:
+                tool = line.rstrip(":")
+                tools[tool] = {}
+                columns = None
+                continue
+            fields = [x.strip() for x in line.split(",")]
+            if fields[0] == "Name":
+                header = [x.lower() for x in fields]
+                count_col = [x for x in range(1, len(header)) if "count" in header[x]]
+                time_col = [x for x in range(1, len(header)) if "(s)" in header[x]]
+                columns = (count_col[0] if count_col else None, time_col[0] if time_col else None)
+                continue
+            if tool is None or columns is None:
+                continue
+            calls = int(fields[columns[0]]) if columns[0] is not None else 0
+            seconds = float(fields[columns[1]]) if columns[1] is not None else 0.0
+            entry = tools[tool].setdefault(fields[0], [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+    return tools
+
+# Sums { name : [calls, seconds] } per kind of component, with the instance count
+def groupByKind(profile : dict):
+    kinds = {}
+    for name, (calls, seconds) in profile.items():
+        entry = kinds.setdefault(component_instance_re.sub("", name), [0, 0, 0.0])
+        entry[0] += 1
+        entry[1] += calls
+        entry[2] += seconds
+    return kinds
+
+def printRanking(title, rows, total, top):
+    print("")
+    print(title)
+    print("  {:<40}  {:>9}  {:>14}  {:>10}  {:>7}  {:>10}".format("name", "instances", "calls", "time (s)", "share", "avg (ns)"))
+    for name, instances, calls, seconds in sorted(rows, key=lambda r: -r[3])[:top]:
+        print("  {:<40}  {:>9}  {:>14}  {:>10.3f}  {:>6.1%}  {:>10.1f}".format(name, instances, calls, seconds,
+              seconds / total if total > 0 else 0.0, seconds / calls * 1e9 if calls > 0 else 0.0))
+
+def main(args):
+    tools = readProfile(args.profile)
+    if not tools:
+        print("Error: no profiling data in '{}'. Was the run started with p1.py --profile?".format(args.profile))
+        sys.exit(1)
+
+    # Clock and event handler time together is the time spent inside the model
+    combined = {}
+    for tool, profile in tools.items():
+        if tool.startswith("sync"):
+            continue
+        for name, (calls, seconds) in profile.items():
+            entry = combined.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+    handler_time = sum([seconds for _, seconds in combined.values()])
+
+    print("Handler time: {:.3f} s in {} tracked elements".format(handler_time, len(combined)))
+    if args.log:
+        with open(args.log) as f:
+            timing = parseTimingInfo(f.read())
+        run_time = timing.get("run_time", timing.get("total_time"))
+        if run_time:
+            print("Run time:     {:.3f} s, {:.1%} of it in handlers (the rest is core scheduling, sync and profiling overhead)".format(
+                  run_time, handler_time / run_time))
+    for tool, profile in tools.items():
+        if tool.startswith("sync"):
+            print("Sync ({}):   {:.3f} s over {} calls".format(tool, sum([s for _, s in profile.values()]), sum([c for c, _ in profile.values()])))
+
+    kinds = groupByKind(combined)
+    printRanking("Component kinds, all handlers", [(k, v[0], v[1], v[2]) for k, v in kinds.items()], handler_time, args.top)
+    if args.by_tool:
+        for tool, profile in tools.items():
+            if tool.startswith("sync"):
+                continue
+            total = sum([s for _, s in profile.values()])
+            printRanking("Component kinds, {}".format(tool), [(k, v[0], v[1], v[2]) for k, v in groupByKind(profile).items()], total, args.top)
+    printRanking("Instances, all handlers", [(name, 1, calls, seconds) for name, (calls, seconds) in combined.items()], handler_time, args.top)
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('profile', type=str, nargs='?', default='profile.txt',
+                    help='Profiling output written by p1.py --profile.')
+    ap.add_argument('--log', type=str, default=None,
+                    help="SST output of the run (with --print-timing-info) to relate handler time to run time.")
+    ap.add_argument('--top', type=int, default=15,
+                    help='Rows per ranking.')
+    ap.add_argument('--by-tool', action='store_true',
+                    help='Also rank component kinds separately for clock and event handlers.')
+    args = ap.parse_args()
+    main(args)
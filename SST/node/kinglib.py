@@ -43,7 +43,11 @@ class KingsleyMesh:
         self.groups = []   # Track which cache level groups exist on the network
         self.dir_nics = [] # Keep list of directory NICs for finalize()
         self.mem_nics = [] # Keep list of memory NICs for finalize()
+        self.dev_nics = [] # Keep list of requesting device (e.g., DMA engine) NICs for finalize()
         self.linknum = 0 # Used to generate unique link names
+        self.stops = xdim * ydim # Connectivity maps have one entry per mesh stop
+        self.router_of = list(range(0, self.stops)) # Router serving each mesh stop
+        self.linkcontrol = "kingsley.linkcontrol"
 
         # Compute link latency based on mesh frequency and cycles per hop
         frequa = UnitAlgebra(frequency)
@@ -116,7 +120,19 @@ class KingsleyMesh:
                     data_ew = sst.Link(prefix + "dew" + str(node_num))
                     data_ew.connect( (self.data_net[node_num - 1], "east", y_hop_latency), (self.data_net[node_num], "west", y_hop_latency) )
 
-    def connectCache(self, cachelevel : CacheLevel, port : str, connectivity, debug=0):
+    # Mesh stop of each connection in 'connectivity_map', in the order components are connected:
+    # stop by stop, following 'order' (a permutation of the stops) if given
+    def _fillStops(self, connectivity_map, order=None):
+        if order is None:
+            order = range(0, self.stops)
+        elif sorted(order) != list(range(0, self.stops)):
+            raise Exception("Error: The stop order must be a permutation of the {} mesh stops, got {}".format(self.stops, order))
+        stops = []
+        for rtr in order:
+            stops += [rtr] * connectivity_map[rtr]
+        return stops
+
+    def connectCache(self, cachelevel : CacheLevel, port : str, connectivity, debug=0, order=None):
         if port != "highlink" and port != "lowlink":
             raise Exception("Error: In connectCache(), the port must be either 'highlink' or 'lowlink'.\n"
                   "To connect caches that have no direct connections to other memory or core/accelerator components, use 'highlink'\n"
@@ -125,13 +141,13 @@ class KingsleyMesh:
                   "In the above descriptions, 'directly connected' means connected via a bus or a dedicated channel - not over a network\n")
 
         if isinstance(connectivity, int):
-            connectivity_map = [0] * len(self.data_net)
+            connectivity_map = [0] * self.stops
             connectivity_map[connectivity] = 1
         else:
             connectivity_map = connectivity
 
-        if len(connectivity_map) != len(self.data_net):
-            raise Exception("Error: The length of the connectivity map does not equal the size (number of routers) of the network. "
+        if len(connectivity_map) != self.stops:
+            raise Exception("Error: The length of the connectivity map does not equal the size (number of mesh stops) of the network. "
                             "Ensure that the map has an entry for each network router so that len(connectivity) = {}.".format(self.xdim * self.ydim))
         
         if sum(connectivity_map) != len(cachelevel.caches):
@@ -141,63 +157,32 @@ class KingsleyMesh:
 
         # Connect network subcomponents according to connectivity map
         # Update local_port count
-        rtr = 0
-        rtr_slots = connectivity_map[rtr]
         self.groups.append(cachelevel.level) # In finalize, we'll make sure the last level dir and/or mem have the right level
         
-        for cache in cachelevel.caches:
+        for cache, rtr in zip(cachelevel.caches, self._fillStops(connectivity_map, order)):
             # Install network subcomponents on each cache
             nic = cache.setSubComponent(port, "memHierarchy.MemNICFour")
             nic.addParam("group", cachelevel.level)
             if debug > 0:
                 nic.addParam("debug", 1)
                 nic.addParam("debug_level", debug)
-            data_chan = nic.setSubComponent("data", "kingsley.linkcontrol")
-            data_chan.addParams(self.data_nic_params)
-            req_chan = nic.setSubComponent("req", "kingsley.linkcontrol")
-            req_chan.addParams(self.ctrl_nic_params)
-            ack_chan = nic.setSubComponent("ack", "kingsley.linkcontrol")
-            ack_chan.addParams(self.ctrl_nic_params)
-            fwd_chan = nic.setSubComponent("fwd", "kingsley.linkcontrol")
-            fwd_chan.addParams(self.ctrl_nic_params)
-
-            # Update rtr to point to the router we need to populate
-            while rtr_slots == 0:
-                rtr += 1
-                rtr_slots = connectivity_map[rtr]
-
-            # Connect linkcontrols according to connectivity_map
-            dlink = sst.Link( self.prefix + str(self.linknum) )
-            rlink = sst.Link( self.prefix + str(self.linknum + 1) )
-            alink = sst.Link( self.prefix + str(self.linknum + 2) )
-            flink = sst.Link( self.prefix + str(self.linknum + 3) )
-            self.linknum += 4
-            local_port = "local" + str(self.local_ports[rtr])
-            dlink.connect( (self.data_net[rtr], local_port, self.local_hop_latency), 
-                           (data_chan, "rtr_port", self.local_hop_latency) )
-            rlink.connect( (self.req_net[rtr], local_port, self.local_hop_latency), 
-                           (req_chan, "rtr_port", self.local_hop_latency) )
-            alink.connect( (self.ack_net[rtr], local_port, self.local_hop_latency), 
-                           (ack_chan, "rtr_port", self.local_hop_latency) )
-            flink.connect( (self.fwd_net[rtr], local_port, self.local_hop_latency), 
-                           (fwd_chan, "rtr_port", self.local_hop_latency) )
-            self.local_ports[rtr] += 1
-            rtr_slots -= 1
+            self._connectNIC(nic, rtr)
     
-    def connectVanadisCores(self, cores : Vanadis, connectivity, os_router=0, debug=0):
+    # 'order' permutes which enabled mesh stop each core (and so each application thread) gets
+    def connectVanadisCores(self, cores : Vanadis, connectivity, os_router=0, debug=0, order=None):
         if isinstance(connectivity, int):
-            connectivity_map = [0] * len(self.data_net)
+            connectivity_map = [0] * self.stops
             connectivity_map[connectivity] = 1
         else:
             connectivity_map = connectivity       
 
         if cores.l2:
             # Connect L2
-            self.connectCache(cores.l2, "lowlink", connectivity_map)
+            self.connectCache(cores.l2, "lowlink", connectivity_map, order=order)
         else:
             # Connect L1I and L1D to network, connect OS at rtr 0
-            if len(connectivity_map) != len(self.data_net):
-                raise Exception("Error: The length of the connectivity map does not equal the size (number of routers) of the network. "
+            if len(connectivity_map) != self.stops:
+                raise Exception("Error: The length of the connectivity map does not equal the size (number of mesh stops) of the network. "
                                 "Ensure that the map has an entry for each network router so that len(connectivity) = {}.".format(self.xdim * self.ydim))
 
             if cores.l1d == None or cores.l1i == None:
@@ -208,11 +193,9 @@ class KingsleyMesh:
 
             # Connect network subcomponents according to connectivity map
             # Update local_port count
-            rtr = 0
-            rtr_slots = connectivity_map[rtr]
             self.groups.append(cores.l1d.level)
         
-            for num in range(0, len(cores.l1d)):
+            for num, rtr in zip(range(0, len(cores.l1d)), self._fillStops(connectivity_map, order)):
                 # Install network subcomponents on each cache
                 nic_l1d = cores.l1d.caches[num].setSubComponent("lowlink", "memHierarchy.MemNICFour")
                 nic_l1i = cores.l1i.caches[num].setSubComponent("lowlink", "memHierarchy.MemNICFour")
@@ -223,65 +206,15 @@ class KingsleyMesh:
                     nic_l1d.addParam("debug_level", debug)
                     nic_l1i.addParam("debug", 1)
                     nic_l1i.addParam("debug_level", debug)
-                data_chan_l1d = nic_l1d.setSubComponent("data", "kingsley.linkcontrol")
-                data_chan_l1d.addParams(self.data_nic_params)
-                req_chan_l1d = nic_l1d.setSubComponent("req", "kingsley.linkcontrol")
-                req_chan_l1d.addParams(self.ctrl_nic_params)
-                ack_chan_l1d = nic_l1d.setSubComponent("ack", "kingsley.linkcontrol")
-                ack_chan_l1d.addParams(self.ctrl_nic_params)
-                fwd_chan_l1d = nic_l1d.setSubComponent("fwd", "kingsley.linkcontrol")
-                fwd_chan_l1d.addParams(self.ctrl_nic_params)
-                data_chan_l1i = nic_l1i.setSubComponent("data", "kingsley.linkcontrol")
-                data_chan_l1i.addParams(self.data_nic_params)
-                req_chan_l1i = nic_l1i.setSubComponent("req", "kingsley.linkcontrol")
-                req_chan_l1i.addParams(self.ctrl_nic_params)
-                ack_chan_l1i = nic_l1i.setSubComponent("ack", "kingsley.linkcontrol")
-                ack_chan_l1i.addParams(self.ctrl_nic_params)
-                fwd_chan_l1i = nic_l1i.setSubComponent("fwd", "kingsley.linkcontrol")
-                fwd_chan_l1i.addParams(self.ctrl_nic_params)
-
-                # Update rtr to point to the router we need to populate
-                while rtr_slots == 0:
-                    rtr += 1
-                    rtr_slots = connectivity_map[rtr]
-
-                # Connect linkcontrols according to connectivity_map
-                dlink_l1d = sst.Link( self.prefix + str(self.linknum) )
-                rlink_l1d = sst.Link( self.prefix + str(self.linknum + 1) )
-                alink_l1d = sst.Link( self.prefix + str(self.linknum + 2) )
-                flink_l1d = sst.Link( self.prefix + str(self.linknum + 3) )
-                dlink_l1i = sst.Link( self.prefix + str(self.linknum + 4) )
-                rlink_l1i = sst.Link( self.prefix + str(self.linknum + 5) )
-                alink_l1i = sst.Link( self.prefix + str(self.linknum + 6) )
-                flink_l1i = sst.Link( self.prefix + str(self.linknum + 7) )
-                self.linknum += 8
-                local_port_l1d = "local" + str(self.local_ports[rtr])
-                local_port_l1i = "local" + str(self.local_ports[rtr] + 1)
-                dlink_l1d.connect( (self.data_net[rtr], local_port_l1d, self.local_hop_latency), 
-                                   (data_chan_l1d, "rtr_port", self.local_hop_latency) )
-                rlink_l1d.connect( (self.req_net[rtr], local_port_l1d, self.local_hop_latency), 
-                           (req_chan_l1d, "rtr_port", self.local_hop_latency) )
-                alink_l1d.connect( (self.ack_net[rtr], local_port_l1d, self.local_hop_latency), 
-                           (ack_chan_l1d, "rtr_port", self.local_hop_latency) )
-                flink_l1d.connect( (self.fwd_net[rtr], local_port_l1d, self.local_hop_latency), 
-                           (fwd_chan_l1d, "rtr_port", self.local_hop_latency) )
-                dlink_l1i.connect( (self.data_net[rtr], local_port_l1i, self.local_hop_latency), 
-                           (data_chan_l1i, "rtr_port", self.local_hop_latency) )
-                rlink_l1i.connect( (self.req_net[rtr], local_port_l1i, self.local_hop_latency), 
-                           (req_chan_l1i, "rtr_port", self.local_hop_latency) )
-                alink_l1i.connect( (self.ack_net[rtr], local_port_l1i, self.local_hop_latency), 
-                           (ack_chan_l1i, "rtr_port", self.local_hop_latency) )
-                flink_l1i.connect( (self.fwd_net[rtr], local_port_l1i, self.local_hop_latency), 
-                           (fwd_chan_l1i, "rtr_port", self.local_hop_latency) )
-                self.local_ports[rtr] += 2
-                rtr_slots -= 1
+                self._connectNIC(nic_l1d, rtr)
+                self._connectNIC(nic_l1i, rtr)
         
         # Connect OS cache
         self.connectCache(cores.l1_os, "lowlink", os_router)
 
-    def connectDistributedCache(self, cachelevel : CacheLevel, connectivity_map, debug=0): 
-        if len(connectivity_map) != len(self.data_net):
-            raise Exception("Error: The length of the connectivity map does not equal the size (number of routers) of the network. "
+    def connectDistributedCache(self, cachelevel : CacheLevel, connectivity_map, debug=0, order=None): 
+        if len(connectivity_map) != self.stops:
+            raise Exception("Error: The length of the connectivity map does not equal the size (number of mesh stops) of the network. "
                             "Ensure that the map has an entry for each network router so that len(connectivity) = {}.".format(self.xdim * self.ydim))
         
         if sum(connectivity_map) != len(cachelevel.caches):
@@ -290,59 +223,27 @@ class KingsleyMesh:
 
         # Connect network subcomponents according to connectivity map
         # Update local_port count
-        rtr = 0
-        rtr_slots = connectivity_map[rtr]
         self.groups.append(cachelevel.level)
         
-        for cache in cachelevel.caches:
+        for cache, rtr in zip(cachelevel.caches, self._fillStops(connectivity_map, order)):
             # Install network subcomponents on each cache
             nic = cache.setSubComponent("highlink", "memHierarchy.MemNICFour")
             nic.addParam("group", cachelevel.level)
             if debug > 0:
                 nic.addParam("debug", 1)
                 nic.addParam("debug_level", debug)
-            data_chan = nic.setSubComponent("data", "kingsley.linkcontrol")
-            data_chan.addParams(self.data_nic_params)
-            req_chan = nic.setSubComponent("req", "kingsley.linkcontrol")
-            req_chan.addParams(self.ctrl_nic_params)
-            ack_chan = nic.setSubComponent("ack", "kingsley.linkcontrol")
-            ack_chan.addParams(self.ctrl_nic_params)
-            fwd_chan = nic.setSubComponent("fwd", "kingsley.linkcontrol")
-            fwd_chan.addParams(self.ctrl_nic_params)
-
-            # Update rtr to point to the router we need to populate
-            while rtr_slots == 0:
-                rtr += 1
-                rtr_slots = connectivity_map[rtr]
-
-            # Connect linkcontrols according to connectivity_map
-            dlink = sst.Link( self.prefix + str(self.linknum) )
-            rlink = sst.Link( self.prefix + str(self.linknum + 1) )
-            alink = sst.Link( self.prefix + str(self.linknum + 2) )
-            flink = sst.Link( self.prefix + str(self.linknum + 3) )
-            self.linknum += 4
-            local_port = "local" + str(self.local_ports[rtr])
-            dlink.connect( (self.data_net[rtr], local_port, self.local_hop_latency), 
-                           (data_chan, "rtr_port", self.local_hop_latency) )
-            rlink.connect( (self.req_net[rtr], local_port, self.local_hop_latency), 
-                           (req_chan, "rtr_port", self.local_hop_latency) )
-            alink.connect( (self.ack_net[rtr], local_port, self.local_hop_latency), 
-                           (ack_chan, "rtr_port", self.local_hop_latency) )
-            flink.connect( (self.fwd_net[rtr], local_port, self.local_hop_latency), 
-                           (fwd_chan, "rtr_port", self.local_hop_latency) )
-            self.local_ports[rtr] += 1
-            rtr_slots -= 1   
+            self._connectNIC(nic, rtr)
 
 
     def connectMemory(self, memories : Memory, connectivity, debug=0):
         if isinstance(connectivity, int):
-            connectivity_map = [0] * len(self.data_net)
+            connectivity_map = [0] * self.stops
             connectivity_map[connectivity] = 1
         else:
             connectivity_map = connectivity
 
-        if len(connectivity_map) != len(self.data_net):
-            raise Exception("Error: The length of the connectivity map does not equal the size (number of routers) of the network. "
+        if len(connectivity_map) != self.stops:
+            raise Exception("Error: The length of the connectivity map does not equal the size (number of mesh stops) of the network. "
                             "Ensure that the map has an entry for each network router so that len(connectivity) = {}.".format(self.xdim * self.ydim))
         
         if sum(connectivity_map) != len(memories.controllers):
@@ -361,48 +262,82 @@ class KingsleyMesh:
             if debug > 0:
                 nic.addParam("debug", 1)
                 nic.addParam("debug_level", debug)
-            data_chan = nic.setSubComponent("data", "kingsley.linkcontrol")
-            data_chan.addParams(self.data_nic_params)
-            req_chan = nic.setSubComponent("req", "kingsley.linkcontrol")
-            req_chan.addParams(self.ctrl_nic_params)
-            ack_chan = nic.setSubComponent("ack", "kingsley.linkcontrol")
-            ack_chan.addParams(self.ctrl_nic_params)
-            fwd_chan = nic.setSubComponent("fwd", "kingsley.linkcontrol")
-            fwd_chan.addParams(self.ctrl_nic_params)
-
-            # Update rtr to point to the router we need to populate
+            # Update rtr to point to the mesh stop we need to populate
             while rtr_slots == 0:
                 rtr += 1
                 rtr_slots = connectivity_map[rtr]
 
-            # Connect linkcontrols according to connectivity_map
-            dlink = sst.Link( self.prefix + str(self.linknum) )
-            rlink = sst.Link( self.prefix + str(self.linknum + 1) )
-            alink = sst.Link( self.prefix + str(self.linknum + 2) )
-            flink = sst.Link( self.prefix + str(self.linknum + 3) )
-            self.linknum += 4
-            port = "local" + str(self.local_ports[rtr])
-            dlink.connect( (self.data_net[rtr], port, self.local_hop_latency), 
-                           (data_chan, "rtr_port", self.local_hop_latency) )
-            rlink.connect( (self.req_net[rtr], port, self.local_hop_latency), 
-                           (req_chan, "rtr_port", self.local_hop_latency) )
-            alink.connect( (self.ack_net[rtr], port, self.local_hop_latency), 
-                           (ack_chan, "rtr_port", self.local_hop_latency) )
-            flink.connect( (self.fwd_net[rtr], port, self.local_hop_latency), 
-                           (fwd_chan, "rtr_port", self.local_hop_latency) )
-            self.local_ports[rtr] += 1
+            self._connectNIC(nic, rtr)
             rtr_slots -= 1
         
 
+    # Attach a non-cache device to the network through its memHierarchy interface
+    #   iface: the device's memHierarchy.standardInterface (sub)component
+    #   requester: True if the device issues requests into the hierarchy (e.g., DMA) and should sit
+    #              at the same level as the core-side caches. False if it responds to requests
+    #              for an address range (e.g., MMIO registers) and should sit at the memory level.
+    def connectDevice(self, iface, router : int, requester=False, debug=0):
+        nic = iface.setSubComponent("lowlink", "memHierarchy.MemNICFour")
+        if requester:
+            self.dev_nics.append(nic)
+        else:
+            self.mem_nics.append(nic)
+        if debug > 0:
+            nic.addParam("debug", 1)
+            nic.addParam("debug_level", debug)
+        self._connectNIC(nic, router)
+
+    # Attach the four channels of a MemNICFour to the router serving mesh stop 'stop'
+    def _connectNIC(self, nic, stop : int):
+        data_chan = nic.setSubComponent("data", self.linkcontrol)
+        data_chan.addParams(self.data_nic_params)
+        req_chan = nic.setSubComponent("req", self.linkcontrol)
+        req_chan.addParams(self.ctrl_nic_params)
+        ack_chan = nic.setSubComponent("ack", self.linkcontrol)
+        ack_chan.addParams(self.ctrl_nic_params)
+        fwd_chan = nic.setSubComponent("fwd", self.linkcontrol)
+        fwd_chan.addParams(self.ctrl_nic_params)
+
+        rtr = self.router_of[stop]
+        dlink = sst.Link( self.prefix + str(self.linknum) )
+        rlink = sst.Link( self.prefix + str(self.linknum + 1) )
+        alink = sst.Link( self.prefix + str(self.linknum + 2) )
+        flink = sst.Link( self.prefix + str(self.linknum + 3) )
+        self.linknum += 4
+        port = self._localPort(self.local_ports[rtr])
+        dlink.connect( (self.data_net[rtr], port, self.local_hop_latency), 
+                       (data_chan, "rtr_port", self.local_hop_latency) )
+        rlink.connect( (self.req_net[rtr], port, self.local_hop_latency), 
+                       (req_chan, "rtr_port", self.local_hop_latency) )
+        alink.connect( (self.ack_net[rtr], port, self.local_hop_latency), 
+                       (ack_chan, "rtr_port", self.local_hop_latency) )
+        flink.connect( (self.fwd_net[rtr], port, self.local_hop_latency), 
+                       (fwd_chan, "rtr_port", self.local_hop_latency) )
+        self.local_ports[rtr] += 1
+
+    # Name of a router's n-th local (endpoint) port
+    def _localPort(self, n : int):
+        return "local" + str(n)
+
+    # Size every router for 'local_ports' endpoints
+    def _setLocalPorts(self, local_ports : int):
+        for net in [self.req_net, self.ack_net, self.fwd_net, self.data_net]:
+            for rtr in net:
+                rtr.addParam("local_ports", local_ports)
+
+    def setRank(self, rank, thread=0):
+        for net in [self.req_net, self.ack_net, self.fwd_net, self.data_net]:
+            for rtr in net:
+                rtr.setRank(rank, thread)
+
     # Final call to finish construction network
     def finalize(self):
-        local_ports = max(self.local_ports)
-        for i in range(0, len(self.req_net)):
-            self.req_net[i].addParam("local_ports", local_ports)
-            self.ack_net[i].addParam("local_ports", local_ports)
-            self.fwd_net[i].addParam("local_ports", local_ports)
-            self.data_net[i].addParam("local_ports", local_ports)
+        self._setLocalPorts(max(self.local_ports))
         
+        # Requesting devices share the group of the caches closest to the cores
+        for nic in self.dev_nics:
+            nic.addParam("group", self.groups[0])
+
         max_level = max(self.groups) + 1
         if len(self.dir_nics) > 0:
             for nic in self.dir_nics:
@@ -412,3 +347,193 @@ class KingsleyMesh:
         if len(self.mem_nics) > 0:
             for nic in self.mem_nics:
                 nic.addParam("group", max_level)
+
+
+"""
+    Base for on-chip networks built from merlin routers instead of kingsley.noc_mesh.
+    Like KingsleyMesh, there are four parallel networks (req, ack, fwd, data) and
+    connectivity maps have one entry per mesh stop of an xdim x ydim floorplan, so the
+    builders are interchangeable. Subclasses choose the router topology and which router
+    serves each mesh stop.
+    Required arguments:
+        shape      = router array dimensions, e.g. [6, 6] or [36]
+        topology   = merlin topology subcomponent, e.g. "merlin.torus" or "merlin.mesh"
+        router_of  = index of the router serving each mesh stop
+        hop_cycles = mesh clock cycles per hop in each dimension of 'shape'
+    route_y_first and equal_port_priority are accepted for compatibility with
+    KingsleyMesh and ignored; merlin routes in dimension order and arbitrates fairly.
+"""
+class MerlinNoC(KingsleyMesh):
+    def __init__(self, prefix, xdim, ydim, shape, topology, router_of, hop_cycles, local_hop_cycles=1,
+                 frequency="2GHz", ctrl_flit_size="8B", data_flit_size="36B",
+                 router_buffer_entries=2, nic_input_buffer_entries=2, nic_output_buffer_entries=2,
+                 route_y_first=False, equal_port_priority=False):
+
+        self.prefix = prefix
+        self.xdim = xdim
+        self.ydim = ydim
+        self.shape = shape
+        self.req_net = []
+        self.ack_net = []
+        self.data_net = []
+        self.fwd_net = []
+        self.groups = []
+        self.dir_nics = []
+        self.mem_nics = []
+        self.dev_nics = []
+        self.linknum = 0
+        self.stops = xdim * ydim
+        self.router_of = router_of
+        self.linkcontrol = "merlin.linkcontrol"
+        # merlin numbers a router's ports: + and - neighbor in each dimension, then local ports
+        self.net_ports = 2 * len(shape)
+
+        frequa = UnitAlgebra(frequency)
+        period = UnitAlgebra("1") / frequa
+        self.local_hop_latency = period * UnitAlgebra(str(local_hop_cycles))
+        hop_latency = [period * UnitAlgebra(str(cycles)) for cycles in hop_cycles]
+
+        ctrl_link_bw = frequa * UnitAlgebra(ctrl_flit_size)
+        data_link_bw = frequa * UnitAlgebra(data_flit_size)
+        ctrl_net_params = {
+            "link_bw" : ctrl_link_bw,
+            "xbar_bw" : ctrl_link_bw,
+            "flit_size" : ctrl_flit_size,
+            "input_latency" : period,
+            "output_latency" : period,
+            "input_buf_size" : UnitAlgebra(str(router_buffer_entries)) * UnitAlgebra(ctrl_flit_size),
+            "output_buf_size" : UnitAlgebra(str(router_buffer_entries)) * UnitAlgebra(ctrl_flit_size),
+        }
+        data_net_params = {
+            "link_bw" : data_link_bw,
+            "xbar_bw" : data_link_bw,
+            "flit_size" : data_flit_size,
+            "input_latency" : period,
+            "output_latency" : period,
+            "input_buf_size" : UnitAlgebra(str(router_buffer_entries)) * UnitAlgebra(data_flit_size),
+            "output_buf_size" : UnitAlgebra(str(router_buffer_entries)) * UnitAlgebra(data_flit_size),
+        }
+        self.ctrl_nic_params = {
+            "link_bw" : ctrl_link_bw,
+            "input_buf_size" : UnitAlgebra(str(nic_input_buffer_entries)) * UnitAlgebra(ctrl_flit_size),
+            "output_buf_size" : UnitAlgebra(str(nic_output_buffer_entries)) * UnitAlgebra(ctrl_flit_size),
+        }
+        self.data_nic_params = {
+            "link_bw" : data_link_bw,
+            "input_buf_size" : UnitAlgebra(str(nic_input_buffer_entries)) * UnitAlgebra(data_flit_size),
+            "output_buf_size" : UnitAlgebra(str(nic_output_buffer_entries)) * UnitAlgebra(data_flit_size),
+        }
+
+        num_routers = 1
+        for dim in shape:
+            num_routers *= dim
+        self.local_ports = [0] * num_routers
+        self.topologies = [] # Topology subcomponents, sized in finalize()
+
+        nets = [("_req", self.req_net, ctrl_net_params), ("_ack", self.ack_net, ctrl_net_params),
+                ("_fwd", self.fwd_net, ctrl_net_params), ("_data", self.data_net, data_net_params)]
+        for name, net, params in nets:
+            for rtr_id in range(0, num_routers):
+                rtr = sst.Component(prefix + name + str(rtr_id), "merlin.hr_router")
+                rtr.addParams(params)
+                rtr.addParam("id", rtr_id)
+                topo = rtr.setSubComponent("topology", topology)
+                topo.addParams({ "shape" : "x".join([str(d) for d in shape]), "width" : "x".join(["1"] * len(shape)) })
+                self.topologies.append(topo)
+                net.append(rtr)
+
+            # Neighbor links. In each dimension, port 2*dim points in the + direction and
+            # port 2*dim+1 in the - direction; merlin.torus expects the wrap-around links,
+            # merlin.mesh leaves the edge ports unconnected
+            wrap = topology == "merlin.torus"
+            for rtr_id in range(0, num_routers):
+                loc = self._location(rtr_id)
+                for dim in range(0, len(shape)):
+                    if loc[dim] + 1 == shape[dim] and not wrap:
+                        continue
+                    neighbor = list(loc)
+                    neighbor[dim] = (loc[dim] + 1) % shape[dim]
+                    link = sst.Link(prefix + name + "_" + str(rtr_id) + "_" + str(dim))
+                    link.connect( (net[rtr_id], "port" + str(2 * dim), hop_latency[dim]),
+                                  (net[self._routerID(neighbor)], "port" + str(2 * dim + 1), hop_latency[dim]) )
+
+    # Router coordinates in 'shape', first dimension fastest
+    def _location(self, rtr_id : int):
+        loc = []
+        for dim in self.shape:
+            loc.append(rtr_id % dim)
+            rtr_id //= dim
+        return loc
+
+    def _routerID(self, loc):
+        rtr_id = 0
+        for dim in reversed(range(0, len(self.shape))):
+            rtr_id = rtr_id * self.shape[dim] + loc[dim]
+        return rtr_id
+
+    def _localPort(self, n : int):
+        return "port" + str(self.net_ports + n)
+
+    def _setLocalPorts(self, local_ports : int):
+        for net in [self.req_net, self.ack_net, self.fwd_net, self.data_net]:
+            for rtr in net:
+                rtr.addParam("num_ports", self.net_ports + local_ports)
+        for topo in self.topologies:
+            topo.addParam("local_ports", local_ports)
+
+
+""" xdim x ydim torus: the mesh floorplan plus wrap-around links in both dimensions """
+class MerlinTorus(MerlinNoC):
+    def __init__(self, prefix, xdim, ydim, x_hop_cycles=1, y_hop_cycles=1, **kwargs):
+        MerlinNoC.__init__(self, prefix, xdim, ydim, [xdim, ydim], "merlin.torus",
+                           list(range(0, xdim * ydim)), [x_hop_cycles, y_hop_cycles], **kwargs)
+
+
+"""
+    Bidirectional ring through every mesh stop, for small core counts. The ring snakes
+    through the rows (left to right, then right to left) so neighbors stay adjacent.
+"""
+class MerlinRing(MerlinNoC):
+    def __init__(self, prefix, xdim, ydim, x_hop_cycles=1, y_hop_cycles=1, **kwargs):
+        router_of = []
+        for y in range(0, ydim):
+            for x in range(0, xdim):
+                router_of.append(y * xdim + (x if y % 2 == 0 else xdim - 1 - x))
+        MerlinNoC.__init__(self, prefix, xdim, ydim, [xdim * ydim], "merlin.torus",
+                           router_of, [max(x_hop_cycles, y_hop_cycles)], **kwargs)
+
+
+"""
+    Concentrated mesh: each router serves 'concentration' neighboring mesh stops
+    (2 = pairs along x, 4 = 2x2 blocks), so there are fewer, longer hops
+"""
+class MerlinConcentratedMesh(MerlinNoC):
+    def __init__(self, prefix, xdim, ydim, concentration=4, x_hop_cycles=1, y_hop_cycles=1, **kwargs):
+        if concentration not in [2, 4]:
+            raise Exception("Error: concentration must be 2 or 4, got {}".format(concentration))
+        cx = 2
+        cy = 1 if concentration == 2 else 2
+        if xdim % cx != 0 or ydim % cy != 0:
+            raise Exception("Error: a {}x{} floorplan cannot be concentrated {}:1".format(xdim, ydim, concentration))
+        rx = xdim // cx
+        router_of = [(y // cy) * rx + (x // cx) for y in range(0, ydim) for x in range(0, xdim)]
+        MerlinNoC.__init__(self, prefix, xdim, ydim, [rx, ydim // cy], "merlin.mesh",
+                           router_of, [x_hop_cycles * cx, y_hop_cycles * cy], **kwargs)
+
+
+# On-chip topologies buildNoC() can construct
+noc_topologies = ["mesh", "torus", "ring", "cmesh2", "cmesh4"]
+
+# Construct the on-chip network named 'topology' for an xdim x ydim floorplan
+def buildNoC(topology, prefix, xdim, ydim, **kwargs):
+    if topology == "mesh":
+        return KingsleyMesh(prefix, xdim, ydim, **kwargs)
+    elif topology == "torus":
+        return MerlinTorus(prefix, xdim, ydim, **kwargs)
+    elif topology == "ring":
+        return MerlinRing(prefix, xdim, ydim, **kwargs)
+    elif topology == "cmesh2":
+        return MerlinConcentratedMesh(prefix, xdim, ydim, concentration=2, **kwargs)
+    elif topology == "cmesh4":
+        return MerlinConcentratedMesh(prefix, xdim, ydim, concentration=4, **kwargs)
+    raise Exception("Error: unknown NoC topology '{}'. Expected one of {}".format(topology, noc_topologies))
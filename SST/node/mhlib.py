@@ -231,6 +231,10 @@ class CacheLevel:
 
     def setLowConnected(self):
         self.low_connected = True
+
+    def setRank(self, rank, thread=0):
+        for cache in self.caches:
+            cache.setRank(rank, thread)
     
     def setReplacement(self, policy : str, params = None, for_directory=False):
         if for_directory:
@@ -253,7 +257,7 @@ class CacheLevel:
         elif policy == "nmru":
             policy_type = "memHierarchy.replacement.nmru"
         elif policy == "random":
-            policy_type = "memHierarchy.replacement.random"
+            policy_type = "memHierarchy.replacement.rand"
         else: 
             raise Exception("Error, requested replacement policy is unknown")
         
@@ -380,6 +384,10 @@ class Memory:
         for controller in self.controllers:
             controller.addParams(params)
 
+    def setRank(self, rank, thread=0):
+        for controller in self.controllers:
+            controller.setRank(rank, thread)
+
 class InterleavedMemory(Memory):
     def __init__(self, prefix: str, controllers: int, total_size, interleave_size, start_address=0, end_address=None):
         super().__init__(prefix)
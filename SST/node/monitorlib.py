@@ -0,0 +1,119 @@
+import re
+
+from runlib import toSeconds
+
+### Progress monitoring for long node simulations.
+###  SST is run with wall-clock heartbeats, each of which prints the current simulated time.
+###  The monitor follows them in the run's sst.log, estimates when the run will finish and
+###  tells runlib.runSST() to stop (or deprioritize) runs that are not worth finishing.
+###  Host-side only (no sst import).
+###
+
+
+heartbeat_re = re.compile(r"Simulation Heartbeat: Simulated Time ([0-9.eE+-]+) ?([a-z]+)")
+
+# SST option for a heartbeat every 'period' seconds of wall-clock time
+heartbeat_option = "--heartbeat-wall-period={}"
+
+monitor_actions = ["kill", "renice"]
+
+
+"""
+    Follows the heartbeats of one SST run and decides whether to let it continue.
+
+    expected_sim_time : simulated seconds the run is expected to take (e.g., beam's length on a
+                        similar configuration); enables the completion estimate and the budget
+    budget            : wall-clock seconds the run may take; runs projected to take longer are stopped
+    beatable          : function(sim_time) -> False once a run that has reached 'sim_time' can no
+                        longer produce a useful result (simulated time only grows, so this is certain)
+    action            : 'kill' stops the run, 'renice' lowers its host priority so other runs get the cores
+    period            : wall-clock seconds between heartbeats
+    window            : heartbeats used to estimate the simulated-time rate
+    report            : function(status()) called after every new heartbeat, e.g., to print progress
+
+    Usage:
+        monitor = ProgressMonitor(expected_sim_time=40e-6, budget=3600, beatable=lambda t: t < best)
+        result = runSST(options, rundir, monitor=monitor)   # adds the heartbeat option to SST
+        monitor.status()                                    # last simulated time, rate, ETA
+"""
+class ProgressMonitor:
+    def __init__(self, expected_sim_time=None, budget=None, beatable=None, action="kill", period=10, window=6, report=None):
+        if action not in monitor_actions:
+            raise Exception("Error: unknown monitor action '{}'. Expected one of {}".format(action, monitor_actions))
+        self.expected_sim_time = expected_sim_time
+        self.budget = budget
+        self.beatable = beatable
+        self.action = action
+        self.period = period
+        self.window = window
+        self.report = report
+        self.sst_args = [heartbeat_option.format(period)]
+        self.samples = []       # (wall seconds since start, simulated seconds) per heartbeat
+        self.acted = None       # Reason, once the action was taken
+        self._offset = 0        # How far sst.log has been read
+        self._partial = ""
+
+    # Reads heartbeats added to 'logname' since the last call
+    def _update(self, logname, elapsed):
+        try:
+            with open(logname) as f:
+                f.seek(self._offset)
+                text = self._partial + f.read()
+                self._offset = f.tell()
+        except OSError:
+            return
+        lines = text.split("\n")
+        self._partial = lines.pop()
+        count = len(self.samples)
+        for line in lines:
+            match = heartbeat_re.search(line)
+            if match is not None:
+                self.samples.append((elapsed, toSeconds(match.group(1), match.group(2))))
+        if self.report is not None and len(self.samples) > count:
+            self.report(self.status())
+
+    # Simulated seconds per wall-clock second over the last 'window' heartbeats, or None
+    def rate(self):
+        recent = self.samples[-self.window:]
+        if len(recent) < 2 or recent[-1][0] == recent[0][0]:
+            return None
+        return (recent[-1][1] - recent[0][1]) / (recent[-1][0] - recent[0][0])
+
+    # Estimated wall-clock seconds until the run completes, or None
+    def eta(self):
+        rate = self.rate()
+        if self.expected_sim_time is None or not rate or not self.samples:
+            return None
+        remaining = self.expected_sim_time - self.samples[-1][1]
+        # Past the expected length: the expectation was low, assume the run is about to finish
+        return max(remaining, 0.0) / rate
+
+    def status(self):
+        return {
+            "sim_time" : self.samples[-1][1] if self.samples else None,
+            "rate" : self.rate(),
+            "eta" : self.eta(),
+            "progress" : self.samples[-1][1] / self.expected_sim_time if self.samples and self.expected_sim_time else None,
+            "acted" : self.acted,
+        }
+
+    """
+        Called by runSST() while the run is in progress. Returns None to let it continue,
+        or (action, reason) the first time it should be stopped or deprioritized.
+    """
+    def check(self, logname, elapsed):
+        self._update(logname, elapsed)
+        if self.acted is not None or not self.samples:
+            return None
+        sim_time = self.samples[-1][1]
+        reason = None
+        if self.beatable is not None and not self.beatable(sim_time):
+            reason = "cannot beat the best result (already at {:.3f} us simulated)".format(sim_time * 1e6)
+        elif self.budget is not None and len(self.samples) >= 3 and self.eta() is not None and elapsed + self.eta() > self.budget:
+            reason = "projected to take {:.0f} s, budget {:.0f} s".format(elapsed + self.eta(), self.budget)
+        elif self.budget is not None and elapsed > self.budget:
+            reason = "exceeded budget of {:.0f} s".format(self.budget)
+        if reason is None:
+            return None
+        self.acted = reason
+        return (self.action, reason)
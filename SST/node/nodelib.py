@@ -0,0 +1,240 @@
+import math
+import sst
+from sst import UnitAlgebra
+from sst.merlin.base import *
+from sst.merlin.topology import *
+from sst.merlin.endpoint import *
+from sst.merlin.interface import *
+from vanadislib import *
+from mhlib import *
+from kinglib import *
+
+### Note: This module builds complete nodes out of the vanadislib, mhlib and kinglib
+###  utilities, using a ChipConfig (params.py) to parameterize them, and optionally
+###  connects several nodes together through a merlin network.
+###
+
+
+"""
+    One ChipConfig-defined node: Vanadis cores and OS, private/shared caches, L3 slices,
+    interleaved memory and the on-chip network (config.noc_topology) that connects them.
+    Required arguments:
+        prefix   = unique prefix for all SST names within this node ("" for a single node)
+        config   = ChipConfig describing the node
+        core_map = mesh connectivity map for the cores (see params.mask())
+        l3_map   = mesh connectivity map for the L3 slices
+
+    Usage:
+        1. Create the node
+        2. Launch applications with node.cpu.configureApplication()
+        3. Optional: addNIC() and connect the node to other nodes with connectNodes()
+        4. Call finalize()
+"""
+class VanadisNode:
+    # core_order optionally permutes the mesh stops cores are placed on (see KingsleyMesh.connectVanadisCores)
+    def __init__(self, prefix, config, core_map, l3_map, core_order=None):
+        self.prefix = prefix
+        self.config = config
+        self.nic = None         # rdmaNic component, if addNIC() was called
+        self.nic_link = None    # merlin.linkcontrol on the NIC, connected by connectNodes()
+
+        # Create the cores
+        self.cpu = Vanadis(prefix + "core", config.core_count, config.core_frequency, hw_threads=config.core_hw_threads, page_size=config.page_size.getRoundedValue())
+        self.cpu.configureMMU(config.getMMUParams())
+        self.cpu.configureCores(config.getCoreParams())
+        self.cpu.configureDecoders(config.getDecoderParams())
+        self.cpu.configureBranchUnits(config.getBranchParams())
+        self.cpu.configureLoadStoreQueues(config.getLSQParams())
+        self.cpu.configureOperatingSystem(config.getOSParams())
+        self.cpu.configureTLBs(config.getDTLBParams(), dtlb=True)
+        self.cpu.configureTLBs(config.getITLBParams(), dtlb=False)
+        self.node_id = self.cpu.node_id
+
+        # Add the private caches to cores to create a core complex
+        self.l2 = None
+        if config.l2org == "private":
+            self.cpu.addPrivateL1L2(config.getL1ICacheParams(), config.getL1DCacheParams(), config.getL2CacheParams())
+            self.cpu.getL2Caches().setReplacement(config.l2cache_replacement)
+
+        else: # Shared L2 caches
+            self.cpu.addPrivateL1(config.getL1ICacheParams(), config.getL1DCacheParams())
+            self.l2 = DistributedL2(prefix + "l2cache", config.core_count, config.getL2CacheParams())
+            self.l2.setReplacement(config.l2cache_replacement)
+
+        self.cpu.getL1ICaches().setReplacement(config.l1icache_replacement)
+        self.cpu.getL1DCaches().setReplacement(config.l1dcache_replacement)
+
+        # Create L3s
+        self.l3 = DistributedL3(prefix + "l3cache", config.l3cache_count, config.getL3CacheParams())
+        self.l3.setReplacement(config.l3cache_replacement, for_directory=False)
+        self.l3.setReplacement(config.l3cache_dir_replacement, for_directory=True)
+
+        # Create memory
+        # The number of memories can be modified by changing the memory connection map
+        # If 'layout' in params.py is modified, this map MUST be modified as well
+        memory_connection_map = config.getMemoryConnectionMap()
+        self.memory = InterleavedMemory(prefix + "memory", sum(memory_connection_map), config.memory_capacity, interleave_size=config.memory_interleave_size)
+        if config.getMemoryModel() == "memHierarchy.simpleDRAM":
+            self.memory.setTimingModelToSimpleDRAM(config.getMemoryParams())
+        else:
+            self.memory.setTimingModelToCustom(config.getMemoryModel(), config.getMemoryParams())
+        self.memory.configureControllers(config.getMemoryControllerParams())
+
+        ## Set up the NoC and connect all the pieces together
+        self.noc = buildNoC(config.noc_topology, prefix + "mesh", config.noc_x, config.noc_y,
+                            frequency=config.noc_frequency,
+                            data_flit_size = config.noc_data_flit,
+                            ctrl_flit_size = config.line_header_size,
+                            nic_input_buffer_entries=config.noc_buffer_depth,
+                            nic_output_buffer_entries=config.noc_buffer_depth,
+                            router_buffer_entries=config.noc_buffer_depth,
+                            route_y_first=config.noc_route_y_first,
+                            equal_port_priority=config.noc_equal_port_priority)
+
+        # Connect cores and OS cache to NoC
+        ## Vanadis models the OS as a process on its own dedicated core (in addition to the 'normal' cores)
+        ## Connect it to mesh_stop 0 (os_router=0)
+        self.noc.connectVanadisCores(self.cpu, core_map, os_router=0, order=core_order)
+
+        # Connect L2s to NoC if needed (shared L2 slices stay with their cores)
+        if self.l2 != None:
+            self.noc.connectDistributedCache(self.l2, core_map, order=core_order)
+
+        # Connect L3s to NoC
+        self.noc.connectDistributedCache(self.l3, l3_map)
+
+        # Connect memories to NoC
+        self.noc.connectMemory(self.memory, memory_connection_map)
+
+    # Add an rdmaNic so the node can talk to other nodes (experimental, see connectNodes)
+    # The NIC's registers sit on the mesh like a memory (MMIO), and its DMA engine
+    # issues requests into the L3 like a core-side cache
+    def addNIC(self, router=0):
+        self.nic = sst.Component(self.prefix + "nic", "rdmaNic.nic")
+        self.nic.addParams(self.config.getNICParams())
+        self.nic.addParam("nicId", self.node_id)
+
+        mmio_if = self.nic.setSubComponent("mmio", "memHierarchy.standardInterface")
+        mmio_if.addParams({ "mmio_addr" : self.config.nic_mmio_base, "mmio_size" : self.config.nic_mmio_size })
+        self.noc.connectDevice(mmio_if, router, requester=False)
+
+        dma_if = self.nic.setSubComponent("dma", "memHierarchy.standardInterface")
+        self.noc.connectDevice(dma_if, router, requester=True)
+
+        self.nic_link = self.nic.setSubComponent("rtrLink", "merlin.linkcontrol")
+        self.nic_link.addParams(self.config.getNICLinkParams())
+
+    # Place every component of this node on one MPI rank/thread
+    def setRank(self, rank, thread=0):
+        self.cpu.setRank(rank, thread)
+        if self.l2 != None:
+            self.l2.setRank(rank, thread)
+        self.l3.setRank(rank, thread)
+        self.memory.setRank(rank, thread)
+        self.noc.setRank(rank, thread)
+        if self.nic != None:
+            self.nic.setRank(rank, thread)
+
+    def finalize(self):
+        self.noc.finalize()
+
+
+""" merlin endpoint that hands each host port of a topology the NIC of one node """
+class NodeEndpoint:
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def build(self, nID, extraKeys):
+        if nID >= len(self.nodes) or self.nodes[nID].nic_link == None:
+            return (None, None)
+        return (self.nodes[nID].nic_link, "rtr_port")
+
+
+""" hr_router that places each router on the same rank as the first node it serves """
+class RankedRouter(hr_router):
+    def __init__(self, rank_of_router):
+        hr_router.__init__(self)
+        self._rank_of_router = rank_of_router
+
+    def instanceRouter(self, name, radix, rtr_id):
+        rtr = hr_router.instanceRouter(self, name, radix, rtr_id)
+        rtr.setRank(self._rank_of_router(rtr_id))
+        return rtr
+
+
+# Granularity of enableProfiling(): per element type (lib.element), per component instance,
+# or per component and each of its subcomponents separately
+profile_levels = ["type", "component", "subcomponent"]
+
+"""
+    Turn on SST's profiling points for every component: call counts and time spent in clock
+    handlers and in link event handlers, plus time in the SyncManager for parallel runs.
+    The data is written to 'output' at the end of the simulation (see hotspots.py).
+    Equivalent to 'sst --enable-profiling=... --profiling-output=...'.
+"""
+def enableProfiling(level="component", output="./profile.txt", sync=False):
+    if level not in profile_levels:
+        raise Exception("Error: unknown profiling level '{}'. Expected one of {}".format(level, profile_levels))
+    tools = [
+        "clocks:sst.profile.handler.clock.time.high_resolution(level={})[clock]".format(level),
+        "events:sst.profile.handler.event.time.high_resolution(level={})[event]".format(level),
+    ]
+    if sync:
+        tools.append("sync:sst.profile.sync.time.high_resolution[sync]")
+    sst.setProgramOption("enable-profiling", ";".join(tools))
+    sst.setProgramOption("profiling-output", output)
+
+
+# Topologies connectNodes() knows how to size for a given node count
+node_topologies = ["single", "dragonfly"]
+
+"""
+    Connect the NICs of 'nodes' through a merlin network and partition the system so that
+    each node (and the routers serving it) lands on its own MPI rank. With fewer ranks than
+    nodes, consecutive nodes share a rank.
+        topology = 'single' (one router, all nodes one hop apart) or 'dragonfly'
+    Experimental: this wiring, the rdmaNic setup in addNIC() and the dragonfly sizing below
+    have not been run under SST yet.
+"""
+def connectNodes(nodes : list, config, topology="single"):
+    num_nodes = len(nodes)
+    ranks = sst.getMPIRankCount()
+
+    def rank_of_node(node):
+        return node * ranks // num_nodes
+
+    if topology == "single":
+        topo = topoSingle()
+        topo.num_ports = num_nodes
+        hosts_per_router = num_nodes
+    elif topology == "dragonfly":
+        # Balanced dragonfly: routers_per_group = 2 * hosts_per_router, sized up to fit num_nodes
+        topo = topoDragonFly()
+        topo.hosts_per_router = 2
+        topo.routers_per_group = 4
+        topo.num_groups = max(2, math.ceil(num_nodes / (topo.hosts_per_router * topo.routers_per_group)))
+        topo.intergroup_links = 1
+        topo.algorithm = ["minimal"]
+        hosts_per_router = topo.hosts_per_router
+    else:
+        raise Exception("Error: unknown node topology '{}'. Expected one of {}".format(topology, node_topologies))
+
+    router = RankedRouter(lambda rtr_id: rank_of_node(min(rtr_id * hosts_per_router, num_nodes - 1)))
+    router.link_bw = config.nic_link_bandwidth
+    router.xbar_bw = config.nic_link_bandwidth
+    router.flit_size = "16B"
+    router.input_latency = UnitAlgebra(config.net_router_latency) / UnitAlgebra("2")
+    router.output_latency = UnitAlgebra(config.net_router_latency) / UnitAlgebra("2")
+    router.input_buf_size = config.nic_buffer_size
+    router.output_buf_size = config.nic_buffer_size
+    topo.router = router
+    topo.link_latency = config.net_link_latency
+
+    for x in range(0, num_nodes):
+        nodes[x].setRank(rank_of_node(x))
+
+    topo.build(NodeEndpoint(nodes))
+
+    # Use the ranks assigned above rather than a graph partitioner
+    if ranks > 1:
+        sst.setProgramOption("partitioner", "sst.self")
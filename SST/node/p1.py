@@ -7,8 +7,12 @@ sys.path.append("./arch")
 from vanadislib import *
 from mhlib import *
 from kinglib import *
+from nodelib import *
 from params import *
+from preflightlib import isKnownBad, checkConnectionMaps, checkChipConfig, loadSchema
+from datasetlib import datasetFile, readHeader
 import argparse
+import json
 
 ### USAGE ###
 #
@@ -21,12 +25,14 @@ import argparse
 # - mhlib.py
 # - vanadislib.py
 # - kinglib.py
+# - nodelib.py
 
 ### OUTPUT ###
 # The expected output of this script is as follows:
 # - stdout-100 : Any output to stdout produced by the app running on the simulated hardware
 # - stderr-100 : Any output to stderr produced by the app running on the simulated hardware
 # - example1.csv : Statistics output from the simulation. The name/filepath can be modified if desired.
+# - A 'Configuration:' line with every argument as JSON, used by resultslib.py to catalog runs
 # - Output to stdout that looks like the following. Simulation time will vary depending on the application you simulate.
 #
 #   $ sst problem.py -- small/basic-io/hello-world/riscv64/hello-world 
@@ -43,8 +49,6 @@ import argparse
 # All other valid configurations are expected to run without errors.
 # The configuration is: -n 16 -c medium -t no -x small -y small -s private -z small -b slow -w 6 -m lat
 
-random.seed(100) # Ensure the selection of disabled cores/caches is reproducible
-
 # Get application and any parameters
 parser = argparse.ArgumentParser()
 parser.add_argument("-e", "--executable", help="The path to the executable the simulation will run", default="beam")
@@ -60,12 +64,71 @@ parser.add_argument("-s", "--l2org", help="L2 organization: {}".format(arg_l2org
 parser.add_argument("-b", "--noc", help="Network on chip: {}".format(arg_noc.keys()), default=next(iter(arg_noc)))
 parser.add_argument("-w", "--memchan", help="The number of memory channels: {}".format(arg_memchan), type=int, default=arg_memchan[0])
 parser.add_argument("-m", "--memtype", help="Type of memory: {}".format(arg_memtype.keys()), default=next(iter(arg_memtype)))
+# Address translation exploration
+parser.add_argument("-g", "--pagesize", help="Page size: {}".format(arg_pagesize.keys()), default=next(iter(arg_pagesize)))
+parser.add_argument("--tlbsize", help="Entries per hardware thread in each DTLB/ITLB: {}".format(arg_tlbsize.keys()), default=next(iter(arg_tlbsize)))
+parser.add_argument("--tlbassoc", help="DTLB/ITLB associativity: {}".format(arg_tlbassoc), type=int, default=arg_tlbassoc[0])
+parser.add_argument("--interleave", help="Memory channel interleave granularity: {}".format(arg_interleave.keys()), default=next(iter(arg_interleave)))
+parser.add_argument("--backing", help="Host backing store for simulated memory: {}. mmap keeps SST's resident memory close to the memory actually touched".format(list(arg_backing.keys())), default=next(iter(arg_backing)))
+# Throughput mode: run several independent applications side by side on the node
+parser.add_argument("-i", "--instance", action="append", default=None,
+                    help="Run an independent application instance with a share of the cores: EXE[:CORES[:ARGS]]. "
+                         "Repeat to launch several instances. CORES defaults to an even share of the unclaimed cores, "
+                         "ARGS (space separated) defaults to '-t CORES'. The shares only size each instance's thread count; "
+                         "the OS schedules the threads on any core. Overrides --executable")
+# Multi-node systems: copies of the node connected through a merlin network
+parser.add_argument("--nodes", help="Experimental: number of nodes to simulate, joined through their NICs by a merlin network. Every node runs its own, independent copy of the app(s); no bundled app uses the NIC, and the NIC wiring has not been run under SST yet. Run with one MPI rank per node (e.g., mpirun -np N sst ...) to simulate each node in parallel", type=int, default=1)
+parser.add_argument("--node-topology", help="Network connecting the nodes when --nodes > 1: {}".format(node_topologies), default=node_topologies[0])
+parser.add_argument("--fidelity", help="Simulation fidelity, lower tiers run faster for screening: {}".format(arg_fidelity), default=arg_fidelity[0])
+# Cache organization: replacement policy and associativity per level (associativity defaults to the size's)
+parser.add_argument("--l1repl", help="L1I/L1D replacement policy: {}".format(arg_replacement), default="lru")
+parser.add_argument("--l2repl", help="L2 replacement policy: {}".format(arg_replacement), default="lru")
+parser.add_argument("--l3repl", help="L3 replacement policy: {}".format(arg_replacement), default="lru")
+parser.add_argument("--dirrepl", help="L3 directory replacement policy: {}".format(arg_replacement), default="lru")
+parser.add_argument("--l1assoc", help="L1I/L1D associativity: {}".format(arg_l1assoc[1:]), type=int, default=None)
+parser.add_argument("--l2assoc", help="L2 associativity: {}".format(arg_l2assoc[1:]), type=int, default=None)
+parser.add_argument("--l3assoc", help="L3 associativity: {}".format(arg_l3assoc[1:]), type=int, default=None)
+parser.add_argument("--nocwidth", help="NoC data link width: {}".format(arg_nocwidth), default=arg_nocwidth[0])
+parser.add_argument("--nocbuffers", help="NoC buffer entries per port: {}".format(arg_nocbuffers), type=int, default=arg_nocbuffers[0])
+parser.add_argument("--nocroute", help="NoC dimension-order routing: {}".format(arg_nocroute.keys()), default=next(iter(arg_nocroute)))
+parser.add_argument("--nocpriority", help="NoC router port priority: {}".format(arg_nocpriority.keys()), default=next(iter(arg_nocpriority)))
+parser.add_argument("--noc-topology", help="On-chip network topology: {} (ring is for up to 32 cores)".format(list(arg_noctopo.keys())), default=next(iter(arg_noctopo)))
+# Simulator profiling: time spent in each component's clock and event handlers (see hotspots.py)
+parser.add_argument("--profile", help="Enable SST profiling points, tracked per: {}".format(profile_levels), default=None)
+parser.add_argument("--profile-output", help="Profiling output file", default="./profile.txt")
+# Replicates: which cores/L3 slices are disabled, and which mesh stop each core (and so each thread) sits on
+parser.add_argument("--seed", help="Seed for choosing the disabled cores and L3 slices", type=int, default=100)
+parser.add_argument("--preflight", help="Check the configuration (parameters against the cached element documentation, connection maps) and exit without simulating", action="store_true")
+parser.add_argument("--thread-seed", help="Seed for a random assignment of cores (threads) to mesh stops. Default: cores fill the mesh in order", type=int, default=None)
+# beam's input: a synthetic dataset of the given size, generated and cached on first use (see datasetlib.py), or a file
+parser.add_argument("--working-set", help="Size of beam's input waveforms: {}".format(arg_workingset), default=arg_workingset[0])
+parser.add_argument("--dataset", help="beam input file written by gendata.py. Overrides --working-set", default=None)
+parser.add_argument("--beam-mode", help="How beam computes its two beams: {} (fused = one pass over the waveforms for both)".format(arg_beammode), default=arg_beammode[0])
 args = parser.parse_args()
+random.seed(args.seed) # Ensure the selection of disabled cores/caches is reproducible
 
 
 app = os.getenv("VANADIS_EXE", args.executable)
 app_args = ["-t",args.cores]
 
+# Instances are (executable, requested core count or None, argument list or None)
+instances = []
+if args.instance is None:
+    instances.append( (app, args.cores, app_args) )
+else:
+    for spec in args.instance:
+        fields = spec.split(":", 2)
+        inst_cores = None
+        inst_args = None
+        if len(fields) > 1 and fields[1] != "":
+            if not fields[1].isdigit():
+                print("Error: --instance core count must be an integer. You provided '{}'.".format(spec))
+                sys.exit(1)
+            inst_cores = int(fields[1])
+        if len(fields) > 2:
+            inst_args = fields[2].split()
+        instances.append( (fields[0], inst_cores, inst_args) )
+
 # Error check parameters
 if args.cores not in arg_cores:
     print("Error: --core must be in {}. You provided '{}'.".format(arg_cores.keys(), args.cores))
@@ -97,9 +160,74 @@ if args.memchan not in arg_memchan:
 if args.memtype not in arg_memtype:
     print("Error: --memtype must be in {}. You provided '{}'.".format(arg_memtype.keys(),args.memtype))
     sys.exit(1)
+if args.pagesize not in arg_pagesize:
+    print("Error: --pagesize must be in {}. You provided '{}'.".format(arg_pagesize.keys(),args.pagesize))
+    sys.exit(1)
+if args.tlbsize not in arg_tlbsize:
+    print("Error: --tlbsize must be in {}. You provided '{}'.".format(arg_tlbsize.keys(),args.tlbsize))
+    sys.exit(1)
+if args.tlbassoc not in arg_tlbassoc:
+    print("Error: --tlbassoc must be in {}. You provided '{}'.".format(arg_tlbassoc,args.tlbassoc))
+    sys.exit(1)
+if args.interleave not in arg_interleave:
+    print("Error: --interleave must be in {}. You provided '{}'.".format(arg_interleave.keys(),args.interleave))
+    sys.exit(1)
+if args.backing not in arg_backing:
+    print("Error: --backing must be in {}. You provided '{}'.".format(list(arg_backing.keys()),args.backing))
+    sys.exit(1)
+if args.working_set not in arg_workingset:
+    print("Error: --working-set must be in {}. You provided '{}'.".format(arg_workingset,args.working_set))
+    sys.exit(1)
+if args.beam_mode not in arg_beammode:
+    print("Error: --beam-mode must be in {}. You provided '{}'.".format(arg_beammode,args.beam_mode))
+    sys.exit(1)
+
+if args.nodes < 1:
+    print("Error: --nodes must be at least 1. You provided '{}'.".format(args.nodes))
+    sys.exit(1)
+if args.node_topology not in node_topologies:
+    print("Error: --node-topology must be in {}. You provided '{}'.".format(node_topologies,args.node_topology))
+    sys.exit(1)
+
+if args.fidelity not in arg_fidelity:
+    print("Error: --fidelity must be in {}. You provided '{}'.".format(arg_fidelity,args.fidelity))
+    sys.exit(1)
+
+for level in ["l1repl", "l2repl", "l3repl", "dirrepl"]:
+    if getattr(args, level) not in arg_replacement:
+        print("Error: --{} must be in {}. You provided '{}'.".format(level, arg_replacement, getattr(args, level)))
+        sys.exit(1)
+for level, allowed in [("l1assoc", arg_l1assoc), ("l2assoc", arg_l2assoc), ("l3assoc", arg_l3assoc)]:
+    if getattr(args, level) not in allowed:
+        print("Error: --{} must be in {}. You provided '{}'.".format(level, allowed[1:], getattr(args, level)))
+        sys.exit(1)
+
+if args.nocwidth not in arg_nocwidth:
+    print("Error: --nocwidth must be in {}. You provided '{}'.".format(arg_nocwidth,args.nocwidth))
+    sys.exit(1)
+if args.nocbuffers not in arg_nocbuffers:
+    print("Error: --nocbuffers must be in {}. You provided '{}'.".format(arg_nocbuffers,args.nocbuffers))
+    sys.exit(1)
+if args.nocroute not in arg_nocroute:
+    print("Error: --nocroute must be in {}. You provided '{}'.".format(arg_nocroute.keys(),args.nocroute))
+    sys.exit(1)
+if args.nocpriority not in arg_nocpriority:
+    print("Error: --nocpriority must be in {}. You provided '{}'.".format(arg_nocpriority.keys(),args.nocpriority))
+    sys.exit(1)
+
+if args.noc_topology not in arg_noctopo:
+    print("Error: --noc-topology must be in {}. You provided '{}'.".format(list(arg_noctopo.keys()),args.noc_topology))
+    sys.exit(1)
+if args.cores > arg_noctopo[args.noc_topology]:
+    print("Error: --noc-topology {} supports up to {} cores. You provided '{}'.".format(args.noc_topology,arg_noctopo[args.noc_topology],args.cores))
+    sys.exit(1)
+
+if args.profile is not None and args.profile not in profile_levels:
+    print("Error: --profile must be in {}. You provided '{}'.".format(profile_levels,args.profile))
+    sys.exit(1)
 
 # Reject problem configuration
-if args.cores == 16 and args.speed == "medium" and args.smt == "no" and args.l1size == "small" and args.l2size == "small" and args.l3size == "small" and args.l2org == "private" and args.noc == "slow" and args.memchan == 6 and args.memtype == "lat":
+if isKnownBad(vars(args)):
     print("\nWARNING: This is a known bad configuration (causes a FATAL error if run). It is the only bad configuration you should encounter.")
     print("         This configuration is NOT the answer to the questions, keep looking! Exiting SST...\n")
     sys.exit(0)
@@ -114,7 +242,26 @@ config = ChipConfig(core_count=args.cores,
                     l2org=args.l2org,
                     noc=args.noc,
                     memchan=args.memchan,
-                    memtype=args.memtype
+                    memtype=args.memtype,
+                    pagesize=args.pagesize,
+                    tlbsize=args.tlbsize,
+                    tlbassoc=args.tlbassoc,
+                    interleave=args.interleave,
+                    nodes=args.nodes,
+                    fidelity=args.fidelity,
+                    l1repl=args.l1repl,
+                    l2repl=args.l2repl,
+                    l3repl=args.l3repl,
+                    dirrepl=args.dirrepl,
+                    l1assoc=args.l1assoc,
+                    l2assoc=args.l2assoc,
+                    l3assoc=args.l3assoc,
+                    nocwidth=args.nocwidth,
+                    nocbuffers=args.nocbuffers,
+                    nocroute=args.nocroute,
+                    nocpriority=args.nocpriority,
+                    noc_topology=args.noc_topology,
+                    backing=args.backing
 )
 
 # Randomly select cores/caches to be disabled if needed
@@ -127,73 +274,89 @@ l3_connection_map = [1] * config.mesh_stops
 inoperable_l3_count = sum(l3_connection_map) - config.l3cache_count
 masked_l3_map = mask(l3_connection_map, inoperable_l3_count, "l3caches")
 
-# Determine where memory will be connected on the mesh
-# The number of memories can be modified by changing this map
-# If 'layout' in example_params.py is modified, this map MUST be modified as well
-memory_connection_map = config.getMemoryConnectionMap()
-memory_channels = sum(memory_connection_map)
-
-# Create the cores
-multicore = Vanadis("core", config.core_count, config.core_frequency, hw_threads=config.core_hw_threads)
-multicore.configureCores(config.getCoreParams())
-multicore.configureDecoders(config.getDecoderParams())
-multicore.configureBranchUnits(config.getBranchParams())
-multicore.configureLoadStoreQueues(config.getLSQParams())
-multicore.configureOperatingSystem(config.getOSParams())
-multicore.configureTLBs(config.getDTLBParams(), dtlb=True)
-multicore.configureTLBs(config.getITLBParams(), dtlb=False)
-multicore.configureApplication(app, app_args=app_args)
-
-# Add the private caches to cores to create a core complex
-l2 = None
-if args.l2org == "private":
-    multicore.addPrivateL1L2(config.getL1ICacheParams(), config.getL1DCacheParams(), config.getL2CacheParams())
-    multicore.getL2Caches().setReplacement(config.l2cache_replacement)
-
-else: # Shared L2 caches
-    multicore.addPrivateL1(config.getL1ICacheParams(), config.getL1DCacheParams())
-    l2 = DistributedL2("l2cache", config.core_count, config.getL2CacheParams())
-    l2.setReplacement(config.l2cache_replacement)
-
-multicore.getL1ICaches().setReplacement(config.l1icache_replacement)
-multicore.getL1DCaches().setReplacement(config.l1dcache_replacement)
-
-# Create L3s
-l3 = DistributedL3("l3cache", config.l3cache_count, config.getL3CacheParams())
-l3.setReplacement(config.l3cache_replacement, for_directory=False)
-l3.setReplacement(config.l3cache_dir_replacement, for_directory=True)
-
-# Create memory
-memories = InterleavedMemory("memory", memory_channels, config.memory_capacity, interleave_size=config.page_size)
-memories.setTimingModelToSimpleDRAM(config.getMemoryParams())
-memories.configureControllers(config.getMemoryControllerParams())
-
-## Set up the NoC and connect all the pieces together
-noc = KingsleyMesh("mesh", config.noc_x, config.noc_y, 
-                   frequency=config.uncore_frequency,
-                   data_flit_size = config.noc_data_flit,
-                   ctrl_flit_size = config.line_header_size,
-                   nic_input_buffer_entries=config.noc_buffer_depth,
-                   nic_output_buffer_entries=config.noc_buffer_depth,
-                   router_buffer_entries=config.noc_buffer_depth)
-
-# Connect cores and OS cache to NoC
-## Vanadis models the OS as a process on its own dedicated core (in addition to the 'normal' cores)
-## Connect it to mesh_stop 0 (os_router=0)
-noc.connectVanadisCores(multicore, masked_core_map, os_router=0)
-
-# Connect L2s to NoC if needed
-if l2 != None:
-    noc.connectDistributedCache(l2, masked_core_map)
-
-# Connect L3s to NoC
-noc.connectDistributedCache(l3, masked_l3_map)
-
-# Connect memories to NoC
-noc.connectMemory(memories, memory_connection_map)
-
-# Finish configuration of the NoC
-noc.finalize()
+# Shuffle the order in which cores fill the enabled mesh stops if requested
+# Thread n runs on core n, so this moves threads around the mesh without changing which stops are disabled
+core_order = None
+if args.thread_seed is not None:
+    core_order = list(range(0, config.mesh_stops))
+    random.Random(args.thread_seed).shuffle(core_order)
+
+# Pre-flight check: report problems in milliseconds instead of after building the node
+if args.preflight:
+    errors = checkConnectionMaps(config, masked_core_map, masked_l3_map)
+    warnings = []
+    schema = loadSchema()
+    if schema is None:
+        warnings.append("no cached element documentation, parameters not checked (run preflight.py --build-schema)")
+    else:
+        param_errors, warnings = checkChipConfig(config, schema)
+        errors += param_errors
+    for message in errors:
+        print("Error: " + message)
+    for message in warnings:
+        print("Warning: " + message)
+    print("Preflight {}: {} error(s), {} warning(s)".format("failed" if errors else "passed", len(errors), len(warnings)))
+    sys.exit(1 if errors else 0)
+
+# Build the node(s)
+# Every node is a copy of the same chip, including which cores/L3 slices are disabled
+nodes = []
+for n in range(0, args.nodes):
+    prefix = "" if args.nodes == 1 else "node{}.".format(n)
+    nodes.append(VanadisNode(prefix, config, masked_core_map, masked_l3_map, core_order=core_order))
+
+# Launch each application instance sized to its share of the cores
+# Only the thread count follows the share: VanadisNodeOS has no core affinity, so the threads are not
+# pinned, but with no more threads than cores in total they do not have to share them
+try:
+    core_shares = partitionCores(config.core_count, [inst[1] for inst in instances])
+except Exception as e:
+    print(e)
+    sys.exit(1)
+
+# beam reads its waveforms at run time (instances whose ARGS already name a file with -f keep it) and fuses its beams with -s
+# The beam options only mean something when beam runs; other apps would silently ignore them
+is_beam = lambda app: os.path.basename(app).startswith("beam")
+beam_args = [name for name, value, default in [("--working-set", args.working_set, arg_workingset[0]), ("--dataset", args.dataset, None),
+             ("--beam-mode", args.beam_mode, arg_beammode[0])] if value != default]
+if beam_args and not any([is_beam(inst[0]) for inst in instances]):
+    print("Error: beam's options ({}) were given, but no instance runs beam".format(", ".join(beam_args)))
+    sys.exit(1)
+
+dataset = None
+if any([is_beam(inst[0]) for inst in instances]):
+    try:
+        dataset = os.path.abspath(args.dataset) if args.dataset is not None else datasetFile(args.working_set)
+        header = readHeader(dataset)
+    except Exception as e:
+        print(e)
+        sys.exit(1)
+    print("Dataset: {}, {} stations x {} samples, {:.2f} MiB".format(dataset, header["stations"], header["samples"],
+          header["waveform_bytes"] / (1 << 20)))
+
+if args.nodes > 1:
+    print("Warning: --nodes is experimental: the NIC and network wiring is untested, and each node runs its apps independently")
+
+for node in nodes:
+    for (inst_app, inst_cores, inst_args), core_share in zip(instances, core_shares):
+        if inst_args is None:
+            inst_args = ["-t", core_share]
+        if dataset is not None and is_beam(inst_app):
+            inst_args = inst_args + (["-f", dataset] if "-f" not in inst_args else [])
+            inst_args = inst_args + (["-s"] if args.beam_mode == "fused" and "-s" not in inst_args else [])
+        pid = node.cpu.configureApplication(inst_app, app_args=inst_args)
+        if len(instances) > 1 and node is nodes[0]:
+            print("Process {}: {} {} (sized for {} of the {} cores, not pinned)".format(pid, inst_app, " ".join(map(str, inst_args)), core_share, config.core_count))
+
+# Connect the nodes to each other through a merlin network
+if args.nodes > 1:
+    for node in nodes:
+        node.addNIC()
+    connectNodes(nodes, config, args.node_topology)
+
+# Finish configuration of the NoC(s)
+for node in nodes:
+    node.finalize()
 
 # Enable statistics everywhere, write to CSV
 # Modify this configuration to send output to a different format or print more/less often
@@ -201,6 +364,17 @@ sst.setStatisticLoadLevel(7)
 sst.enableAllStatisticsForAllComponents()
 sst.setStatisticOutput("sst.statOutputCSV", {"filepath" : args.statfile})
 
+if args.profile is not None:
+    enableProfiling(args.profile, args.profile_output, sync=sst.getMPIRankCount() > 1)
+
 
-print("Selected configuration costs: ${}".format(config.getCost()))
+if args.nodes > 1:
+    print("Selected configuration costs: ${} per node, ${} for {} nodes".format(config.getCost(), round(config.getCost() * args.nodes, 2), args.nodes))
+else:
+    print("Selected configuration costs: ${}".format(config.getCost()))
+# Lets runlib.runSST() find the backing store mappings in the SST process
+memory = nodes[0].memory
+print("Memory backing: {}, {} controllers x {} B{}".format(config.memory_backing, len(memory.controllers) * args.nodes,
+      memory.module_capacity.getRoundedValue(), ", {} B units".format(UnitAlgebra(config.memory_backing_unit).getRoundedValue()) if config.memory_backing_unit else ""))
+print("Configuration: {}".format(json.dumps(vars(args), sort_keys=True)))
 print("Python configuration is finished")
@@ -1,5 +1,10 @@
-from sst import UnitAlgebra
 import random
+try:
+    from sst import UnitAlgebra
+except ImportError:
+    # Host-side tools (runlib.py and friends) only need the option and cost tables below.
+    # ChipConfig itself can only be constructed inside SST.
+    UnitAlgebra = None
 
 ## Allowed params and their definitions
 arg_cores = {32 : "6x6", 64 : "8x8"}
@@ -23,6 +28,35 @@ arg_memtype = {
              "banks" : 32,
              "tCAS" : 48, "tRCD" : 30, "tRP" : 21 },
 }
+arg_pagesize = { "small" : "4KiB", "huge" : "2MiB" }
+arg_tlbsize = { "small" : [64, 0.5], "big" : [256, 1.0] } # Entries per thread, hit latency (ns)
+arg_tlbassoc = [4,8,16]
+arg_interleave = { "page" : None, "4KiB" : "4KiB" } # None = interleave memory channels at the page size
+# Simulation fidelity, from most to least detailed. Lower tiers trade accuracy for simulation speed:
+#   medium: detailed cores, caches and mesh; fixed-latency memory (simpleMem) and an infinite decoder loader cache
+#   fast:   medium plus a half-rate mesh with double-width flits and a smaller out-of-order window
+arg_fidelity = ["detailed", "medium", "fast"]
+# Cache organization. Associativity defaults (None) to the value tied to the size choice above
+arg_replacement = ["lru", "lfu", "mru", "nmru", "random"]
+arg_l1assoc = [None, 4, 8, 16]
+arg_l2assoc = [None, 4, 8, 16]
+arg_l3assoc = [None, 8, 16, 32]
+# NoC microarchitecture
+arg_nocwidth = ["256b", "128b", "512b"] # Data link width; a data flit also carries its share of the line header
+arg_nocbuffers = [2, 4, 8]              # Router and NIC buffer entries per port (flits), 2 is minimum
+arg_nocroute = { "xy" : False, "yx" : True } # Dimension-order routing; value = route_y_first
+arg_nocpriority = { "local" : False, "equal" : True } # Local ports first, or equal priority; value = equal_port_priority
+arg_noctopo = { "mesh" : 64, "torus" : 64, "ring" : 32, "cmesh2" : 64, "cmesh4" : 64 } # See kinglib.buildNoC(); value = max cores
+# Backing store holding the simulated memory contents. Vanadis executes real data, so it cannot be 'none'.
+#   malloc: allocated in units of the value below when first touched, then zeroed
+#   mmap:   one anonymous mapping per memory controller; the host kernel allocates and zero-fills
+#           each 4KiB page when first touched, so resident memory follows the touched footprint
+arg_backing = { "malloc" : "1MiB", "mmap" : None }
+# Size of beam's input waveforms (see datasetlib.py), from inside the L2 to well past the L3.
+# "default" is the original 16 stations x 20 minutes at 40 Hz (5.9MiB)
+arg_workingset = ["default", "256KiB", "2MiB", "16MiB", "64MiB", "256MiB"]
+# How beam computes its coherent and incoherent beams: one pass over the waveforms each, or both in one (beam -s)
+arg_beammode = ["separate", "fused"]
 
 # Memories are located on the mesh edges
 memory_layouts = {
@@ -53,6 +87,18 @@ arg_l3_cost = { "small" : 20, "big" : 36 }
 arg_l2o_cost = { "private" : 0, "shared" : 4 }
 arg_noc_cost = { "slow" : 6, "fast" : 16 }
 arg_mem_cost = { "basic" : 110, "bw" : 200 }
+arg_tlbsize_cost = { "small" : 0, "big" : 3 }
+arg_tlbassoc_cost = { 4 : 0, 8 : 1, 16 : 2 }
+arg_nic_cost = 60 # Per node, only charged when nodes are networked
+# Replacement policy and associativity costs are per core, relative to LRU and to the size's default associativity
+arg_repl_cost = { "lru" : 0, "lfu" : 0.5, "mru" : 0, "nmru" : -0.25, "random" : -0.5 }
+arg_assoc_way_cost = { "l1" : 0.25, "l2" : 0.125, "l3" : 0.125 } # Per way added/removed
+# NoC costs are per core (one router per mesh stop)
+arg_nocwidth_cost = { "128b" : -3, "256b" : 0, "512b" : 6 }
+arg_nocbuffers_cost = { 2 : 0, 4 : 1, 8 : 3 }
+arg_nocroute_cost = { "xy" : 0, "yx" : 0 }
+arg_nocpriority_cost = { "local" : 0, "equal" : 0.5 }
+arg_noctopo_cost = { "mesh" : 0, "torus" : 2, "ring" : -4, "cmesh2" : -2, "cmesh4" : -3 } # Wrap-around wiring vs. fewer routers
 
 
 ###########################################
@@ -78,24 +124,88 @@ def mask(connection_map : list, count : int, info=""):
             
     return connection_map
 
+# Splits 'core_count' cores into shares, one per application instance.
+# 'requests' has one entry per instance: a core count, or None to take an even share
+# of whatever is left over. Returns the core count of each share. p1.py sizes each
+# instance's thread count to its share; the OS schedules the threads on any core.
+def partitionCores(core_count : int, requests : list):
+    fixed = sum([r for r in requests if r is not None])
+    shared = [i for i in range(0, len(requests)) if requests[i] is None]
+    if fixed > core_count:
+        raise Exception("Error: instances request {} cores but the node only has {}".format(fixed, core_count))
+
+    counts = list(requests)
+    if shared:
+        share, extra = divmod(core_count - fixed, len(shared))
+        if share == 0:
+            raise Exception("Error: not enough cores left ({}) to give each of the {} remaining instances a core".format(core_count - fixed, len(shared)))
+        for x in range(0, len(shared)):
+            counts[shared[x]] = share + (1 if x < extra else 0)
+
+    for count in counts:
+        if count < 1:
+            raise Exception("Error: each instance needs at least one core, got {}".format(count))
+    return counts
+
+# Cost model: returns (per core, per memory channel, per node) cost
+# Kept outside ChipConfig so host-side tools can price a configuration without SST
+def costModel(core_type, smt, l1size, l2size, l3size, l2org, noc, memtype, tlbsize="small", tlbassoc=4, nodes=1,
+              l1repl="lru", l2repl="lru", l3repl="lru", dirrepl="lru", l1assoc=None, l2assoc=None, l3assoc=None,
+              nocwidth="256b", nocbuffers=2, nocroute="xy", nocpriority="local", noc_topology="mesh"):
+    if l1assoc is None:
+        l1assoc = arg_l1size[l1size][1]
+    if l2assoc is None:
+        l2assoc = arg_l2size[l2size][1]
+    if l3assoc is None:
+        l3assoc = arg_l3size[l3size][1]
+
+    per_core_cost = arg_core_cost[core_type] * arg_smt_cost[smt]
+    per_core_cost += (arg_l1_cost[l1size] + arg_l2_cost[l2size] + arg_l3_cost[l3size] + arg_l2o_cost[l2org] + arg_noc_cost[noc])
+    per_core_cost += (arg_tlbsize_cost[tlbsize] + arg_tlbassoc_cost[tlbassoc])
+    per_core_cost += (2 * arg_repl_cost[l1repl] + arg_repl_cost[l2repl] + arg_repl_cost[l3repl] + arg_repl_cost[dirrepl])
+    per_core_cost += arg_assoc_way_cost["l1"] * 2 * (l1assoc - arg_l1size[l1size][1]) # L1I + L1D
+    per_core_cost += arg_assoc_way_cost["l2"] * (l2assoc - arg_l2size[l2size][1])
+    per_core_cost += arg_assoc_way_cost["l3"] * (l3assoc - arg_l3size[l3size][1])
+    per_core_cost += (arg_nocwidth_cost[nocwidth] + arg_nocbuffers_cost[nocbuffers] + arg_nocroute_cost[nocroute] + arg_nocpriority_cost[nocpriority] + arg_noctopo_cost[noc_topology])
+    per_mem_cost = arg_mem_cost[memtype]
+    per_node_cost = arg_nic_cost if nodes > 1 else 0
+    return per_core_cost, per_mem_cost, per_node_cost
+
 # Class containing meta parameters for SST configuration
 # This can be modified by passing parameters to the constructor
 class ChipConfig:
     # Init simply sets the 'meta' parameters
     def __init__(self, core_count, core_type, smt, l1size, l2size, l3size, 
-                 l2org, noc, memchan, memtype):
+                 l2org, noc, memchan, memtype, pagesize="small", tlbsize="small", tlbassoc=4,
+                 interleave="page", nodes=1, fidelity="detailed",
+                 l1repl="lru", l2repl="lru", l3repl="lru", dirrepl="lru",
+                 l1assoc=None, l2assoc=None, l3assoc=None,
+                 nocwidth="256b", nocbuffers=2, nocroute="xy", nocpriority="local", noc_topology="mesh",
+                 backing="malloc"):
+
+        # Associativity tied to the size unless set explicitly
+        if l1assoc is None:
+            l1assoc = arg_l1size[l1size][1]
+        if l2assoc is None:
+            l2assoc = arg_l2size[l2size][1]
+        if l3assoc is None:
+            l3assoc = arg_l3size[l3size][1]
         
         # --------------------------------------------#
         ### Cost Model                              ###
         # --------------------------------------------#
-        self.per_core_cost = arg_core_cost[core_type] * arg_smt_cost[smt]
-        self.per_core_cost += (arg_l1_cost[l1size] + arg_l2_cost[l2size] + arg_l3_cost[l3size] + arg_l2o_cost[l2org] + arg_noc_cost[noc])
-        self.per_mem_cost = arg_mem_cost[memtype]        
+        self.per_core_cost, self.per_mem_cost, self.per_node_cost = costModel(core_type, smt, l1size, l2size, l3size, l2org, noc, memtype,
+            tlbsize=tlbsize, tlbassoc=tlbassoc, nodes=nodes, l1repl=l1repl, l2repl=l2repl, l3repl=l3repl, dirrepl=dirrepl,
+            l1assoc=l1assoc, l2assoc=l2assoc, l3assoc=l3assoc,
+            nocwidth=nocwidth, nocbuffers=nocbuffers, nocroute=nocroute, nocpriority=nocpriority, noc_topology=noc_topology)
         
         # --------------------------------------------#
         ### General System                          ###
         # --------------------------------------------#
         self.core_count = core_count
+        self.node_count = nodes
+        self.fidelity = fidelity
+        self.l2org = l2org
         self.memtype = memtype
         self.core_frequency = arg_speed[core_type][0]
         self.uncore_frequency = arg_noc[noc]
@@ -103,7 +213,7 @@ class ChipConfig:
         self.cache_line_size = UnitAlgebra("64B")
         self.memory_capacity = UnitAlgebra("192GiB")
         self.mem_count = memchan
-        self.page_size = UnitAlgebra("4096B")
+        self.page_size = UnitAlgebra(arg_pagesize[pagesize])
         self.layout = arg_cores[core_count]
         self.line_header_size = "8B" # sizeof the header (address + metadata) for a request/response
         self.debug_addresses = []    # No impact unless SST configured with --enable-debug
@@ -112,9 +222,13 @@ class ChipConfig:
         # --------------------------------#
         ### Network-on-chip (NoC)       ###
         # --------------------------------#
-        self.noc_buffer_depth = 2 # 2 is minimum
+        self.noc_buffer_depth = nocbuffers # 2 is minimum
         self.noc_bandwidth = arg_noc[noc]
-        self.noc_link_width = "256b"
+        self.noc_link_width = nocwidth
+        self.noc_route_y_first = arg_nocroute[nocroute]
+        self.noc_equal_port_priority = arg_nocpriority[nocpriority]
+        self.noc_topology = noc_topology
+        self.noc_clock_divider = 1 # Mesh runs at uncore_frequency / noc_clock_divider
 
         # --------------------------------#
         ### Cores                       ###
@@ -143,12 +257,12 @@ class ChipConfig:
         self.core_lsq_stores = 10 # max_stores in store queue
         self.core_lsq_loads = 20 # max_loads in load queue
         self.core_lsq_issues_per_cycle = 2 # Number of loads and stores issued per cycle
-        self.core_data_tlb_hit_latency = 0.5 # In ns
-        self.core_data_tlb_set_size = 4
-        self.core_data_tlb_entries_per_thread = 64
-        self.core_insn_tlb_hit_latency = 0.5 # In ns
-        self.core_insn_tlb_set_size = 4
-        self.core_insn_tlb_entries_per_thread = 64
+        self.core_data_tlb_hit_latency = arg_tlbsize[tlbsize][1] # In ns
+        self.core_data_tlb_set_size = tlbassoc
+        self.core_data_tlb_entries_per_thread = arg_tlbsize[tlbsize][0]
+        self.core_insn_tlb_hit_latency = arg_tlbsize[tlbsize][1] # In ns
+        self.core_insn_tlb_set_size = tlbassoc
+        self.core_insn_tlb_entries_per_thread = arg_tlbsize[tlbsize][0]
         self.core_min_virtual_address = 4096
         self.core_max_virtual_address = 0x80000000
 
@@ -171,7 +285,7 @@ class ChipConfig:
         # --------------------------------#
         self.l1icache_size = arg_l1size[l1size][0]
         self.l1icache_banks = 4
-        self.l1icache_associativity = arg_l1size[l1size][1]
+        self.l1icache_associativity = l1assoc
         self.l1icache_tag_latency = 1
         self.l1icache_latency = arg_l1size[l1size][2]
         self.l1icache_requests_per_cycle = 6
@@ -179,7 +293,7 @@ class ChipConfig:
         self.l1icache_response_bytes_per_cycle = "0B" # No limit on responses
         self.l1icache_fill_buffers = arg_speed[core_type][2]
         self.l1icache_fill_buffer_latency = 1
-        self.l1icache_replacement = "lru"
+        self.l1icache_replacement = l1repl
         # These are for debug/error reporting
         self.l1icache_timeout = 0 # No timeout
         self.l1icache_debug_level = 0 # No impact unless SST configured with --enable-debug
@@ -190,7 +304,7 @@ class ChipConfig:
         # --------------------------------#
         self.l1dcache_size = arg_l1size[l1size][0]
         self.l1dcache_banks = 4
-        self.l1dcache_associativity = arg_l1size[l1size][1]
+        self.l1dcache_associativity = l1assoc
         self.l1dcache_tag_latency = 1
         self.l1dcache_latency = arg_l1size[l1size][2]
         self.l1dcache_requests_per_cycle = 4
@@ -198,7 +312,7 @@ class ChipConfig:
         self.l1dcache_response_bytes_per_cycle = "0B" # No limit on response throughput
         self.l1dcache_fill_buffers = arg_speed[core_type][2]
         self.l1dcache_fill_buffer_latency = 1
-        self.l1dcache_replacement = "lru"
+        self.l1dcache_replacement = l1repl
         # A LL will cause the cache to stall competing accesses for this many cycles
         # or until an SC is executed (whichever is first)
         # Reduces chance of livelock
@@ -213,7 +327,7 @@ class ChipConfig:
         # --------------------------------#
         self.l2cache_size = arg_l2size[l2size][0]
         self.l2cache_banks = 4
-        self.l2cache_associativity = arg_l2size[l2size][1]
+        self.l2cache_associativity = l2assoc
         self.l2cache_tag_latency = 2
         self.l2cache_latency = arg_l2size[l2size][2]
         self.l2cache_requests_per_cycle = 4
@@ -221,7 +335,7 @@ class ChipConfig:
         self.l2cache_response_bytes_per_cycle = "0B" # No limit on response throughput
         self.l2cache_fill_buffers = self.l1dcache_fill_buffers
         self.l2cache_fill_buffer_latency = 1
-        self.l2cache_replacement = "lru"
+        self.l2cache_replacement = l2repl # Shared L2 slices use the '-opt' variant where one exists
         # These are for debug/error reporting
         self.l2cache_debug_level = 0 # No impact unless SST configured with --enable-debug
         self.l2cache_verbose = 1 # Basic warnings enabled
@@ -232,7 +346,7 @@ class ChipConfig:
         self.l3cache_count = core_count
         self.l3cache_size = arg_l3size[l3size][0]
         self.l3cache_banks = 8
-        self.l3cache_associativity = arg_l3size[l3size][1]
+        self.l3cache_associativity = l3assoc
         self.l3cache_latency = arg_l3size[l3size][2]
         self.l3cache_tag_latency = 6
         self.l3cache_requests_per_cycle = 8
@@ -240,7 +354,7 @@ class ChipConfig:
         self.l3cache_response_bytes_per_cycle = "0B" # No limit on response throughput
         self.l3cache_fill_buffers = self.l2cache_fill_buffers + (self.l2cache_fill_buffers // 2) # 50% extra
         self.l3cache_fill_buffer_latency = 1
-        self.l3cache_replacement = "lru"
+        self.l3cache_replacement = l3repl # '-opt' variant where one exists
         # These are for debug/error reporting
         self.l3cache_debug_level = 0 # No impact unless SST configured with --enable-debug
         self.l3cache_verbose = 1 # Basic warnings enabled
@@ -250,15 +364,52 @@ class ChipConfig:
         # --------------------------------#
         # In this config, the directory is co-located with L3
         self.l3cache_dir_entries = (UnitAlgebra(self.l3cache_size) + UnitAlgebra(self.l2cache_size) + UnitAlgebra("512KB")) / self.cache_line_size
-        self.l3cache_dir_replacement = "lru"
+        self.l3cache_dir_replacement = dirrepl # '-opt' variant where one exists
         self.l3cache_dir_associativity = 16
 
         # --------------------------------#
         ### Memory                      ###
         # --------------------------------#
         self.memory_controller_clock = self.uncore_frequency
-        self.memory_backing = "malloc" # Allocate memory to hold simulated data on-demand
-        self.memory_initialize_to_zero = True
+        self.memory_backing = backing # Allocate memory to hold simulated data on-demand
+        self.memory_backing_unit = arg_backing[backing]
+        self.memory_initialize_to_zero = backing == "malloc" # mmap'd pages are already zero-filled
+        # Channels are interleaved at the page size unless overridden so that
+        # a page never straddles two channels
+        if arg_interleave[interleave] is None:
+            self.memory_interleave_size = self.page_size
+        else:
+            self.memory_interleave_size = UnitAlgebra(arg_interleave[interleave])
+
+        # --------------------------------#
+        ### Node NIC (multi-node only)  ###
+        # --------------------------------#
+        # The NIC's registers are memory-mapped just above physical memory
+        self.nic_clock = self.uncore_frequency
+        self.nic_mmio_base = self.memory_capacity.getRoundedValue()
+        self.nic_mmio_size = 4096
+        self.nic_cmd_queue_size = 64
+        self.nic_max_pending_cmds = 128
+        self.nic_max_mem_reqs = 256
+        self.nic_link_bandwidth = "25GB/s"
+        self.nic_buffer_size = "14KiB"
+        self.net_link_latency = "50ns"
+        self.net_router_latency = "100ns"
+
+        # --------------------------------#
+        ### Fidelity                    ###
+        # --------------------------------#
+        if fidelity != "detailed":
+            self.memory_model = "memHierarchy.simpleMem"
+            self.core_loader_mode = 1 # Infinite loader cache
+        else:
+            self.memory_model = "memHierarchy.simpleDRAM"
+            self.core_loader_mode = 0 # LRU loader cache
+        if fidelity == "fast":
+            # Same bandwidth per link, half as many router clock ticks to simulate
+            self.noc_clock_divider = 2
+            self.noc_link_width = "{}b".format(2 * int(self.noc_link_width.rstrip("b")))
+            self.core_reorder_slots = 32
 
         ########################################################################
         ############################### STOP ###################################
@@ -279,10 +430,14 @@ class ChipConfig:
             self.noc_link_width_bytes = UnitAlgebra(self.noc_link_width) / byte_convert
         else:
             self.noc_link_width_bytes = UnitAlgebra(self.noc_link_width)
+        # A link wider than a line still moves one line per flit
+        if self.noc_link_width_bytes.getRoundedValue() > self.cache_line_size.getRoundedValue():
+            self.noc_link_width_bytes = self.cache_line_size
         self.data_flits_per_line = self.cache_line_size / self.noc_link_width_bytes
         self.header_per_data_flit = UnitAlgebra(self.line_header_size) / self.data_flits_per_line
         self.noc_data_flit = self.noc_link_width_bytes + self.header_per_data_flit
         self.noc_size = self.layout # Do not change without also modifying structures in example.py
+        self.noc_frequency = UnitAlgebra(self.uncore_frequency) / UnitAlgebra(str(self.noc_clock_divider))
 
     def getCoreParams(self):
         return { 
@@ -330,6 +485,13 @@ class ChipConfig:
             "useMMU" : True,
         }
 
+    def getMMUParams(self):
+        return {
+            "num_cores" : self.core_count,
+            "num_threads" : self.core_hw_threads,
+            "page_size" : self.page_size.getRoundedValue(),
+        }
+
     def getBranchParams(self):
         return { "branch_entries" : self.core_branch_entries }
 
@@ -339,7 +501,7 @@ class ChipConfig:
             "uop_cache_entries" : self.core_uop_entries,
             "predecode_cache_entries" :  self.core_predecode_cache_entries, # Number of cache lines to store
             "decode_max_ins_per_cycle" : self.core_decodes_per_cycle,
-            "loader_mode" : 0 # Use LRU instead of infinite cache
+            "loader_mode" : self.core_loader_mode # 0 = LRU, 1 = infinite cache
         }
     
     def getLSQParams(self):
@@ -505,16 +667,28 @@ class ChipConfig:
         }
 
     def getMemoryControllerParams(self):
-        return {
+        params = {
             "clock" : self.memory_controller_clock,
             "backing" : self.memory_backing,
             "initBacking" : self.memory_initialize_to_zero
         }
+        if self.memory_backing_unit is not None:
+            params["backing_size_unit"] = self.memory_backing_unit
+        return params
     
     def getMemoryModel(self):
-        return "memHierarchy.SimpleDRAM"
+        return self.memory_model
     
     def getMemoryParams(self):
+        if self.memory_model == "memHierarchy.simpleMem":
+            # Fixed latency equal to a simpleDRAM row miss (activate + CAS)
+            timing = arg_memtype[self.memtype]
+            access_time = UnitAlgebra(str(timing["tRCD"] + timing["tCAS"])) / UnitAlgebra(timing["cycle_time"])
+            return {
+                "access_time" : access_time,
+                "request_width" : 64,
+                "max_requests_per_cycle" : timing["max_requests_per_cycle"],
+            }
         params = {
             "request_width" : 64,
             "cycle_time" : "3200MHz",
@@ -525,11 +699,32 @@ class ChipConfig:
         }
         return params | arg_memtype[self.memtype]
 
+    def getNICParams(self):
+        return {
+            "clock" : self.nic_clock,
+            "baseAddr" : self.nic_mmio_base,
+            "cmdQSize" : self.nic_cmd_queue_size,
+            "maxPendingCmds" : self.nic_max_pending_cmds,
+            "maxMemReqs" : self.nic_max_mem_reqs,
+            "maxCmdQSize" : self.nic_cmd_queue_size,
+            "cache_line_size" : self.cache_line_size.getRoundedValue(),
+            "numNodes" : self.node_count,
+            "pesPerNode" : 1,
+        }
+
+    def getNICLinkParams(self):
+        return {
+            "link_bw" : self.nic_link_bandwidth,
+            "input_buf_size" : self.nic_buffer_size,
+            "output_buf_size" : self.nic_buffer_size,
+        }
+
     def getMemoryConnectionMap(self):
         return memory_layouts[self.core_count][self.mem_count]
     
     def getCost(self):
         cost = self.per_core_cost * self.core_count
         cost += (self.per_mem_cost * self.mem_count)
+        cost += self.per_node_cost
         return round(cost,2)
 
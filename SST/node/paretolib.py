@@ -0,0 +1,121 @@
+import bisect
+import csv
+import json
+import threading
+
+### Incrementally maintained cost/simulated-time Pareto frontier.
+###  Points are added as results arrive; a point is on the frontier when no other point is
+###  at most as expensive and at most as slow. Host-side only (no sst import).
+###
+
+
+"""
+    Pareto frontier of (cost, time) points, lower is better in both.
+    The frontier is kept as two lists sorted by cost, with time strictly decreasing, so
+    adding a point and asking whether a point could still join the frontier are both a
+    binary search plus removal of the points it dominates.
+    Safe to use from several threads (e.g., sweep.py's worker pool).
+
+    Usage:
+        frontier = ParetoFrontier()
+        frontier.add(key, cost, sim_time, data={ ... })   # True if the point joined the frontier
+        frontier.canReach(cost, min_time)                 # False: a run this costly cannot beat the frontier
+        frontier.isDominated(key)
+        frontier.writeCSV("pareto.csv"); frontier.writeJSON("pareto.json"); frontier.plot("pareto.png")
+"""
+class ParetoFrontier:
+    def __init__(self):
+        self.points = {}    # key : (cost, time, data) for every point added
+        self._costs = []    # Frontier, cheapest first
+        self._times = []
+        self._keys = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, cost : float, time : float, data=None):
+        with self._lock:
+            self.points[key] = (cost, time, data)
+            # Dominated by the fastest frontier point that is no more expensive
+            i = bisect.bisect_right(self._costs, cost)
+            if i > 0 and self._times[i - 1] <= time:
+                return False
+            # Remove the frontier points this one dominates: at least as expensive and as slow
+            lo = bisect.bisect_left(self._costs, cost)
+            hi = lo
+            while hi < len(self._costs) and self._times[hi] >= time:
+                hi += 1
+            self._costs[lo:hi] = [cost]
+            self._times[lo:hi] = [time]
+            self._keys[lo:hi] = [key]
+            return True
+
+    # True unless a frontier point is at most 'cost' and at most 'min_time', i.e. a run
+    # costing 'cost' that takes at least 'min_time' could still join the frontier
+    def canReach(self, cost : float, min_time : float):
+        with self._lock:
+            i = bisect.bisect_right(self._costs, cost)
+            return not (i > 0 and self._times[i - 1] <= min_time)
+
+    def isDominated(self, key):
+        cost, time, _ = self.points[key]
+        with self._lock:
+            i = bisect.bisect_left(self._costs, cost)
+            return not (i < len(self._keys) and self._keys[i] == key)
+
+    # Frontier points as (key, cost, time, data), cheapest first
+    def frontier(self):
+        with self._lock:
+            return [(key, cost, time, self.points[key][2]) for key, cost, time in zip(self._keys, self._costs, self._times)]
+
+    # Every point, cheapest first, with whether it is dominated
+    def allPoints(self):
+        on_frontier = set([key for key, _, _, _ in self.frontier()])
+        return sorted([(key, cost, time, data, key not in on_frontier) for key, (cost, time, data) in self.points.items()],
+                      key=lambda p: (p[1], p[2]))
+
+    # One row per point: key, cost, time, dominated, then the entries of each point's data dict
+    def writeCSV(self, filename : str, frontier_only=False):
+        points = self.allPoints()
+        if frontier_only:
+            points = [p for p in points if not p[4]]
+        columns = []
+        for _, _, _, data, _ in points:
+            for column in (data or {}).keys():
+                if column not in columns:
+                    columns.append(column)
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["key", "cost", "time", "dominated"] + columns)
+            for key, cost, time, data, dominated in points:
+                writer.writerow([key, cost, time, int(dominated)] + [(data or {}).get(c, "") for c in columns])
+
+    def writeJSON(self, filename : str):
+        with open(filename, "w") as f:
+            json.dump({
+                "frontier" : [{ "key" : key, "cost" : cost, "time" : time, "data" : data } for key, cost, time, data in self.frontier()],
+                "dominated" : [{ "key" : key, "cost" : cost, "time" : time, "data" : data }
+                               for key, cost, time, data, dominated in self.allPoints() if dominated],
+            }, f, indent=1)
+
+    # Scatter of all points with the frontier as a staircase. Needs matplotlib.
+    def plot(self, filename : str, time_scale=1e6, time_label="simulated time (us)"):
+        try:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+        except ImportError:
+            raise Exception("Error: plotting the Pareto frontier requires matplotlib (pip install matplotlib)")
+        points = self.allPoints()
+        frontier = self.frontier()
+        fig, ax = plt.subplots(figsize=(8, 5))
+        ax.scatter([p[1] for p in points if p[4]], [p[2] * time_scale for p in points if p[4]], s=8, c="lightgray", label="dominated")
+        ax.step([p[1] for p in frontier], [p[2] * time_scale for p in frontier], where="post", c="tab:blue")
+        ax.scatter([p[1] for p in frontier], [p[2] * time_scale for p in frontier], s=16, c="tab:blue", label="frontier")
+        ax.set_xlabel("cost ($)")
+        ax.set_ylabel(time_label)
+        ax.legend()
+        fig.tight_layout()
+        fig.savefig(filename)
+        plt.close(fig)
@@ -0,0 +1,92 @@
+import argparse
+import os
+import subprocess
+import sys
+
+from runlib import *
+from preflightlib import *
+
+### USAGE ###
+#
+# Checks p1.py configurations before they are simulated, so invalid jobs are rejected in
+# milliseconds instead of after SST has spent minutes building them.
+#
+#   $ python3 preflight.py --build-schema                  # once per SST installation: cache sst-info's parameter docs
+#   $ python3 preflight.py --max-cost 3000 -- --cores 64 --speed fast --memtype bw
+#   $ python3 preflight.py --configs configs.txt --deep    # one set of p1.py options per line
+#
+# Without --deep the checks run in plain python: option values, known bad configurations,
+# memory connection maps and the cost limit. --deep also runs 'sst p1.py -- ... --preflight',
+# which builds the ChipConfig inside SST (about a second, no components are created) and
+# checks every get*Params() set against the cached element documentation and the core and
+# L3 connection maps. sweep.py applies the plain python checks to every configuration.
+#
+
+# Runs p1.py --preflight in SST; returns (passed, output)
+def deepCheck(options, sst):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(node_script) + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run([sst, node_script, "--"] + [str(x) for x in options] + ["--preflight"],
+                            capture_output=True, text=True, env=env)
+    lines = [line for line in (result.stdout + result.stderr).splitlines() if line.startswith(("Error", "Warning", "Preflight", "FATAL"))]
+    return result.returncode == 0, lines
+
+def main(args):
+    if args.build_schema:
+        schema = buildSchema(sst_info=args.sst_info)
+        print("Cached documentation of {} element types ({}) in {}".format(len(schema["types"]), schema["version"], eli_schema_file))
+        if not args.options and not args.configs:
+            return
+
+    configs = [args.options] if args.options else []
+    if args.configs:
+        with open(args.configs) as f:
+            configs += [line.split() for line in f if line.strip() and not line.startswith("#")]
+    if not configs:
+        configs = [[]]
+
+    rejected = 0
+    for options in configs:
+        config, other = parseOptions(options)
+        nodes = int(other.get("--nodes", 1))
+        problems = checkOptions(config)
+        if not problems:
+            problems += checkCost(config, args.max_cost, nodes)
+        notes = []
+        if not problems and args.deep:
+            passed, notes = deepCheck(options, args.sst)
+            if not passed:
+                problems += [line for line in notes if not line.startswith(("Warning", "Preflight"))] or ["p1.py --preflight failed"]
+            notes = [line for line in notes if line.startswith("Warning")]
+
+        print("{:>8}  {}".format("REJECT" if problems else "ok", " ".join(options) if options else "(defaults)"))
+        for problem in problems:
+            print("          " + problem)
+        for note in notes:
+            print("          " + note)
+        rejected += 1 if problems else 0
+
+    if len(configs) > 1:
+        print("")
+        print("{} of {} configurations rejected".format(rejected, len(configs)))
+    if rejected:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('options', nargs='*',
+                    help='p1.py options, after --.')
+    ap.add_argument('--configs', type=str, default=None,
+                    help='File with one set of p1.py options per line.')
+    ap.add_argument('--max-cost', type=float, default=None,
+                    help='Reject configurations costing more than this per node.')
+    ap.add_argument('--deep', action='store_true',
+                    help='Also check the ChipConfig parameter sets inside SST (p1.py --preflight).')
+    ap.add_argument('--build-schema', action='store_true',
+                    help='Cache the parameter documentation of the element libraries from sst-info.')
+    ap.add_argument('--sst', type=str, default='sst',
+                    help='SST executable.')
+    ap.add_argument('--sst-info', type=str, default='sst-info',
+                    help='sst-info executable.')
+    args = ap.parse_args()
+    main(args)
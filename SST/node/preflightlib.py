@@ -0,0 +1,248 @@
+import json
+import os
+import re
+import subprocess
+import xml.etree.ElementTree as ElementTree
+
+from params import *
+from runlib import configSpace, configCost, int_dims
+
+### Pre-flight checks for node configurations.
+###  Catches configurations that would fail, or silently not do what was asked, before
+###  SST spends minutes building them: option values, connection maps, cost limits and the
+###  parameter sets of ChipConfig checked against the element libraries' own parameter
+###  documentation (ELI), as reported by sst-info and cached in a JSON file.
+###  Does not import sst: the option, map and cost checks run in plain python, and
+###  checkChipConfig() is given a ChipConfig built inside SST (p1.py --preflight).
+###
+
+
+# Configurations known to fail. Each is { option : value } and matches when all its options match.
+#  The first is the documented FATAL configuration; it needs a 16-core layout and a 'lat'
+#  memory type, neither of which params.py defines any more, so it is also rejected as invalid.
+known_bad_configs = [
+    { "cores" : 16, "speed" : "medium", "smt" : "no", "l1size" : "small", "l2size" : "small", "l3size" : "small",
+      "l2org" : "private", "noc" : "slow", "memchan" : 6, "memtype" : "lat" },
+]
+
+# p1.py's short options
+p1_short_options = { "-n" : "cores", "-c" : "speed", "-t" : "smt", "-x" : "l1size", "-y" : "l2size", "-z" : "l3size",
+                     "-s" : "l2org", "-b" : "noc", "-w" : "memchan", "-m" : "memtype", "-g" : "pagesize" }
+# p1.py options that take no value (action="store_true")
+p1_flags = ["--preflight"]
+
+# Element type that each ChipConfig parameter set is applied to (see nodelib.VanadisNode)
+# None = the type depends on the configuration, see chipParamType()
+chip_param_types = {
+    "getCoreParams" : "vanadis.dbg_VanadisCPU",
+    "getOSParams" : "vanadis.VanadisNodeOS",
+    "getMMUParams" : "mmu.simpleMMU",
+    "getBranchParams" : "vanadis.VanadisBasicBranchUnit",
+    "getDecoderParams" : "vanadis.VanadisRISCV64Decoder",
+    "getLSQParams" : "vanadis.VanadisBasicLoadStoreQueue",
+    "getDTLBParams" : "mmu.simpleTLB",
+    "getITLBParams" : "mmu.simpleTLB",
+    "getL1ICacheParams" : "memHierarchy.Cache",
+    "getL1DCacheParams" : "memHierarchy.Cache",
+    "getL2CacheParams" : "memHierarchy.Cache",
+    "getL3CacheParams" : "memHierarchy.Cache",
+    "getMemoryControllerParams" : "memHierarchy.MemController",
+    "getMemoryParams" : None,
+    "getNICParams" : "rdmaNic.nic",
+    "getNICLinkParams" : "merlin.linkcontrol",
+}
+
+# Element libraries p1.py builds from, and the cached schema of their parameters
+eli_libraries = ["vanadis", "mmu", "memHierarchy", "kingsley", "merlin", "rdmaNic"]
+eli_schema_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eli-schema.json")
+
+# Units that SST parses parameters with; a parameter documented with one of these needs one too
+eli_units = { "Hz" : "frequency", "B" : "size", "s" : "time", "b" : "size" }
+eli_default_re = re.compile(r"^\s*[0-9.]+\s*([KMGT]i?)?(Hz|B|s|b)\s*$")
+number_re = re.compile(r"^\s*[0-9.]+\s*$")
+
+
+"""
+    Turns p1.py command line options into { dimension : value } for the configSpace()
+    dimensions. Other options are returned as { option : value }, with None for the flags in
+    p1_flags. Values stay strings; '--option=value' works as '--option value'.
+"""
+def parseOptions(options : list):
+    space = configSpace()
+    config = {}
+    other = {}
+    x = 0
+    while x < len(options):
+        option = str(options[x])
+        if option.startswith("--") and "=" in option:
+            option, value = option.split("=", 1)
+            x += 1
+        elif option in p1_flags:
+            value = None
+            x += 1
+        else:
+            value = str(options[x + 1]) if x + 1 < len(options) else None
+            x += 2
+        name = p1_short_options.get(option, option.lstrip("-").replace("-", "_"))
+        if name in space:
+            config[name] = value
+        else:
+            other[option] = value
+    return config, other
+
+# True if the options ({ option : value }, e.g. vars(args) in p1.py) match a known bad configuration
+def isKnownBad(options : dict):
+    for bad in known_bad_configs:
+        if all([str(options.get(key)) == str(value) for key, value in bad.items()]):
+            return True
+    return False
+
+"""
+    Checks option values ({ dimension : value }, None = p1.py default) without SST: every value
+    is one p1.py accepts, the configuration is not known to fail, and the core, L3 and memory
+    connection maps fit the mesh. Returns a list of problems (empty if the configuration is valid).
+"""
+def checkOptions(config : dict):
+    space = configSpace()
+    values = {}
+    problems = []
+    if isKnownBad(config):
+        problems.append("known bad configuration (fails with a FATAL error)")
+    for dim, value in config.items():
+        if value is None:
+            continue
+        allowed = [str(v) for v in space[dim]]
+        if str(value) not in allowed:
+            problems.append("--{} must be in {}, got '{}'".format(dim.replace("_", "-"), allowed, value))
+            continue
+        values[dim] = int(value) if dim in int_dims and value != "None" else value
+    if problems:
+        return problems
+
+    cores = values.get("cores", space["cores"][0])
+    memchan = values.get("memchan", space["memchan"][0])
+    topology = values.get("noc_topology", space["noc_topology"][0])
+    xdim, ydim = [int(d) for d in arg_cores[cores].split("x")]
+    stops = xdim * ydim
+    if cores > arg_noctopo[topology]:
+        problems.append("--noc-topology {} supports up to {} cores, got {}".format(topology, arg_noctopo[topology], cores))
+    if cores not in memory_layouts or memchan not in memory_layouts[cores]:
+        problems.append("no memory connection map for {} cores with {} channels".format(cores, memchan))
+    else:
+        memory_map = memory_layouts[cores][memchan]
+        if len(memory_map) != stops:
+            problems.append("memory connection map has {} entries for {} mesh stops".format(len(memory_map), stops))
+        if sum(memory_map) != memchan:
+            problems.append("memory connection map connects {} controllers, --memchan is {}".format(sum(memory_map), memchan))
+    return problems
+
+# Returns a list with the problem if the configuration costs more than 'max_cost' (None = no limit)
+def checkCost(config : dict, max_cost=None, nodes=1):
+    if max_cost is None:
+        return []
+    cost = configCost(config, nodes)
+    if cost > max_cost:
+        return ["costs ${} per node, limit ${}".format(cost, max_cost)]
+    return []
+
+"""
+    Checks the connection maps p1.py built for a ChipConfig: one entry per mesh stop, and
+    as many connections as cores, L3 slices and memory controllers. Returns a list of problems.
+"""
+def checkConnectionMaps(config, core_map : list, l3_map : list):
+    problems = []
+    for name, connection_map, count in [("core", core_map, config.core_count), ("L3", l3_map, config.l3cache_count),
+                                        ("memory", config.getMemoryConnectionMap(), config.mem_count)]:
+        if len(connection_map) != config.mesh_stops:
+            problems.append("{} connection map has {} entries for {} mesh stops".format(name, len(connection_map), config.mesh_stops))
+        if sum(connection_map) != count:
+            problems.append("{} connection map connects {}, expected {}".format(name, sum(connection_map), count))
+    return problems
+
+"""
+    Runs sst-info on the element libraries and caches the documented parameters of every
+    component, subcomponent and module as
+        { "version" : sst-info's version, "types" : { "lib.Type" : { param : default } } }
+    Returns the schema.
+"""
+def buildSchema(sst_info="sst-info", filename=eli_schema_file, libraries=eli_libraries):
+    xmlname = filename + ".xml"
+    result = subprocess.run([sst_info, "-x", "-o", xmlname] + libraries, capture_output=True, text=True)
+    if result.returncode != 0 or not os.path.exists(xmlname):
+        raise Exception("Error: sst-info failed (exit code {}): {}".format(result.returncode, result.stderr.strip()))
+    version = subprocess.run([sst_info, "--version"], capture_output=True, text=True).stdout.strip()
+
+    types = {}
+    root = ElementTree.parse(xmlname).getroot()
+    for library in root.iter("Element"):
+        for element in library:
+            if element.tag not in ["Component", "SubComponent", "Module"]:
+                continue
+            types[library.get("Name") + "." + element.get("Name")] = {
+                param.get("Name") : param.get("Default") for param in element.iter("Parameter") }
+    os.remove(xmlname)
+    if not types:
+        raise Exception("Error: sst-info reported no elements for {}".format(libraries))
+
+    schema = { "version" : version, "types" : types }
+    with open(filename, "w") as f:
+        json.dump(schema, f, indent=1, sort_keys=True)
+    return schema
+
+# Cached schema from buildSchema(), or None if there is none
+def loadSchema(filename=eli_schema_file):
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as f:
+        return json.load(f)
+
+# Parameter name with instance numbers and ELI placeholders (%d, %(name)d, #) made uniform
+def _paramPattern(name):
+    return re.sub(r"%\([^)]*\)[a-z]|%[a-z]|#|[0-9]+", "#", name)
+
+"""
+    Checks one parameter set against the documentation of element type 'eli_type'.
+    Returns (errors, warnings):
+        errors   = values SST cannot use, e.g. a plain number for a parameter that needs units
+        warnings = parameters the element does not document; SST ignores these silently
+    Names scoped to a subcomponent slot ("backend.mem_size") are not checked.
+"""
+def checkParams(schema, eli_type : str, params : dict):
+    errors = []
+    warnings = []
+    documented = schema["types"].get(eli_type)
+    if documented is None:
+        return errors, ["no documentation for '{}' (rebuild the schema with preflight.py --build-schema)".format(eli_type)]
+    patterns = set([_paramPattern(name) for name in documented.keys()])
+    for name, value in params.items():
+        if "." in name:
+            continue
+        if name not in documented and _paramPattern(name) not in patterns:
+            warnings.append("'{}' is not a parameter of {}".format(name, eli_type))
+            continue
+        default = documented.get(name)
+        match = eli_default_re.match(default) if isinstance(default, str) else None
+        if match is not None and not isinstance(value, bool) and number_re.match(str(value)):
+            errors.append("'{}' = {} needs a {} with units (documented default '{}')".format(name, value, eli_units[match.group(2)], default))
+    return errors, warnings
+
+# Element type a ChipConfig parameter set is applied to
+def chipParamType(config, getter : str):
+    if chip_param_types[getter] is None:
+        return config.getMemoryModel()
+    return chip_param_types[getter]
+
+"""
+    Checks every ChipConfig.get*Params() set against the cached schema.
+    Returns (errors, warnings), each message prefixed with the parameter set it came from.
+"""
+def checkChipConfig(config, schema):
+    errors = []
+    warnings = []
+    for getter in chip_param_types.keys():
+        if getter in ["getNICParams", "getNICLinkParams"] and config.node_count < 2:
+            continue
+        e, w = checkParams(schema, chipParamType(config, getter), getattr(config, getter)())
+        errors += ["{}: {}".format(getter, m) for m in e]
+        warnings += ["{}: {}".format(getter, m) for m in w]
+    return errors, warnings
@@ -0,0 +1,145 @@
+import argparse
+import csv
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from runlib import *
+
+### USAGE ###
+#
+# Re-runs node configurations under different random placements to tell real differences
+# from placement noise. Every replicate of a configuration uses another --seed (which cores
+# and L3 slices are disabled) and/or --thread-seed (which mesh stop each core, and so each
+# application thread, sits on). All configurations share the same seeds, so they are compared
+# replicate by replicate.
+#
+#   $ python3 replicate.py --replicates 8 --config "--cores 64 --l3size big" --config "--cores 64 --memtype bw"
+#   $ python3 replicate.py --replicates 8 --vary both --configs configs.txt   # one set of p1.py options per line
+#
+# Replicate 0 is p1.py's default placement, so it matches the runs of sweep.py. Reported are the
+# mean simulated time with its 95% confidence interval, how stable each configuration's rank is
+# across replicates and, for configurations next to each other in the ranking, whether their
+# difference is larger than the placement noise (paired 95% interval excludes zero).
+#
+
+# Two-sided 95% Student's t critical values for 1..30 degrees of freedom
+t95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+       2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+       2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+default_seed = 100  # p1.py's --seed default
+
+# p1.py options selecting the placement of replicate 'k'
+def replicateArgs(k, vary):
+    if k == 0:
+        return []
+    options = []
+    if vary in ["placement", "both"]:
+        options += ["--seed", default_seed + k]
+    if vary in ["threads", "both"]:
+        options += ["--thread-seed", k]
+    return options
+
+# Mean and half-width of the 95% confidence interval of the mean (None for fewer than 2 values)
+def meanInterval(values):
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, None
+    std = math.sqrt(sum([(v - mean) ** 2 for v in values]) / (len(values) - 1))
+    t = t95[len(values) - 2] if len(values) - 1 <= len(t95) else 1.960
+    return mean, t * std / math.sqrt(len(values))
+
+def main(args):
+    configs = [config.split() for config in args.config]
+    if args.configs:
+        with open(args.configs) as f:
+            configs += [line.split() for line in f if line.strip() and not line.startswith("#")]
+    if not configs:
+        configs = [[]]
+    if args.replicates < 2:
+        print("Error: --replicates must be at least 2. You provided '{}'.".format(args.replicates))
+        sys.exit(1)
+
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for x in range(0, len(configs)):
+            for k in range(0, args.replicates):
+                options = configs[x] + replicateArgs(k, args.vary)
+                jobs[(x, k)] = (options, pool.submit(runSST, options, os.path.join(args.workdir, runID(options)),
+                                                     sst=args.sst, timeout=args.timeout))
+    results = { key : job.result() for key, (_, job) in jobs.items() }
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["config", "replicate", "sim_time_us", "wall_time_s", "options"])
+        for (x, k), (options, _) in sorted(jobs.items()):
+            sim_time = results[(x, k)]["sim_time"]
+            writer.writerow([x, k, sim_time * 1e6 if sim_time is not None else "", round(results[(x, k)]["wall_time"], 2),
+                             " ".join([str(o) for o in options])])
+    print("Wrote {}".format(args.output))
+
+    # Only replicates that completed for every configuration can be compared
+    complete = [k for k in range(0, args.replicates) if all([results[(x, k)]["sim_time"] is not None for x in range(0, len(configs))])]
+    failed = len(configs) * args.replicates - len([r for r in results.values() if r["sim_time"] is not None])
+    if len(complete) < 2:
+        print("Error: fewer than 2 replicates completed for every configuration ({} runs failed)".format(failed))
+        sys.exit(1)
+    times = [[results[(x, k)]["sim_time"] for k in complete] for x in range(0, len(configs))]
+
+    # Rank of every configuration in every replicate, 1 = fastest
+    ranks = [rankData([times[x][i] for x in range(0, len(configs))]) for i in range(0, len(complete))]
+    order = sorted(range(0, len(configs)), key=lambda x: sum(times[x]))
+
+    print("")
+    print("{:>4}  {:>12}  {:>12}  {:>8}  {:>12}  {:>12}  {:>10}  {}".format(
+        "id", "mean (us)", "95% CI (us)", "CI %", "min (us)", "max (us)", "ranks", "options"))
+    for x in order:
+        mean, half = meanInterval(times[x])
+        held = [ranks[i][x] for i in range(0, len(complete))]
+        print("{:>4}  {:>12.3f}  {:>12.3f}  {:>7.2f}%  {:>12.3f}  {:>12.3f}  {:>10}  {}".format(x, mean * 1e6, half * 1e6,
+              100 * half / mean, min(times[x]) * 1e6, max(times[x]) * 1e6,
+              "{:g}-{:g}".format(min(held), max(held)), " ".join(configs[x]) if configs[x] else "(defaults)"))
+
+    if len(configs) > 1:
+        # Agreement between the rankings of different replicates
+        pairs = [rankCorrelation(ranks[i], ranks[j]) for i in range(0, len(complete)) for j in range(i + 1, len(complete))]
+        stable = len([x for x in range(0, len(configs)) if len(set([ranks[i][x] for i in range(0, len(complete))])) == 1])
+        print("")
+        print("Rank stability: mean rank correlation between replicates {:.3f}, {} of {} configurations hold one rank in every replicate".format(
+              sum(pairs) / len(pairs), stable, len(configs)))
+
+        print("")
+        print("Neighbouring configurations (paired over {} replicates):".format(len(complete)))
+        for a, b in zip(order, order[1:]):
+            diffs = [(tb - ta) / ta for ta, tb in zip(times[a], times[b])]
+            mean, half = meanInterval(diffs)
+            verdict = "real" if mean - half > 0 else "within placement noise"
+            print("  {:>4} vs {:<4} {:>+7.2%} +/- {:.2%}  {}".format(a, b, mean, half, verdict))
+    if failed:
+        print("")
+        print("{} run(s) failed; replicates missing for any configuration were left out".format(failed))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--config', action='append', default=[],
+                    help='p1.py options of one configuration, quoted (repeatable).')
+    ap.add_argument('--configs', type=str, default=None,
+                    help='File with one set of p1.py options per line.')
+    ap.add_argument('--replicates', type=int, default=5,
+                    help='Runs per configuration, each with a different placement.')
+    ap.add_argument('--vary', type=str, default='placement', choices=['placement', 'threads', 'both'],
+                    help='What changes between replicates: disabled core/L3 placement (--seed), thread-to-core assignment (--thread-seed), or both.')
+    ap.add_argument('--jobs', type=int, default=os.cpu_count(),
+                    help='Number of simulations to run concurrently.')
+    ap.add_argument('--workdir', type=str, default='replicates',
+                    help='Directory to hold one run directory per replicate.')
+    ap.add_argument('--output', type=str, default='replicates.csv',
+                    help='Per-run results.')
+    ap.add_argument('--sst', type=str, default='sst',
+                    help='SST executable.')
+    ap.add_argument('--timeout', type=float, default=None,
+                    help='Kill any single simulation after this many seconds.')
+    args = ap.parse_args()
+    main(args)
@@ -0,0 +1,89 @@
+import argparse
+import sys
+
+from resultslib import *
+
+### USAGE ###
+#
+# Catalogs finished runs in a SQLite database and answers questions about them.
+#
+#   $ python3 results.py ingest sweep calibration      # add new/changed run directories
+#   $ python3 results.py fastest --max-cost 3000 --where cores=64
+#   $ python3 results.py pareto
+#   $ python3 results.py stat CacheMisses --component l3cache
+#   $ python3 results.py sql "SELECT l3size, min(sim_time) FROM runs GROUP BY l3size"
+#
+# Any directory holding an sst.log is a run. Runs launched by hand should be started in
+# their own directory with stdout redirected to sst.log.
+#
+
+# Parses DIM=value filters into a dict
+def parseWhere(specs, dims):
+    where = {}
+    for spec in specs:
+        dim, sep, value = spec.partition("=")
+        if sep == "" or dim not in dims:
+            print("Error: bad --where '{}'. Expected DIM=value with DIM one of {}".format(spec, dims))
+            sys.exit(1)
+        where[dim] = value
+    return where
+
+# Prints runs with the options that differ from p1.py's defaults
+def printRuns(rows):
+    space = configSpace()
+    print("{:>12}  {:>9}  {:>10}  {:>10}  {}".format("sim (us)", "cost", "wall (s)", "rss (MiB)", "options"))
+    for row in rows:
+        options = json.loads(row["options"]) if row["options"] is not None else {}
+        changed = ["--{} {}".format(dim, options[dim]) for dim in space.keys()
+                   if options.get(dim) is not None and str(options[dim]) != str(space[dim][0])]
+        print("{:>12.3f}  {:>9}  {:>10}  {:>10}  {}".format(row["sim_time"] * 1e6, row["cost"] if row["cost"] is not None else "-",
+              "{:.1f}".format(row["wall_time"]) if row["wall_time"] is not None else "-",
+              "{:.1f}".format(row["peak_rss"] / 1024) if row["peak_rss"] is not None else "-",
+              " ".join(changed) if changed else row["rundir"]))
+
+def main(args):
+    db = ResultsDB(args.db)
+    if args.command == "ingest":
+        print("Ingested {} run(s) into {}".format(db.ingest(*args.paths), args.db))
+    elif args.command == "fastest":
+        printRuns(db.fastest(max_cost=args.max_cost, limit=args.limit, where=parseWhere(args.where, db.dims)))
+    elif args.command == "pareto":
+        printRuns(db.pareto(where=parseWhere(args.where, db.dims)))
+    elif args.command == "stat":
+        for row in db.stat(args.statistic, args.component):
+            print("{:>6}  {:<24}  {:>16.0f}  {:>10}  {}".format(row["id"], row["component"], row["sum"], row["count"], row["rundir"]))
+    elif args.command == "sql":
+        rows = db.query(args.sql)
+        if rows:
+            print("\t".join(rows[0].keys()))
+        for row in rows:
+            print("\t".join([str(v) for v in row]))
+    db.close()
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--db', type=str, default='results.db',
+                    help='SQLite database file.')
+    commands = ap.add_subparsers(dest='command', required=True)
+
+    cmd = commands.add_parser('ingest', help='Add or update the runs found under the given directories.')
+    cmd.add_argument('paths', nargs='+')
+
+    cmd = commands.add_parser('fastest', help='Fastest completed runs, optionally under a cost limit.')
+    cmd.add_argument('--max-cost', type=float, default=None)
+    cmd.add_argument('--limit', type=int, default=10)
+    cmd.add_argument('--where', action='append', default=[], help='DIM=value (repeatable).')
+
+    cmd = commands.add_parser('pareto', help='Cost/simulated-time Pareto set.')
+    cmd.add_argument('--where', action='append', default=[], help='DIM=value (repeatable).')
+
+    cmd = commands.add_parser('stat', help='Rolled-up value of one statistic per run.')
+    cmd.add_argument('statistic')
+    cmd.add_argument('--component', type=str, default=None,
+                     help='Component name with instance numbers removed, e.g. core_l1d or l3cache.')
+
+    cmd = commands.add_parser('sql', help='Run an SQL query against the runs and stats tables.')
+    cmd.add_argument('sql')
+
+    args = ap.parse_args()
+    main(args)
@@ -0,0 +1,240 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+import time
+
+from runlib import *
+
+### Persistent store for finished node simulations.
+###  Every run (from sweep.py, calibrate.py or by hand) becomes one row holding its full
+###  p1.py argument set, cost, simulated time, host cost and rolled-up statistics, so
+###  results can be queried across sessions instead of re-reading run directories.
+###  Like runlib.py, this module does not import sst.
+###
+
+
+# Columns of the 'runs' table besides one column per configSpace() dimension
+run_columns = [
+    ("rundir", "TEXT UNIQUE NOT NULL"),
+    ("mtime", "REAL"),              # sst.log modification time when ingested
+    ("ingested", "REAL"),
+    ("options", "TEXT"),            # every p1.py argument as JSON, defaults included
+    ("returncode", "INTEGER"),
+    ("timed_out", "INTEGER"),
+    ("cost", "REAL"),
+    ("sim_time", "REAL"),           # seconds, NULL if the simulation did not complete
+    ("wall_time", "REAL"),          # seconds
+    ("build_time", "REAL"),         # seconds, from 'sst --print-timing-info'
+    ("peak_rss", "INTEGER"),        # KiB
+    ("backing_rss", "INTEGER"),     # KiB, resident memory of the simulated-memory backing store
+] + [("miss_" + level, "REAL") for level, _ in cache_levels]
+
+schema = """
+CREATE TABLE IF NOT EXISTS stats (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    component TEXT NOT NULL,
+    statistic TEXT NOT NULL,
+    sum REAL,
+    count INTEGER,
+    PRIMARY KEY (run_id, component, statistic)
+);
+CREATE INDEX IF NOT EXISTS runs_cost ON runs(cost, sim_time);
+CREATE INDEX IF NOT EXISTS runs_sim_time ON runs(sim_time);
+CREATE INDEX IF NOT EXISTS stats_statistic ON stats(statistic, component);
+"""
+
+# Collapses the per-instance part of a component name: node1.core_l1d12 -> node.core_l1d
+component_instance_re = re.compile(r"_?[0-9]+(?=\.|$)")
+
+"""
+    Reads an sst.statOutputCSV file and returns { (component, statistic) : [sum, count] }
+    summed over all instances of each component (see component_instance_re)
+"""
+def rollupStats(statfile : str):
+    rollup = {}
+    with open(statfile) as f:
+        for row in csv.DictReader(f, skipinitialspace=True):
+            sums = [v for k, v in row.items() if k is not None and k.startswith("Sum.")]
+            counts = [v for k, v in row.items() if k is not None and k.startswith("Count.")]
+            key = (component_instance_re.sub("", row["ComponentName"]), row["StatisticName"])
+            entry = rollup.setdefault(key, [0.0, 0])
+            entry[0] += float(sums[0]) if sums and sums[0] != "" else 0.0
+            entry[1] += int(counts[0]) if counts and counts[0] != "" else 0
+    return rollup
+
+"""
+    Collects everything known about the run in 'rundir' from the files it left behind:
+        sst.log     = p1.py's 'Configuration:' line, cost, simulated time, timing info
+        result.json = host wall time and peak RSS written by sweep.py/runSST() users
+        example1.csv (or 'statfile' from the configuration) = statistics
+    Returns None if the directory holds no sst.log
+"""
+def readRun(rundir : str):
+    logname = os.path.join(rundir, "sst.log")
+    if not os.path.exists(logname):
+        return None
+    with open(logname) as f:
+        text = f.read()
+
+    run = {
+        "rundir" : os.path.abspath(rundir),
+        "mtime" : os.path.getmtime(logname),
+        "options" : parseConfig(text),
+        "returncode" : None,
+        "timed_out" : None,
+        "cost" : parseCost(text),
+        "sim_time" : parseSimTime(text),
+        "wall_time" : None,
+        "build_time" : None,
+        "peak_rss" : None,
+        "backing_rss" : None,
+    }
+    timing = parseTimingInfo(text)
+    run["wall_time"] = timing.get("total_time")
+    run["build_time"] = timing.get("build_time")
+    run["peak_rss"] = timing.get("peak_rss")
+
+    resultfile = os.path.join(rundir, "result.json")
+    if os.path.exists(resultfile):
+        with open(resultfile) as f:
+            result = json.load(f)
+        for key in ["returncode", "timed_out", "wall_time", "peak_rss", "backing_rss"]:
+            if result.get(key) is not None:
+                run[key] = result[key]
+
+    statname = "example1.csv"
+    if run["options"] is not None and run["options"].get("statfile"):
+        statname = run["options"]["statfile"]
+    statfile = os.path.join(rundir, statname)
+    run["stats"] = rollupStats(statfile) if os.path.exists(statfile) else {}
+    run["miss_rates"] = missRates(readCacheStats(statfile)) if os.path.exists(statfile) else {}
+    return run
+
+
+"""
+    SQLite database of runs. One row per run directory in 'runs', with one column per
+    configSpace() dimension so configurations can be filtered in SQL, and the rolled-up
+    statistics of each run in 'stats'.
+
+    Usage:
+        db = ResultsDB("results.db")
+        db.ingest("sweep")                  # only new or changed runs are (re)read
+        db.fastest(max_cost=3000, limit=5)
+        db.pareto()
+"""
+class ResultsDB:
+    def __init__(self, path="results.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.dims = list(configSpace().keys())
+
+        self.conn.execute("CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, {})".format(
+            ", ".join(["{} {}".format(name, kind) for name, kind in run_columns])))
+        # Columns and dimensions added after the database was created
+        existing = [row["name"] for row in self.conn.execute("PRAGMA table_info(runs)")]
+        for name, kind in run_columns:
+            if name not in existing:
+                self.conn.execute("ALTER TABLE runs ADD COLUMN {} {}".format(name, kind.replace(" UNIQUE NOT NULL", "")))
+        for dim in self.dims:
+            if dim not in existing:
+                self.conn.execute("ALTER TABLE runs ADD COLUMN {} TEXT".format(dim))
+        for dim in self.dims:
+            self.conn.execute("CREATE INDEX IF NOT EXISTS runs_{0} ON runs({0})".format(dim))
+        self.conn.executescript(schema)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # Inserts or replaces one run from readRun()
+    def add(self, run : dict):
+        options = run["options"] if run["options"] is not None else {}
+        row = { name : run.get(name) for name, _ in run_columns }
+        row["ingested"] = time.time()
+        row["options"] = json.dumps(options, sort_keys=True) if run["options"] is not None else None
+        if row["timed_out"] is not None:
+            row["timed_out"] = int(row["timed_out"])
+        for level, _ in cache_levels:
+            row["miss_" + level] = run["miss_rates"].get(level)
+        for dim in self.dims:
+            row[dim] = str(options[dim]) if options.get(dim) is not None else None
+
+        self.conn.execute("DELETE FROM runs WHERE rundir = ?", (row["rundir"],))
+        cursor = self.conn.execute("INSERT INTO runs ({}) VALUES ({})".format(
+            ", ".join(row.keys()), ", ".join(["?"] * len(row))), list(row.values()))
+        self.conn.executemany("INSERT INTO stats VALUES (?, ?, ?, ?, ?)",
+                              [(cursor.lastrowid, component, statistic, total, count)
+                               for (component, statistic), (total, count) in run["stats"].items()])
+        return cursor.lastrowid
+
+    """
+        Adds every run directory (any directory with an sst.log) below the given paths.
+        Runs already in the database whose sst.log has not changed are skipped.
+        Returns the number of runs added or updated.
+    """
+    def ingest(self, *paths):
+        known = { row["rundir"] : row["mtime"] for row in self.conn.execute("SELECT rundir, mtime FROM runs") }
+        added = 0
+        for path in paths:
+            for dirpath, _, filenames in os.walk(path):
+                if "sst.log" not in filenames:
+                    continue
+                rundir = os.path.abspath(dirpath)
+                if known.get(rundir) == os.path.getmtime(os.path.join(dirpath, "sst.log")):
+                    continue
+                run = readRun(dirpath)
+                if run is not None:
+                    self.add(run)
+                    added += 1
+        self.conn.commit()
+        return added
+
+    # Builds ' AND '-joined conditions from { dimension : value } for the WHERE clause
+    def _filter(self, where : dict):
+        clauses = ["sim_time IS NOT NULL"]
+        values = []
+        for dim, value in where.items():
+            if dim not in self.dims:
+                raise Exception("Error: unknown dimension '{}'. Expected one of {}".format(dim, self.dims))
+            clauses.append("{} = ?".format(dim))
+            values.append(str(value))
+        return " AND ".join(clauses), values
+
+    # The fastest completed runs that cost at most 'max_cost', optionally restricted by 'where'
+    def fastest(self, max_cost=None, limit=10, where={}):
+        clause, values = self._filter(where)
+        if max_cost is not None:
+            clause += " AND cost <= ?"
+            values.append(max_cost)
+        return self.conn.execute("SELECT * FROM runs WHERE {} ORDER BY sim_time, cost LIMIT ?".format(clause),
+                                 values + [limit]).fetchall()
+
+    """
+        The cost/simulated-time Pareto set: completed runs for which no other run is both
+        cheaper (or equal) and faster. Returned cheapest first.
+    """
+    def pareto(self, where={}):
+        clause, values = self._filter(where)
+        frontier = []
+        best = None
+        for row in self.conn.execute("SELECT * FROM runs WHERE {} AND cost IS NOT NULL ORDER BY cost, sim_time".format(clause), values):
+            if best is None or row["sim_time"] < best:
+                frontier.append(row)
+                best = row["sim_time"]
+        return frontier
+
+    # Rolled-up value of one statistic per run, e.g. stat("CacheMisses", "core_l1d")
+    def stat(self, statistic, component=None):
+        query = "SELECT runs.id, runs.rundir, stats.component, stats.sum, stats.count FROM stats JOIN runs ON runs.id = stats.run_id WHERE statistic = ?"
+        values = [statistic]
+        if component is not None:
+            query += " AND component = ?"
+            values.append(component)
+        return self.conn.execute(query, values).fetchall()
+
+    def query(self, sql, values=[]):
+        return self.conn.execute(sql, values).fetchall()
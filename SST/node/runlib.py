@@ -0,0 +1,373 @@
+import csv
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+from params import *
+
+# time_units, toSeconds, parseSimTime and runID are shared with network/netlib.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from simlib import *
+
+### Host-side helpers for post-processing node simulations.
+###  Unlike the other *lib.py modules this file does not import sst, so it can be
+###  used from plain python to inspect the output of finished runs.
+###
+
+
+app_time_re = re.compile(r"Total run time: ([0-9]+) us")
+cost_re = re.compile(r"Selected configuration costs: \$([0-9.]+)")
+config_re = re.compile(r"^Configuration: (\{.*\})$", re.MULTILINE)
+# Printed by 'sst --print-timing-info'
+timing_re = {
+    "build_time" : re.compile(r"Build time:\s+([0-9.eE+-]+) ?(s|ms|us)"),
+    "run_time" : re.compile(r"Run stage [Tt]ime:\s+([0-9.eE+-]+) ?(s|ms|us)"),
+    "total_time" : re.compile(r"Total time:\s+([0-9.eE+-]+) ?(s|ms|us)"),
+}
+rss_re = re.compile(r"Max Resident Set Size:\s+([0-9.]+) ?([KMG]?B)")
+rss_units = { "B" : 1.0 / 1024, "KB" : 1.0, "MB" : 1024.0, "GB" : 1024.0 * 1024 }
+backing_re = re.compile(r"^Memory backing: (\w+), ([0-9]+) controllers x ([0-9]+) B(?:, ([0-9]+) B units)?$", re.MULTILINE)
+
+# Default SST configuration script, next to this file
+node_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "p1.py")
+
+
+# Returns the run time in seconds that an application (e.g., beam) reported for itself, or None
+def parseAppRunTime(text : str):
+    match = app_time_re.search(text)
+    if match is None:
+        return None
+    return toSeconds(match.group(1), "us")
+
+# Returns the node cost printed by p1.py, or None
+def parseCost(text : str):
+    match = cost_re.search(text)
+    if match is None:
+        return None
+    return float(match.group(1))
+
+# Returns the p1.py arguments (as a dict) printed on the 'Configuration:' line, or None
+def parseConfig(text : str):
+    match = config_re.search(text)
+    if match is None:
+        return None
+    return json.loads(match.group(1))
+
+# Returns whichever of build_time, run_time, total_time (seconds) and peak_rss (KiB)
+# 'sst --print-timing-info' reported
+def parseTimingInfo(text : str):
+    info = {}
+    for key, pattern in timing_re.items():
+        match = pattern.search(text)
+        if match is not None:
+            info[key] = toSeconds(match.group(1), match.group(2))
+    match = rss_re.search(text)
+    if match is not None:
+        info["peak_rss"] = int(float(match.group(1)) * rss_units[match.group(2)])
+    return info
+
+# Returns { pid : stdout text } for every simulated process that wrote a stdout-<pid> file in 'path'
+def readAppOutputs(path="."):
+    outputs = {}
+    for filename in glob.glob(os.path.join(path, "stdout-*")):
+        pid = filename.rsplit("-", 1)[-1]
+        if not pid.isdigit():
+            continue
+        with open(filename) as f:
+            outputs[int(pid)] = f.read()
+    return dict(sorted(outputs.items()))
+
+# Architecture dimensions of p1.py, keyed by argument name (long option with '-' as '_'), with their allowed values
+# The first value of each dimension is p1.py's default
+def configSpace():
+    return {
+        "cores" : list(arg_cores.keys()),
+        "speed" : list(arg_speed.keys()),
+        "smt" : list(arg_smt.keys()),
+        "l1size" : list(arg_l1size.keys()),
+        "l2size" : list(arg_l2size.keys()),
+        "l3size" : list(arg_l3size.keys()),
+        "l2org" : list(arg_l2org),
+        "noc" : list(arg_noc.keys()),
+        "memchan" : list(arg_memchan),
+        "memtype" : list(arg_memtype.keys()),
+        "pagesize" : list(arg_pagesize.keys()),
+        "tlbsize" : list(arg_tlbsize.keys()),
+        "tlbassoc" : list(arg_tlbassoc),
+        "interleave" : list(arg_interleave.keys()),
+        "l1repl" : list(arg_replacement),
+        "l2repl" : list(arg_replacement),
+        "l3repl" : list(arg_replacement),
+        "dirrepl" : list(arg_replacement),
+        "l1assoc" : list(arg_l1assoc),
+        "l2assoc" : list(arg_l2assoc),
+        "l3assoc" : list(arg_l3assoc),
+        "nocwidth" : list(arg_nocwidth),
+        "nocbuffers" : list(arg_nocbuffers),
+        "nocroute" : list(arg_nocroute.keys()),
+        "nocpriority" : list(arg_nocpriority.keys()),
+        "noc_topology" : list(arg_noctopo.keys()),
+        "backing" : list(arg_backing.keys()),
+        "working_set" : list(arg_workingset),
+        "beam_mode" : list(arg_beammode),
+    }
+
+# The original node dimensions, varied by default in sweeps
+core_dims = ["cores", "speed", "smt", "l1size", "l2size", "l3size", "l2org", "noc", "memchan", "memtype"]
+
+# Turns { option : value } into p1.py command line arguments
+# Options set to None are left at p1.py's default
+def configArgs(config : dict):
+    options = []
+    for key, value in config.items():
+        if value is not None:
+            options += ["--" + key.replace("_", "-"), str(value)]
+    return options
+
+# Dimensions whose values p1.py parses as integers
+int_dims = ["cores", "memchan", "tlbassoc", "l1assoc", "l2assoc", "l3assoc", "nocbuffers"]
+
+# Cost of a configuration ({ dimension : value }, None or missing = p1.py default) as
+# ChipConfig.getCost() would report it, without running SST
+def configCost(config : dict, nodes=1):
+    space = configSpace()
+    values = {}
+    for dim in space.keys():
+        value = config.get(dim)
+        if value is None:
+            value = space[dim][0]
+        if dim in int_dims and value is not None:
+            value = int(value)
+        values[dim] = value
+    per_core, per_mem, per_node = costModel(values["speed"], values["smt"], values["l1size"], values["l2size"], values["l3size"],
+        values["l2org"], values["noc"], values["memtype"], tlbsize=values["tlbsize"], tlbassoc=values["tlbassoc"], nodes=nodes,
+        l1repl=values["l1repl"], l2repl=values["l2repl"], l3repl=values["l3repl"], dirrepl=values["dirrepl"],
+        l1assoc=values["l1assoc"], l2assoc=values["l2assoc"], l3assoc=values["l3assoc"],
+        nocwidth=values["nocwidth"], nocbuffers=values["nocbuffers"], nocroute=values["nocroute"],
+        nocpriority=values["nocpriority"], noc_topology=values["noc_topology"])
+    # Same total as ChipConfig.getCost()
+    return round(per_core * values["cores"] + per_mem * values["memchan"] + per_node, 2)
+
+# Which cache level a memHierarchy cache belongs to, from the names nodelib gives them
+cache_levels = [
+    ("l1i", re.compile(r"_l1i[0-9]+$")),
+    ("l1d", re.compile(r"_l1d[0-9]+$")),
+    ("l2", re.compile(r"(_l2|l2cache)[0-9]+$")),
+    ("l3", re.compile(r"l3cache[0-9]+$")),
+]
+
+"""
+    Reads an sst.statOutputCSV file and returns { level : [hits, misses] } for the levels
+    in cache_levels, summed over every cache of that level
+"""
+def readCacheStats(statfile : str):
+    stats = { level : [0, 0] for level, _ in cache_levels }
+    with open(statfile) as f:
+        for row in csv.DictReader(f, skipinitialspace=True):
+            name = row["StatisticName"]
+            if name != "CacheHits" and name != "CacheMisses":
+                continue
+            for level, pattern in cache_levels:
+                if pattern.search(row["ComponentName"]):
+                    total = [v for k, v in row.items() if k.startswith("Sum.")][0]
+                    stats[level][0 if name == "CacheHits" else 1] += int(total)
+                    break
+    return stats
+
+# Miss rate per level from readCacheStats(), None for levels with no accesses
+def missRates(stats : dict):
+    rates = {}
+    for level, (hits, misses) in stats.items():
+        rates[level] = misses / (hits + misses) if hits + misses > 0 else None
+    return rates
+
+# Mesh routers as kinglib names them: <prefix>_<network><router number>
+router_re = re.compile(r"_(req|ack|fwd|data)([0-9]+)$")
+memory_re = re.compile(r"memory[0-9]+")
+
+"""
+    Reads the router and memory controller statistics of an sst.statOutputCSV file.
+    Returns (routers, memories, sim_time):
+        routers  = { (network, router number) : { statistic : sum over ports } }, plus
+                   'ports' : number of ports reporting output_port_stalls
+        memories = { controller name : { statistic : [sum, count] } }
+        sim_time = simulated time of the last output, in the core timebase (ps)
+"""
+def readNoCStats(statfile : str):
+    routers = {}
+    memories = {}
+    sim_time = 0
+    with open(statfile) as f:
+        for row in csv.DictReader(f, skipinitialspace=True):
+            sim_time = max(sim_time, int(row["SimTime"]))
+            total = [v for k, v in row.items() if k is not None and k.startswith("Sum.")][0]
+            count = [v for k, v in row.items() if k is not None and k.startswith("Count.")][0]
+            name = row["ComponentName"]
+            match = router_re.search(name)
+            if match is not None:
+                stats = routers.setdefault((match.group(1), int(match.group(2))), { "ports" : 0 })
+                stats[row["StatisticName"]] = stats.get(row["StatisticName"], 0) + float(total)
+                if row["StatisticName"] == "output_port_stalls":
+                    stats["ports"] += 1
+                continue
+            match = memory_re.search(name)
+            if match is not None:
+                stats = memories.setdefault(match.group(0), {})
+                entry = stats.setdefault(row["StatisticName"], [0.0, 0])
+                entry[0] += float(total)
+                entry[1] += int(count)
+    return routers, memories, sim_time
+
+"""
+    Resident memory of the anonymous mappings of process 'pid', from /proc/<pid>/smaps.
+    Returns { mapping size : total resident } in KiB, or None where smaps is not available.
+"""
+def anonymousMappings(pid : int):
+    mappings = {}
+    try:
+        with open("/proc/{}/smaps".format(pid)) as f:
+            anonymous = False
+            size = None
+            for line in f:
+                fields = line.split()
+                if not fields[0].endswith(":"):     # Mapping header: range perms offset dev inode [path]
+                    anonymous = len(fields) == 5
+                elif fields[0] == "Size:":
+                    size = int(fields[1])
+                elif fields[0] == "Rss:" and anonymous:
+                    mappings[size] = mappings.get(size, 0) + int(fields[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return mappings
+
+"""
+    Resident memory in KiB of the simulated-memory backing store, given the last
+    anonymousMappings() sample of the SST process and the 'Memory backing' line p1.py prints.
+    mmap backing is one mapping per controller of the controller's size. malloc backing units
+    of at least glibc's mmap threshold (128KiB) are each mapped separately with one extra page.
+    Returns None if the backing store cannot be told apart from the rest of SST's memory.
+"""
+def backingResident(mappings, text : str):
+    match = backing_re.search(text)
+    if mappings is None or match is None:
+        return None
+    mode, size, unit = match.group(1), int(match.group(3)), match.group(4)
+    if mode == "mmap":
+        return mappings.get(size // 1024, 0)
+    if mode == "malloc" and unit is not None and int(unit) >= 128 * 1024:
+        return mappings.get((int(unit) + os.sysconf("SC_PAGE_SIZE")) // 1024, 0)
+    return None
+
+"""
+    Runs one SST simulation of 'script' (p1.py by default) in 'rundir' and returns a dict with:
+        returncode, timed_out
+        sim_time  = simulated time in seconds (None if the simulation did not complete)
+        wall_time = host wall time in seconds
+        peak_rss  = peak resident set size of the SST process in KiB
+        backing_rss = resident memory of the simulated-memory backing store in KiB, sampled every
+                    'sample_interval' seconds (None if not sampled or not measurable, see backingResident())
+        cost      = configuration cost printed by p1.py
+        stopped   = why 'monitor' (a monitorlib.ProgressMonitor) killed the run, or None
+    SST's stdout and stderr are kept in rundir/sst.log
+"""
+def runSST(options : list, rundir : str, script=node_script, sst="sst", sst_args=[], timeout=None, sample_interval=1.0, monitor=None):
+    os.makedirs(rundir, exist_ok=True)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(os.path.abspath(script)) + os.pathsep + env.get("PYTHONPATH", "")
+    if monitor is not None:
+        sst_args = sst_args + monitor.sst_args
+    cmd = [sst] + sst_args + [os.path.abspath(script), "--"] + [str(x) for x in options]
+    # stdout to a file is block buffered; line buffering lets the monitor see each heartbeat (stdbuf execs SST, same pid)
+    if monitor is not None and shutil.which("stdbuf") is not None:
+        cmd = ["stdbuf", "-oL"] + cmd
+
+    timed_out = False
+    stopped = None
+    logname = os.path.join(rundir, "sst.log")
+    mappings = None
+    start = time.time()
+    with open(logname, "w") as log:
+        proc = subprocess.Popen(cmd, cwd=rundir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 reports the resource usage of this child alone (RUSAGE_CHILDREN would accumulate)
+        if timeout is None and sample_interval is None and monitor is None:
+            pid, status, usage = os.wait4(proc.pid, 0)
+        else:
+            # The backing store is never freed, so the last sample is its peak
+            sampled = start
+            checked = start
+            while True:
+                pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+                if pid != 0:
+                    break
+                if timeout is not None and time.time() - start > timeout:
+                    proc.kill()
+                    pid, status, usage = os.wait4(proc.pid, 0)
+                    timed_out = True
+                    break
+                if sample_interval is not None and time.time() - sampled >= sample_interval:
+                    mappings = anonymousMappings(proc.pid) or mappings
+                    sampled = time.time()
+                if monitor is not None and time.time() - checked >= 1.0:
+                    checked = time.time()
+                    verdict = monitor.check(logname, checked - start)
+                    if verdict is not None and verdict[0] == "kill":
+                        proc.kill()
+                        pid, status, usage = os.wait4(proc.pid, 0)
+                        stopped = verdict[1]
+                        break
+                    if verdict is not None and verdict[0] == "renice":
+                        try:
+                            os.setpriority(os.PRIO_PROCESS, proc.pid, 19)
+                        except OSError:
+                            pass
+                time.sleep(0.1 if sample_interval is not None or monitor is not None else 0.5)
+    wall_time = time.time() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    with open(logname) as log:
+        text = log.read()
+    # ru_maxrss is in KiB on Linux but bytes on macOS
+    peak_rss = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return {
+        "returncode" : proc.returncode,
+        "timed_out" : timed_out,
+        "sim_time" : parseSimTime(text),
+        "wall_time" : wall_time,
+        "peak_rss" : peak_rss,
+        "backing_rss" : backingResident(mappings, text),
+        "cost" : parseCost(text),
+        "stopped" : stopped,
+    }
+
+# Ranks 'values' from 1..n, giving tied values the average of their ranks
+def rankData(values : list):
+    order = sorted(range(0, len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2.0 + 1
+        i = j + 1
+    return ranks
+
+# Spearman rank correlation between two equally long lists
+def rankCorrelation(xs : list, ys : list):
+    if len(xs) != len(ys) or len(xs) < 2:
+        raise Exception("Error: rankCorrelation() needs two lists of the same length (at least 2), got {} and {}".format(len(xs), len(ys)))
+    rx = rankData(xs)
+    ry = rankData(ys)
+    mean = (len(xs) + 1) / 2.0
+    cov = sum([(a - mean) * (b - mean) for a, b in zip(rx, ry)])
+    var_x = sum([(a - mean) ** 2 for a in rx])
+    var_y = sum([(b - mean) ** 2 for b in ry])
+    if var_x == 0 or var_y == 0:
+        return 0.0
+    return cov / (var_x * var_y) ** 0.5
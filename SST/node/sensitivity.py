@@ -0,0 +1,225 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from runlib import *
+
+### USAGE ###
+#
+# Which architecture knobs actually move beam's simulated time? Either analyze results that
+# were already collected, or design and run a small two-level fractional factorial experiment
+# over the original node dimensions first:
+#
+#   $ python3 sensitivity.py design --runs 64 --run --jobs 32 --output factorial.csv
+#   $ python3 sensitivity.py analyze factorial.csv
+#   $ python3 sensitivity.py analyze sweep.csv            # any sweep.py output
+#   $ python3 sensitivity.py analyze --db results.db      # or a results database
+#
+# The analysis decomposes the variance of log(simulated time) over the dimensions that vary
+# in the data: the main effect share of each dimension is Var(E[log t | dim]) / Var(log t)
+# and the interaction share of a pair is what their joint conditional means explain beyond
+# both main effects. On a full or balanced fractional factorial these are the first- and
+# second-order Sobol indices. Dimensions with small shares can be pinned at their cheapest
+# value in later sweeps.
+#
+
+# Two-level designs for the 10 original node dimensions: base factors, then generators for
+# the remaining ones as products of base factor columns (standard minimum-aberration designs)
+designs = {
+    32 : (5, [[0, 1, 2, 3], [0, 1, 2, 4], [0, 1, 3, 4], [0, 2, 3, 4], [1, 2, 3, 4]]),      # 2^(10-5), resolution IV
+    64 : (6, [[1, 2, 3, 5], [0, 2, 3, 5], [0, 1, 3, 4], [0, 1, 2, 4]]),                    # 2^(10-4), resolution IV
+    128 : (7, [[0, 1, 2, 6], [1, 2, 3, 4], [0, 2, 3, 5]]),                                 # 2^(10-3), resolution V
+    1024 : (10, []),                                                                       # full factorial
+}
+
+# Low and high level of each dimension in the design; speed uses its extremes
+def designLevels():
+    space = configSpace()
+    levels = {}
+    for dim in core_dims:
+        values = space[dim]
+        levels[dim] = (values[0], values[-1])
+    return levels
+
+# Rows of +1/-1 for the 10 dimensions
+def factorialDesign(runs : int):
+    base, generators = designs[runs]
+    rows = []
+    for signs in itertools.product([-1, 1], repeat=base):
+        row = list(signs)
+        for generator in generators:
+            value = 1
+            for factor in generator:
+                value *= signs[factor]
+            row.append(value)
+        rows.append(row)
+    return rows
+
+def design(args):
+    if len(core_dims) != 10:
+        raise Exception("Error: the factorial designs are written for 10 dimensions, core_dims has {}".format(len(core_dims)))
+    levels = designLevels()
+    configs = []
+    for row in factorialDesign(args.runs):
+        configs.append({ dim : levels[dim][0 if sign < 0 else 1] for dim, sign in zip(core_dims, row) })
+    print("{}-run two-level design over {}".format(len(configs), core_dims))
+
+    if not args.run:
+        with open(args.output, "w") as f:
+            for config in configs:
+                f.write(" ".join(configArgs(config)) + "\n")
+        print("Wrote {} (one set of p1.py options per line; run with --run to simulate)".format(args.output))
+        return
+
+    # Run the design and write it in sweep.py's CSV format, so analyze can read it
+    from sweep import runOne
+    args.resume = True
+    args.budget = None
+    args.kill_dominated = False
+    results = []
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        jobs = {}
+        for config in configs:
+            options = configArgs(config)
+            jobs[pool.submit(runOne, options, os.path.join(args.workdir, runID(options)), args)] = config
+        for job in as_completed(jobs):
+            result = job.result()
+            results.append((jobs[job], result))
+            status = "{:.3f} us".format(result["sim_time"] * 1e6) if result["sim_time"] is not None else "FAILED"
+            print("[{}/{}] {} {}".format(len(results), len(configs), " ".join(configArgs(jobs[job])), status))
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(core_dims + ["cost", "sim_time_us"])
+        for config, result in results:
+            writer.writerow([config[dim] for dim in core_dims] + [result["cost"], result["sim_time"] * 1e6 if result["sim_time"] is not None else ""])
+    print("Wrote {}".format(args.output))
+
+# A dimension's value as an analysis level: a string, or None where p1.py chooses it (the associativities' default)
+def level(value):
+    return str(value) if value is not None else None
+
+# Reads (config, sim_time) pairs from a sweep-format CSV
+def readCSV(filename):
+    space = configSpace()
+    data = []
+    with open(filename, newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("sim_time_us", "") == "":
+                continue
+            config = {}
+            for dim in space.keys():
+                if dim in row:
+                    config[dim] = level(space[dim][0]) if row[dim] == "default" else row[dim]
+            data.append((config, float(row["sim_time_us"]) * 1e-6))
+    return data
+
+# Reads (config, sim_time) pairs from a results database (see results.py)
+def readDB(filename):
+    from resultslib import ResultsDB
+    db = ResultsDB(filename)
+    data = []
+    for row in db.query("SELECT options, sim_time FROM runs WHERE sim_time IS NOT NULL AND options IS NOT NULL"):
+        options = json.loads(row["options"])
+        data.append(({ dim : level(options.get(dim)) for dim in db.dims }, row["sim_time"]))
+    db.close()
+    return data
+
+def variance(values):
+    mean = sum(values) / len(values)
+    return sum([(v - mean) ** 2 for v in values]) / len(values)
+
+# Variance of the conditional mean of y given the values of 'dims', over all samples
+def explained(data, dims):
+    groups = {}
+    for config, y in data:
+        groups.setdefault(tuple([config[d] for d in dims]), []).append(y)
+    mean = sum([y for _, y in data]) / len(data)
+    return sum([len(ys) * (sum(ys) / len(ys) - mean) ** 2 for ys in groups.values()]) / len(data)
+
+def analyze(args):
+    data = readDB(args.db) if args.db else readCSV(args.results)
+    if len(data) < 4:
+        print("Error: need at least 4 completed runs, found {}".format(len(data)))
+        sys.exit(1)
+    data = [(config, math.log(t)) for config, t in data]
+    dims = [d for d in configSpace().keys() if len(set([str(c.get(d)) for c, _ in data])) > 1]
+    total = variance([y for _, y in data])
+    if total < 1e-12:
+        print("Simulated time does not vary across the {} runs".format(len(data)))
+        return
+
+    main = { d : explained(data, [d]) / total for d in dims }
+    pairs = {}
+    for a, b in itertools.combinations(dims, 2):
+        pairs[(a, b)] = max(0.0, explained(data, [a, b]) / total - main[a] - main[b])
+
+    print("{} runs, {} varying dimensions, log(sim time) std. dev. {:.3f}".format(len(data), len(dims), math.sqrt(total)))
+    print("")
+    print("{:>12}  {:>10}  {:>14}  {:>10}  {:>12}  {:>12}  {}".format("dimension", "main", "w/ interact.", "best", "time change", "cost change", "verdict"))
+    for d in sorted(dims, key=lambda d: -main[d]):
+        # Level with the lowest mean log time, and its effect vs. the slowest level
+        means = {}
+        for config, y in data:
+            means.setdefault(config[d], []).append(y)
+        means = { level : sum(ys) / len(ys) for level, ys in means.items() }
+        best = min(means, key=lambda level: means[level])
+        worst = max(means, key=lambda level: means[level])
+        change = math.exp(means[best] - means[worst]) - 1
+        cost = configCost({ d : best }) - configCost({ d : worst })
+        interactions = main[d] + sum([share for pair, share in pairs.items() if d in pair])
+        if interactions < args.threshold:
+            verdict = "insensitive: pin at the cheapest value"
+        elif cost <= 0:
+            verdict = "worth it: faster and no more expensive"
+        else:
+            verdict = "worth it" if -change * 100 / cost * 1000 >= args.min_gain else "marginal"
+        print("{:>12}  {:>9.1%}  {:>13.1%}  {:>10}  {:>+11.1%}  {:>+12.0f}  {}".format(d, main[d], interactions, best if best is not None else "default",
+              change, cost, verdict))
+
+    print("")
+    print("Largest interactions:")
+    for (a, b), share in sorted(pairs.items(), key=lambda p: -p[1])[:args.top]:
+        if share < args.threshold / 2:
+            break
+        print("  {:>12} x {:<12} {:>6.1%}".format(a, b, share))
+    residual = 1 - sum(main.values()) - sum(pairs.values())
+    print("")
+    print("Main effects explain {:.1%} of the variance, pairwise interactions {:.1%}, the rest {:.1%}".format(
+          sum(main.values()), sum(pairs.values()), max(0.0, residual)))
+    if args.min_gain > 0:
+        print("'worth it' = at least {:.1f}% faster per $1000 of added cost".format(args.min_gain))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    commands = ap.add_subparsers(dest='command', required=True)
+
+    cmd = commands.add_parser('design', help='Generate (and optionally run) a two-level fractional factorial design.')
+    cmd.add_argument('--runs', type=int, default=64, choices=sorted(designs.keys()),
+                     help='Design size: 32 and 64 separate main effects from pairwise interactions, 128 also separates the interactions, 1024 is the full factorial.')
+    cmd.add_argument('--run', action='store_true', help='Run the design instead of only writing the configurations.')
+    cmd.add_argument('--output', type=str, default='factorial.csv',
+                     help='With --run: results in sweep.py CSV format. Otherwise: the configurations, one per line.')
+    cmd.add_argument('--jobs', type=int, default=os.cpu_count())
+    cmd.add_argument('--workdir', type=str, default='factorial')
+    cmd.add_argument('--sst', type=str, default='sst')
+    cmd.add_argument('--timeout', type=float, default=None)
+
+    cmd = commands.add_parser('analyze', help='Main and interaction effects on simulated time.')
+    cmd.add_argument('results', type=str, nargs='?', default='sweep.csv', help='sweep.py-format CSV.')
+    cmd.add_argument('--db', type=str, default=None, help='Read runs from a results database instead.')
+    cmd.add_argument('--threshold', type=float, default=0.02,
+                     help='Variance share (main plus interactions) below which a dimension is insensitive.')
+    cmd.add_argument('--min-gain', type=float, default=1.0,
+                     help='Percent speedup per $1000 of added cost for a dimension to be worth it.')
+    cmd.add_argument('--top', type=int, default=5, help='Interactions to list.')
+
+    args = ap.parse_args()
+    if args.command == 'design':
+        design(args)
+    else:
+        analyze(args)
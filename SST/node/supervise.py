@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+
+from runlib import *
+from monitorlib import *
+
+### USAGE ###
+#
+# Runs one p1.py configuration with SST heartbeats and shows its progress: simulated time so
+# far, simulated time per wall-clock second and, given beam's expected length, the estimated
+# time to completion. Optionally stops the run early (or lowers its priority) when it would
+# take longer than a budget, or once it can no longer beat the best known result.
+#
+#   $ python3 supervise.py --reference sweep/0123456789ab --budget 7200 -- --cores 64 --l3size big
+#   $ python3 supervise.py --expected 45.2 --db results.db --action renice -- --cores 32
+#
+# The expected length is the simulated time of a similar completed run (--reference) or given
+# in us (--expected). Without it only progress and the best-result check are available.
+# sweep.py accepts the same --budget/--kill-dominated checks for every run of a sweep.
+#
+
+def formatSeconds(seconds):
+    if seconds is None:
+        return "-"
+    hours, rest = divmod(int(seconds), 3600)
+    return "{}:{:02d}:{:02d}".format(hours, rest // 60, rest % 60)
+
+def printStatus(status):
+    rate = "{:.4f} us/s".format(status["rate"] * 1e6) if status["rate"] is not None else "-"
+    progress = "{:.1%}".format(status["progress"]) if status["progress"] is not None else "-"
+    print("  simulated {:>12.3f} us  rate {:>14}  progress {:>7}  ETA {}".format(
+          status["sim_time"] * 1e6, rate, progress, formatSeconds(status["eta"])), flush=True)
+
+def main(args):
+    expected = args.expected * 1e-6 if args.expected is not None else None
+    if args.reference:
+        logname = args.reference if os.path.isfile(args.reference) else os.path.join(args.reference, "sst.log")
+        if not os.path.exists(logname):
+            print("Error: reference run log '{}' not found".format(logname))
+            sys.exit(1)
+        with open(logname) as f:
+            expected = parseSimTime(f.read())
+        if expected is None:
+            print("Error: reference run '{}' did not complete".format(logname))
+            sys.exit(1)
+
+    best = args.best * 1e-6 if args.best is not None else None
+    if args.db:
+        from resultslib import ResultsDB
+        db = ResultsDB(args.db)
+        rows = db.fastest(limit=1)
+        db.close()
+        if rows:
+            best = rows[0]["sim_time"] if best is None else min(best, rows[0]["sim_time"])
+    beatable = (lambda sim_time: sim_time <= best * (1 + args.margin)) if best is not None else None
+
+    print("Expected simulated time: {}".format("{:.3f} us".format(expected * 1e6) if expected is not None else "unknown"))
+    print("Best known result:       {}".format("{:.3f} us".format(best * 1e6) if best is not None else "none"))
+    monitor = ProgressMonitor(expected_sim_time=expected, budget=args.budget, beatable=beatable,
+                              action=args.action, period=args.period, report=printStatus)
+    result = runSST(args.options, args.rundir, sst=args.sst, sample_interval=None, monitor=monitor)
+
+    if monitor.acted is not None:
+        print("{}: {}".format("Stopped" if result["stopped"] else "Deprioritized", monitor.acted))
+    if result["sim_time"] is not None:
+        print("Simulation complete: {:.3f} us simulated in {}".format(result["sim_time"] * 1e6, formatSeconds(result["wall_time"])))
+    elif result["stopped"] is None:
+        print("Error: simulation failed (exit code {}), see {}".format(result["returncode"], os.path.join(args.rundir, "sst.log")))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('options', nargs='*',
+                    help='p1.py options, after --.')
+    ap.add_argument('--expected', type=float, default=None,
+                    help='Expected simulated time of the run in us.')
+    ap.add_argument('--reference', type=str, default=None,
+                    help='Completed run (directory or sst.log) whose simulated time is the expected length.')
+    ap.add_argument('--budget', type=float, default=None,
+                    help='Wall-clock seconds the run may take, including the projected remainder.')
+    ap.add_argument('--best', type=float, default=None,
+                    help='Best known simulated time in us; the run is stopped once it is slower.')
+    ap.add_argument('--db', type=str, default=None,
+                    help='Take the best known simulated time from a results database.')
+    ap.add_argument('--margin', type=float, default=0.0,
+                    help='Keep runs until they are this fraction slower than the best result.')
+    ap.add_argument('--action', type=str, default='kill', choices=monitor_actions,
+                    help='What to do with a run that is not worth finishing.')
+    ap.add_argument('--period', type=int, default=10,
+                    help='Wall-clock seconds between heartbeats.')
+    ap.add_argument('--rundir', type=str, default='.',
+                    help='Directory to run the simulation in.')
+    ap.add_argument('--sst', type=str, default='sst',
+                    help='SST executable.')
+    args = ap.parse_args()
+    main(args)
@@ -0,0 +1,246 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from runlib import *
+from resultslib import ResultsDB
+from paretolib import ParetoFrontier
+from monitorlib import ProgressMonitor, monitor_actions
+from preflightlib import checkOptions, checkCost
+
+### USAGE ###
+#
+# Runs p1.py over the cross product of the selected configuration dimensions and writes one
+# row per configuration (options, cost, simulated time, host cost and per-level cache miss
+# rates) to a CSV file. By default the original node dimensions are swept; any other p1.py
+# dimension (e.g., l2repl or l3assoc) can be added with --vary or pinned with --set.
+#
+#   $ python3 sweep.py --jobs 32
+#   $ python3 sweep.py --set cores=64 --set speed=fast --vary l2repl --vary l3repl --vary l3assoc=16,32
+#
+# Each run gets its own directory under --workdir, named after its options. With --resume,
+# configurations that already completed are not re-run. With --db, every finished run is also
+# added to a results database (see results.py).
+#
+# A cost/simulated-time Pareto frontier is kept as results arrive; the CSV marks dominated
+# configurations and --frontier exports it. With --prune-with, runs are launched cheapest
+# first and a configuration is skipped when a lower bound on its simulated time (a fraction
+# of its time in an earlier, faster sweep) shows it can no longer reach the frontier:
+#
+#   $ python3 sweep.py --fidelity fast --output fast.csv --workdir sweep-fast
+#   $ python3 sweep.py --prune-with fast.csv --bound-factor 0.8 --frontier pareto
+#
+# Runs already in progress can be stopped as well: --kill-dominated follows each run's SST
+# heartbeats and stops it once its simulated time so far shows it cannot reach the frontier, and
+# --budget stops runs projected (from the --prune-with estimate of their length) to take longer
+# than the budget. See supervise.py for watching a single run.
+#
+
+# Parses DIM or DIM=v1,v2 into (DIM, [values]); 'default' stands for p1.py's default
+def parseDim(spec, space):
+    dim, _, values = spec.partition("=")
+    if dim not in space:
+        print("Error: unknown dimension '{}'. Expected one of {}".format(dim, list(space.keys())))
+        sys.exit(1)
+    if values == "":
+        return dim, space[dim]
+    return dim, [None if v == "default" else v for v in values.split(",")]
+
+# Reads lower bounds on simulated time from an earlier sweep's CSV: { config key : seconds }
+def readBounds(filename, names, factor):
+    bounds = {}
+    with open(filename, newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("sim_time_us", "") == "":
+                continue
+            key = tuple([None if row.get(n, "default") == "default" else row[n] for n in names])
+            bounds[key] = float(row["sim_time_us"]) * 1e-6 * factor
+    return bounds
+
+def configKey(config, names):
+    return tuple([None if config[n] is None else str(config[n]) for n in names])
+
+def runOne(options, rundir, args, frontier=None, cost=None, bound=None):
+    # Skip configurations that cannot reach the frontier found so far
+    if frontier is not None and bound is not None and not frontier.canReach(cost, bound):
+        return { "skipped" : True, "returncode" : None, "timed_out" : False, "sim_time" : None,
+                 "wall_time" : 0.0, "peak_rss" : None, "backing_rss" : None, "cost" : cost, "miss_rates" : {} }
+
+    resultfile = os.path.join(rundir, "result.json")
+    if args.resume and os.path.exists(resultfile):
+        with open(resultfile) as f:
+            result = json.load(f)
+        if result["sim_time"] is not None:
+            return result
+
+    monitor = None
+    if args.budget is not None or args.kill_dominated:
+        # The earlier sweep's time, before the bound factor, is the best guess at this run's length
+        expected = bound / args.bound_factor if bound is not None else None
+        beatable = None
+        if args.kill_dominated and frontier is not None and cost is not None:
+            beatable = lambda sim_time: frontier.canReach(cost, sim_time)
+        monitor = ProgressMonitor(expected_sim_time=expected, budget=args.budget, beatable=beatable, action=args.straggler_action)
+    result = runSST(options, rundir, sst=args.sst, timeout=args.timeout, monitor=monitor)
+    statfile = os.path.join(rundir, "example1.csv")
+    result["miss_rates"] = missRates(readCacheStats(statfile)) if os.path.exists(statfile) else {}
+    with open(resultfile, "w") as f:
+        json.dump(result, f)
+    return result
+
+def main(args):
+    space = configSpace()
+    dims = {}
+    for spec in (args.vary if args.vary else core_dims):
+        dim, values = parseDim(spec, space)
+        dims[dim] = values
+    for spec in args.set:
+        dim, values = parseDim(spec, space)
+        if len(values) != 1:
+            print("Error: --set takes exactly one value, got '{}'".format(spec))
+            sys.exit(1)
+        dims[dim] = values
+
+    names = list(dims.keys())
+    configs = [dict(zip(names, values)) for values in itertools.product(*[dims[n] for n in names])]
+
+    # Pre-flight: drop configurations p1.py would reject or that are over budget before launching anything
+    valid = []
+    for config in configs:
+        problems = checkOptions(config) or checkCost(config, args.max_cost)
+        if problems:
+            print("Rejected {}: {}".format(" ".join(configArgs(config)) or "(defaults)", "; ".join(problems)))
+        else:
+            valid.append(config)
+    configs = valid
+    print("Sweeping {} configurations over {}".format(len(configs), names))
+
+    frontier = ParetoFrontier()
+    bounds = {}
+    if args.prune_with:
+        bounds = readBounds(args.prune_with, names, args.bound_factor)
+        # Cheap configurations first, so the frontier they build can rule out expensive ones
+        configs.sort(key=lambda config: configCost(config))
+        print("Pruning with lower bounds for {} configurations from {}".format(len(bounds), args.prune_with))
+
+    db = ResultsDB(args.db) if args.db else None
+    results = []
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        jobs = {}
+        for config in configs:
+            options = configArgs(config) + (["--fidelity", args.fidelity] if args.fidelity else [])
+            rundir = os.path.join(args.workdir, runID(options))
+            jobs[pool.submit(runOne, options, rundir, args, frontier, configCost(config), bounds.get(configKey(config, names)))] = (config, rundir)
+        for job in as_completed(jobs):
+            config, rundir = jobs[job]
+            result = job.result()
+            results.append((config, rundir, result))
+            if db is not None and not result.get("skipped"):
+                db.ingest(rundir)
+            if result["sim_time"] is not None:
+                status = "{:.3f} us".format(result["sim_time"] * 1e6)
+                if result["cost"] is not None and frontier.add(rundir, result["cost"], result["sim_time"], dict(config)):
+                    status += "  (Pareto frontier: {} points)".format(len(frontier))
+            elif result.get("stopped"):
+                status = "stopped, " + result["stopped"]
+            else:
+                status = "skipped, cannot reach the frontier" if result.get("skipped") else "FAILED"
+            print("[{}/{}] {} {}".format(len(results), len(configs), " ".join(configArgs(config)), status))
+
+    levels = [level for level, _ in cache_levels]
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(names + ["cost", "sim_time_us", "wall_time_s", "peak_rss_kb", "backing_rss_kb"] + ["miss_" + l for l in levels] + ["pareto", "rundir"])
+        for config, rundir, result in results:
+            sim_time = result["sim_time"] * 1e6 if result["sim_time"] is not None else ""
+            rates = [result["miss_rates"].get(l) for l in levels]
+            if rundir in frontier.points:
+                pareto = "dominated" if frontier.isDominated(rundir) else "frontier"
+            elif result.get("stopped"):
+                pareto = "stopped"
+            else:
+                pareto = "skipped" if result.get("skipped") else ""
+            writer.writerow([config[n] if config[n] is not None else "default" for n in names]
+                            + [result["cost"], sim_time, round(result["wall_time"], 2), result["peak_rss"], result.get("backing_rss")]
+                            + ["{:.4f}".format(r) if r is not None else "" for r in rates] + [pareto, rundir])
+    print("Wrote {}".format(args.output))
+    if db is not None:
+        db.close()
+    if args.frontier:
+        frontier.writeCSV(args.frontier + ".csv")
+        frontier.writeJSON(args.frontier + ".json")
+        try:
+            frontier.plot(args.frontier + ".png")
+            print("Wrote {0}.csv, {0}.json and {0}.png".format(args.frontier))
+        except Exception as e:
+            print("Wrote {0}.csv and {0}.json ({1})".format(args.frontier, e))
+
+    # Summary: the fastest configurations with their cost and where they miss
+    done = sorted([r for r in results if r[2]["sim_time"] is not None], key=lambda r: r[2]["sim_time"])
+    skipped = len([r for r in results if r[2].get("skipped")])
+    stopped = len([r for r in results if r[2].get("stopped")])
+    print("")
+    print("{:>12}  {:>9}  {}  options".format("sim (us)", "cost", "  ".join(["{:>6}".format(l) for l in levels])))
+    for config, rundir, result in done[:args.top]:
+        rates = ["{:>6.3f}".format(result["miss_rates"][l]) if result["miss_rates"].get(l) is not None else "{:>6}".format("-") for l in levels]
+        print("{:>12.3f}  {:>9}  {}  {}".format(result["sim_time"] * 1e6, result["cost"], "  ".join(rates), " ".join(configArgs(config))))
+    if skipped > 0:
+        print("{} of {} configurations were skipped as unable to reach the Pareto frontier".format(skipped, len(results)))
+    if stopped > 0:
+        print("{} of {} configurations were stopped early (--budget/--kill-dominated)".format(stopped, len(results)))
+    if len(done) + skipped + stopped < len(results):
+        print("{} of {} configurations did not complete".format(len(results) - len(done) - skipped - stopped, len(results)))
+
+    # How many of the most memory-hungry runs fit on this host at once
+    measured = [r for r in done if r[2]["peak_rss"]]
+    if measured:
+        config, rundir, result = max(measured, key=lambda r: r[2]["peak_rss"])
+        host = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 1024
+        backing = " ({:.0f} MiB backing store)".format(result["backing_rss"] / 1024) if result.get("backing_rss") is not None else ""
+        print("Largest peak RSS: {:.0f} MiB{}, {} concurrent runs fit in this host's {:.0f} GiB (--set backing=mmap to reduce)".format(
+              result["peak_rss"] / 1024, backing, host // result["peak_rss"], host / 1024 / 1024))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--vary', action='append', default=[],
+                    help='Dimension to sweep, DIM or DIM=v1,v2 (repeatable). Default: the original node dimensions.')
+    ap.add_argument('--set', action='append', default=[],
+                    help='Pin a dimension to one value, DIM=value (repeatable).')
+    ap.add_argument('--jobs', type=int, default=os.cpu_count(),
+                    help='Number of simulations to run concurrently.')
+    ap.add_argument('--workdir', type=str, default='sweep',
+                    help='Directory to hold one run directory per configuration.')
+    ap.add_argument('--output', type=str, default='sweep.csv',
+                    help='CSV file with one row per configuration.')
+    ap.add_argument('--resume', action='store_true',
+                    help='Reuse results of configurations that already completed in --workdir.')
+    ap.add_argument('--sst', type=str, default='sst',
+                    help='SST executable.')
+    ap.add_argument('--timeout', type=float, default=None,
+                    help='Kill any single simulation after this many seconds.')
+    ap.add_argument('--db', type=str, default=None,
+                    help='SQLite results database (see results.py) to add each finished run to.')
+    ap.add_argument('--fidelity', type=str, default=None,
+                    help='p1.py --fidelity tier for every run. Default: p1.py\'s default (detailed).')
+    ap.add_argument('--frontier', type=str, default=None,
+                    help='Export the cost/simulated-time Pareto frontier to PREFIX.csv, PREFIX.json and PREFIX.png.')
+    ap.add_argument('--prune-with', type=str, default=None,
+                    help='CSV of an earlier (e.g., --fidelity fast) sweep providing lower bounds on simulated time.')
+    ap.add_argument('--bound-factor', type=float, default=0.8,
+                    help='Lower bound on simulated time as a fraction of the time in --prune-with.')
+    ap.add_argument('--max-cost', type=float, default=None,
+                    help='Do not run configurations costing more than this per node.')
+    ap.add_argument('--budget', type=float, default=None,
+                    help='Stop runs projected to take more than this many wall-clock seconds (needs --prune-with for the projection).')
+    ap.add_argument('--kill-dominated', action='store_true',
+                    help='Stop runs as soon as their simulated time so far shows they cannot reach the Pareto frontier.')
+    ap.add_argument('--straggler-action', type=str, default='kill', choices=monitor_actions,
+                    help='Kill runs stopped by --budget/--kill-dominated, or only lower their priority.')
+    ap.add_argument('--top', type=int, default=10,
+                    help='Number of fastest configurations to list in the summary.')
+    args = ap.parse_args()
+    main(args)
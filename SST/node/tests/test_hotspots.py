@@ -0,0 +1,25 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from hotspots import readProfile, groupByKind
+
+
+def test_read_profile_keys_off_the_header(tmp_path):
+    profile = tmp_path / "profile.txt"
+    profile.write_text(
+        "clock:\n"
+        "Name, Clock Handler Counts, Clock Handler Time (s), Avg. Handler Time (ns)\n"
+        "mesh_rtr0, 100, 0.5, 5000\n"
+        "mesh_rtr1, 50, 0.25, 5000\n"
+        "\n"
+        "event:\n"
+        "Name, Time (s), Event Handler Counts, Avg. Handler Time (ns)\n"
+        "core_l1d3, 0.125, 10, 12500\n"
+        "core_l1d3, 0.125, 10, 12500\n")
+    tools = readProfile(str(profile))
+    assert tools == {
+        "clock" : { "mesh_rtr0" : [100, 0.5], "mesh_rtr1" : [50, 0.25] },
+        "event" : { "core_l1d3" : [20, 0.25] },
+    }
+    assert groupByKind(tools["clock"]) == { "mesh_rtr" : [2, 150, 0.75] }
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from params import *
+
+
+def test_partition_cores_fixed_and_shared():
+    assert partitionCores(8, [2, None, None]) == [2, 3, 3]
+
+def test_partition_cores_even_share():
+    assert partitionCores(4, [None, None]) == [2, 2]
+
+def test_partition_cores_too_many_requested():
+    with pytest.raises(Exception, match="only has 4"):
+        partitionCores(4, [3, 2])
+
+def test_partition_cores_nothing_left_to_share():
+    with pytest.raises(Exception, match="not enough cores"):
+        partitionCores(4, [4, None])
+
+def test_partition_cores_empty_request():
+    with pytest.raises(Exception, match="at least one core"):
+        partitionCores(4, [0, 2])
+
+def test_cost_model_size_default_associativity():
+    base = costModel("slow", "no", "small", "small", "small", "private", "slow", "basic")
+    assert base == costModel("slow", "no", "small", "small", "small", "private", "slow", "basic",
+                             l1assoc=arg_l1size["small"][1], l2assoc=arg_l2size["small"][1], l3assoc=arg_l3size["small"][1])
+    assert base[1] == arg_mem_cost["basic"] and base[2] == 0
+
+def test_cost_model_extra_ways_and_nodes():
+    base = costModel("slow", "no", "small", "small", "small", "private", "slow", "basic")
+    wider = costModel("slow", "no", "small", "small", "small", "private", "slow", "basic", l2assoc=arg_l2size["small"][1] + 8)
+    assert wider[0] == base[0] + 8 * arg_assoc_way_cost["l2"]
+    assert costModel("slow", "no", "small", "small", "small", "private", "slow", "basic", nodes=2)[2] == arg_nic_cost
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from paretolib import ParetoFrontier
+
+
+def test_add_keeps_only_undominated_points():
+    frontier = ParetoFrontier()
+    assert frontier.add("a", 100.0, 5.0)
+    assert frontier.add("b", 200.0, 3.0)
+    assert not frontier.add("c", 250.0, 4.0)     # slower and dearer than b
+    assert not frontier.add("d", 100.0, 5.0)     # ties a
+    assert frontier.add("e", 150.0, 2.0)         # removes b
+    assert [key for key, _, _, _ in frontier.frontier()] == ["a", "e"]
+    assert frontier.isDominated("b") and frontier.isDominated("c")
+    assert not frontier.isDominated("e")
+    assert len(frontier) == 2
+
+def test_can_reach():
+    frontier = ParetoFrontier()
+    assert frontier.canReach(100.0, 1.0)
+    frontier.add("a", 100.0, 5.0)
+    assert frontier.canReach(50.0, 10.0)         # cheaper than every frontier point
+    assert frontier.canReach(200.0, 4.0)         # could still be faster than a
+    assert not frontier.canReach(200.0, 5.0)     # at best as fast as a, and dearer
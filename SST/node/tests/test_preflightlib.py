@@ -0,0 +1,20 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from preflightlib import *
+
+
+def test_parse_options_flags_take_no_value():
+    assert parseOptions(["--preflight", "--cores", "64"]) == ({ "cores" : "64" }, { "--preflight" : None })
+
+def test_parse_options_equals_and_short_forms():
+    config, other = parseOptions(["--cores=64", "-c", "fast", "--nodes", "2", "--noc-topology=torus"])
+    assert config == { "cores" : "64", "speed" : "fast", "noc_topology" : "torus" }
+    assert other == { "--nodes" : "2" }
+
+def test_check_options():
+    assert checkOptions({}) == []
+    assert checkOptions({ "cores" : "64" }) == []
+    assert checkOptions({ "cores" : "48" })[0].startswith("--cores must be in")
+    assert checkOptions({ "cores" : "64", "noc_topology" : "ring" }) == ["--noc-topology ring supports up to 32 cores, got 64"]
@@ -0,0 +1,24 @@
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from replicate import meanInterval
+
+
+def test_mean_interval_single_value():
+    assert meanInterval([5.0]) == (5.0, None)
+
+def test_mean_interval_small_sample_uses_t():
+    mean, half = meanInterval([1.0, 3.0])
+    assert mean == 2.0
+    assert half == pytest.approx(12.706)
+
+def test_mean_interval_large_sample_uses_normal():
+    values = [0.0, 2.0] * 20
+    mean, half = meanInterval(values)
+    std = math.sqrt(sum([(v - 1.0) ** 2 for v in values]) / (len(values) - 1))
+    assert mean == 1.0
+    assert half == pytest.approx(1.960 * std / math.sqrt(len(values)))
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from resultslib import *
+
+
+def test_rollup_stats_sums_instances(tmp_path):
+    statfile = tmp_path / "stats.csv"
+    statfile.write_text(
+        "ComponentName, StatisticName, StatisticSubId, StatisticType, SimTime, Rank, Sum.u64, SumSQ.u64, Count.u64, Min.u64, Max.u64\n"
+        "node0.core_l1d0, CacheHits, , Accumulator, 1000, 0, 10, 100, 2, 1, 9\n"
+        "node0.core_l1d12, CacheHits, , Accumulator, 1000, 0, 5, 25, 3, 1, 4\n"
+        "node1.core_l1d3, CacheHits, , Accumulator, 1000, 0, 7, 49, 1, 7, 7\n"
+        "memory0, requests, , Accumulator, 1000, 0, , , , , \n")
+    assert rollupStats(str(statfile)) == {
+        ("node.core_l1d", "CacheHits") : [22.0, 6],
+        ("memory", "requests") : [0.0, 0],
+    }
+
+def makeRun(rundir, cost, sim_time):
+    run = { name : None for name, _ in run_columns }
+    run.update({ "rundir" : rundir, "options" : {}, "cost" : cost, "sim_time" : sim_time,
+                 "stats" : { ("core_l1d", "CacheHits") : [cost, 1] }, "miss_rates" : {} })
+    return run
+
+def test_results_db_fastest_and_pareto(tmp_path):
+    db = ResultsDB(str(tmp_path / "results.db"))
+    for rundir, cost, sim_time in [("a", 100.0, 3e-3), ("b", 200.0, 1e-3), ("c", 300.0, 2e-3), ("d", 50.0, None)]:
+        db.add(makeRun(rundir, cost, sim_time))
+    db.add(makeRun("a", 100.0, 4e-3))   # Re-adding a run directory replaces it
+
+    assert [row["rundir"] for row in db.fastest()] == ["b", "c", "a"]
+    assert [row["rundir"] for row in db.fastest(max_cost=150)] == ["a"]
+    assert [row["rundir"] for row in db.pareto()] == ["a", "b"]
+    assert len(db.stat("CacheHits", "core_l1d")) == 4
+    db.close()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from runlib import *
+
+
+def test_rank_correlation_monotonic():
+    assert rankCorrelation([1, 2, 3, 4], [10, 20, 30, 400]) == pytest.approx(1.0)
+    assert rankCorrelation([1, 2, 3, 4], [4, 3, 2, 1]) == pytest.approx(-1.0)
+
+def test_rank_correlation_ties_share_a_rank():
+    assert rankData([5, 1, 5, 3]) == [3.5, 1.0, 3.5, 2.0]
+    assert rankCorrelation([1, 2, 3], [1, 3, 2]) == pytest.approx(0.5)
+
+def test_rank_correlation_constant_list():
+    assert rankCorrelation([1, 1, 1], [1, 2, 3]) == 0.0
+
+def test_rank_correlation_mismatched_lengths():
+    with pytest.raises(Exception, match="same length"):
+        rankCorrelation([1, 2], [1, 2, 3])
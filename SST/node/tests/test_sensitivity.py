@@ -0,0 +1,44 @@
+import argparse
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sensitivity import *
+
+
+@pytest.mark.parametrize("runs", sorted(designs.keys()))
+def test_factorial_design_is_balanced_and_orthogonal(runs):
+    rows = factorialDesign(runs)
+    assert len(rows) == runs and len(set(map(tuple, rows))) == runs
+    columns = list(zip(*rows))
+    assert len(columns) == 10
+    for column in columns:
+        assert sum(column) == 0
+    # Resolution IV or better: main effects are clear of each other and of two-factor interactions
+    for a, b, c in itertools.permutations(range(10), 3):
+        assert sum([x * y for x, y in zip(columns[a], columns[b])]) == 0
+        assert sum([x * y * z for x, y, z in zip(columns[a], columns[b], columns[c])]) == 0
+
+def test_analyze_with_default_associativity(tmp_path, capsys):
+    results = tmp_path / "sweep.csv"
+    results.write_text("cores,l2assoc,cost,sim_time_us\n"
+                       "default,default,0,100\n"
+                       "default,16,0,80\n"
+                       "64,default,0,60\n"
+                       "64,16,0,50\n")
+    analyze(argparse.Namespace(results=str(results), db=None, threshold=0.02, min_gain=1.0, top=5))
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("4 runs, 2 varying dimensions")
+    l2assoc = [line.split() for line in lines if line.split()[:1] == ["l2assoc"]][0]
+    assert l2assoc[3] == "16"
+    assert float(l2assoc[5]) == configCost({ "l2assoc" : "16" }) - configCost({ "l2assoc" : None })
+
+def test_read_csv_keeps_default_associativity_unset(tmp_path):
+    results = tmp_path / "sweep.csv"
+    results.write_text("cores,l2assoc,cost,sim_time_us\ndefault,default,0,100\n64,8,0,50\n")
+    data = readCSV(str(results))
+    assert [config for config, _ in data] == [{ "cores" : "32", "l2assoc" : None }, { "cores" : "64", "l2assoc" : "8" }]
+    assert [sim_time for _, sim_time in data] == pytest.approx([100e-6, 50e-6])
@@ -0,0 +1,57 @@
+import argparse
+import sys
+
+from runlib import *
+
+### USAGE ###
+#
+# Reports per-process and aggregate throughput for a throughput-mode run of p1.py,
+# i.e., one where several application instances were launched with --instance.
+# Run it in (or point it at) the directory the simulation was run from:
+#
+#   $ sst p1.py -- -n 64 -i beam:32 -i beam:16 -i beam:16 | tee sst.log
+#   $ python3 throughput.py --sst-log sst.log
+#
+
+def main(args):
+    outputs = readAppOutputs(args.dir)
+    if not outputs:
+        print("Error: no stdout-<pid> files found in '{}'".format(args.dir))
+        sys.exit(1)
+
+    runtimes = {}
+    print("{:>6}  {:>14}  {:>16}".format("pid", "run time (us)", "runs/ms"))
+    for pid, text in outputs.items():
+        runtime = parseAppRunTime(text)
+        if runtime is None:
+            print("{:>6}  {:>14}  {:>16}".format(pid, "incomplete", "-"))
+            continue
+        runtimes[pid] = runtime
+        print("{:>6}  {:>14.3f}  {:>16.6f}".format(pid, runtime * 1e6, 1e-3 / runtime))
+
+    if not runtimes:
+        print("Error: none of the processes reported a run time")
+        sys.exit(1)
+
+    # Instances all start at time zero, so the slowest one bounds the batch
+    makespan = max(runtimes.values())
+    print("")
+    print("Completed instances:   {} of {}".format(len(runtimes), len(outputs)))
+    print("Makespan:              {:.3f} us".format(makespan * 1e6))
+    print("Batch throughput:      {:.6f} runs/ms".format(len(runtimes) * 1e-3 / makespan))
+    print("Sum of process rates:  {:.6f} runs/ms".format(sum([1e-3 / t for t in runtimes.values()])))
+
+    if args.sst_log:
+        with open(args.sst_log) as f:
+            sim_time = parseSimTime(f.read())
+        if sim_time is not None:
+            print("Simulated time:        {:.3f} us".format(sim_time * 1e6))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--dir', type=str, default='.',
+                    help='Directory containing the stdout-<pid> files written by the simulated processes.')
+    ap.add_argument('--sst-log', type=str, default=None,
+                    help='Optional file holding SST\'s own stdout, used to report total simulated time.')
+    args = ap.parse_args()
+    main(args)
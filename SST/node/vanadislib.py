@@ -213,6 +213,10 @@ class VanadisCore:
         immulink = sst.Link(prefix + str(core_num) + ".immu")
         immulink.connect( (self.insn_tlb, "mmu", self.link_latency), (mmu, "core" + str(core_num) + ".itlb", self.link_latency) )
 
+    def setRank(self, rank, thread=0):
+        self.comp.setRank(rank, thread)
+        self.data_tlb_wrapper.setRank(rank, thread)
+        self.insn_tlb_wrapper.setRank(rank, thread)
 
     def enableStats(self):
         self.comp.enableAllStatistics()
@@ -288,13 +292,17 @@ class Vanadis:
     hw_threads = 1
     node_count = 0
     process = 0
+    # VanadisNodeOS gives the processes pids from 100 in the order they are configured,
+    # and each one's stdout goes to stdout-<pid>
+    first_pid = 100
 
-    def __init__(self, prefix, cores, link_latency, isa='RISCV64', hw_threads=1):
+    def __init__(self, prefix, cores, link_latency, isa='RISCV64', hw_threads=1, page_size=None):
         """
             Members are:
                 prefix  = string prefix for names
                 link_latency = latency to use for links
                 isa     = which isa (mipsel or riscv64)
+                page_size = page size in bytes for the OS and MMU. default = element default (4096)
                 os      = vanadis os component (1)
                 cores   = vanadis core components (vector: 1 per core)
                 decoders = vanadis decoder subcomponents (vector: 1 per hw thread)
@@ -322,12 +330,17 @@ class Vanadis:
 
         # Create OS
         self.os = sst.Component(prefix + "_os", "vanadis.VanadisNodeOS")
+        self.os.addParam("node_id", Vanadis.node_count) # Only tags stdout/stderr files for nodes > 0
         self.mmu = self.os.setSubComponent("mmu", "mmu.simpleMMU")
         self.os.addParam("useMMU", True)
         self.mmu.addParams({
             "num_cores" : cores,
             "num_threads" : hw_threads,
         })
+        # OS and MMU must agree on the page size
+        if page_size is not None:
+            self.os.addParam("page_size", page_size)
+            self.mmu.addParam("page_size", page_size)
         
         # Create cores
         self.cores = []
@@ -339,6 +352,11 @@ class Vanadis:
         self.l1i = None
         self.l1d = None
         self.l2 = None
+        self.l1_os = None
+        self.buses = []
+
+        # Node number, used to tag cores
+        self.node_id = Vanadis.node_count
 
         # Increment node_count
         Vanadis.node_count = Vanadis.node_count + 1
@@ -360,6 +378,17 @@ class Vanadis:
     def getOS(self):
         return self.os
 
+    # Place the OS, cores, TLBs and private caches on one MPI rank/thread
+    def setRank(self, rank, thread=0):
+        self.os.setRank(rank, thread)
+        for core in self.cores:
+            core.setRank(rank, thread)
+        for cachelevel in [self.l1i, self.l1d, self.l2, self.l1_os]:
+            if cachelevel is not None:
+                cachelevel.setRank(rank, thread)
+        for bus in self.buses:
+            bus.bus.setRank(rank, thread)
+
     # Can only call one of the following private cache construction functions
 
     # Add private L1 and L2 to each core and private L1 to OS
@@ -379,6 +408,7 @@ class Vanadis:
         # Connect L1s to L2s
         for x in range(0, len(self.cores)):
             bus = Bus(self.prefix + "_bus" + str(x), bus_params, self.link_latency, [self.l1i.get(x), self.l1d.get(x)], [self.l2.get(x)])
+            self.buses.append(bus)
 
             link0 = sst.Link(self.prefix + str(x) + "c1i")
             link0.connect( (self.cores[x].insn_tlb_wrapper, "cache_if", self.link_latency), (self.l1i.get(x), "highlink", self.link_latency) )
@@ -494,7 +524,9 @@ class Vanadis:
             self.mmu.addParam("page_size", os_params["page_size"])
 
     def configureMMU(self, mmu_params):
-        self.os.setSubComponent("mmu", "mmu.simpleMMU")
+        self.mmu.addParams(mmu_params)
+        if "page_size" in mmu_params:
+            self.os.addParam("page_size", mmu_params["page_size"])
     
     def configureTLBs(self, tlb_params, dtlb=True, core=-1):
         if core > -1:
@@ -506,6 +538,8 @@ class Vanadis:
         for core in self.cores:
             core.configureTLB(tlb_params, dtlb)
     
+    # Returns the pid of the process so that callers launching several independent
+    # applications (throughput mode) can match them to their stdout-<pid> files
     def configureApplication(self, app : str, app_args=[], env_args=[]):
         process = "process" + str(self.process)
         app_no_path = app.split('/')[-1]
@@ -521,3 +555,4 @@ class Vanadis:
             self.os.addParam(process + ".arg" + str(x+1), app_args[x])
         
         self.process += 1
+        return self.first_pid + self.process - 1
@@ -0,0 +1,30 @@
+import hashlib
+import re
+
+### Host-side helpers shared by node/runlib.py and network/netlib.py.
+###  Reads what every SST run prints and names run directories; does not import sst.
+###
+
+
+# Seconds per unit for the time units SST, the apps and Ember print
+time_units = { "s" : 1.0, "ms" : 1e-3, "us" : 1e-6, "ns" : 1e-9, "ps" : 1e-12, "fs" : 1e-15 }
+
+sim_time_re = re.compile(r"Simulation is complete, simulated time: ([0-9.eE+-]+) ([a-z]+)")
+
+
+# Converts a value printed with one of the units in time_units to seconds
+def toSeconds(value, unit : str):
+    if unit not in time_units:
+        raise Exception("Error: unknown time unit '{}'. Expected one of {}".format(unit, list(time_units.keys())))
+    return float(value) * time_units[unit]
+
+# Returns the simulated time in seconds from SST's stdout, or None if the run did not complete
+def parseSimTime(text : str):
+    match = sim_time_re.search(text)
+    if match is None:
+        return None
+    return toSeconds(match.group(1), match.group(2))
+
+# Short, stable name for a set of SST script options, used to name and cache run directories
+def runID(options : list):
+    return hashlib.sha1(" ".join([str(x) for x in options]).encode()).hexdigest()[:12]